@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+"""
+Deterministic local stand-in for an OpenAI-compatible chat-completions API.
+
+Point a model config at it through litellm's `api_base`:
+
+    - model: openai/fake-essay-model
+      name: Fake Model
+      provider: fake
+      api_base: http://127.0.0.1:8089/v1
+      api_key: fake-key
+
+Latency, throughput and failure injection are configurable so the
+orchestration and backoff logic can be exercised without API credits.
+
+It also stands in for the OpenAI Files/Batches API and the Anthropic
+Message Batches API; batches finish `batch_delay` seconds after submission.
+Prompt prefixes it has seen before are reported as cached tokens, like
+provider prompt caching.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+WORDS = (
+    "the argument evidence students society technology because however therefore research "
+    "important perspective consider impact ethical creative human artists originality policy "
+    "future community economic cultural debate example although significant critics believe "
+    "support suggests experts data study growth concern balance responsibility access change "
+    "writing music industry copyright value work questions public private benefit risk"
+).split()
+
+# How a packed multi-essay request asks for its JSON array
+PACKED_PATTERN = re.compile(r'JSON array of (\d+) objects')
+# Prefix caching granularity, in words
+PREFIX_BLOCK_WORDS = 64
+
+
+class FakeProviderConfig:
+    """Knobs for the simulated provider."""
+
+    def __init__(self, latency_distribution: str = 'lognormal', latency_median: float = 0.5,
+                 latency_sigma: float = 0.5, tokens_per_second: float = 400.0,
+                 rate_limit_rate: float = 0.0, server_error_rate: float = 0.0,
+                 retry_after: float = 1.0, seed: int = 0, time_scale: float = 1.0,
+                 batch_delay: float = 2.0, prefix_cache_min_tokens: Optional[int] = 1024):
+        self.latency_distribution = latency_distribution
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.rate_limit_rate = rate_limit_rate
+        self.server_error_rate = server_error_rate
+        self.retry_after = retry_after
+        self.seed = seed
+        # Multiplies every simulated delay; 0 disables sleeping entirely
+        self.time_scale = time_scale
+        # Seconds from batch submission until its results are available
+        self.batch_delay = batch_delay
+        # Shortest prefix reported as cached; None disables simulated caching
+        self.prefix_cache_min_tokens = prefix_cache_min_tokens
+
+
+class FakeProviderServer:
+    """aiohttp application that serves deterministic chat completions."""
+
+    def __init__(self, config: Optional[FakeProviderConfig] = None):
+        self.config = config or FakeProviderConfig()
+        self.app = web.Application()
+        self.app.router.add_post('/v1/chat/completions', self.handle_chat_completion)
+        self.app.router.add_post('/chat/completions', self.handle_chat_completion)
+        self.app.router.add_get('/stats', self.handle_stats)
+        # OpenAI Files + Batches API
+        self.app.router.add_post('/v1/files', self.handle_file_upload)
+        self.app.router.add_get('/v1/files/{file_id}/content', self.handle_file_content)
+        self.app.router.add_post('/v1/batches', self.handle_openai_batch_create)
+        self.app.router.add_get('/v1/batches/{batch_id}', self.handle_openai_batch_get)
+        # Anthropic Message Batches API
+        self.app.router.add_post('/v1/messages/batches', self.handle_anthropic_batch_create)
+        self.app.router.add_get('/v1/messages/batches/{batch_id}', self.handle_anthropic_batch_get)
+        self.app.router.add_get('/v1/messages/batches/{batch_id}/results', self.handle_anthropic_batch_results)
+        self._runner: Optional[web.AppRunner] = None
+        self._attempts: Dict[str, int] = {}
+        self._files: Dict[str, str] = {}
+        self._batches: Dict[str, Dict] = {}
+        self._seen_prefixes = set()
+        self.stats = {
+            'requests': 0,
+            'completed': 0,
+            'rate_limited': 0,
+            'server_errors': 0,
+            'cancelled_streams': 0,
+            'completion_tokens': 0,
+            'simulated_seconds': 0.0,
+            'batches': 0,
+            'batch_requests': 0,
+            'cached_tokens': 0
+        }
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0) -> str:
+        """Start serving and return the base URL to use as `api_base`."""
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        bound_port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{bound_port}/v1"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def _request_rng(self, body: Dict) -> random.Random:
+        """RNG seeded by request content and how often it has been seen."""
+        key = hashlib.sha256(json.dumps([body.get('model'), body.get('messages')], sort_keys=True).encode()).hexdigest()
+        attempt = self._attempts.get(key, 0)
+        self._attempts[key] = attempt + 1
+        return random.Random(f"{self.config.seed}:{key}:{attempt}")
+
+    def _cached_prompt_tokens(self, prompt_text: str) -> int:
+        """Tokens of the longest block-aligned prompt prefix seen in an earlier request."""
+        if self.config.prefix_cache_min_tokens is None:
+            return 0
+        words = prompt_text.split()
+        cached_words = 0
+        contiguous = True
+        for end in range(PREFIX_BLOCK_WORDS, len(words) + 1, PREFIX_BLOCK_WORDS):
+            key = hashlib.sha256(' '.join(words[:end]).encode()).digest()
+            if contiguous and key in self._seen_prefixes:
+                cached_words = end
+            else:
+                contiguous = False
+            self._seen_prefixes.add(key)
+        tokens = estimate_tokens(' '.join(words[:cached_words]))
+        if tokens < self.config.prefix_cache_min_tokens:
+            return 0
+        self.stats['cached_tokens'] += tokens
+        return tokens
+
+    def _sample_latency(self, rng: random.Random) -> float:
+        cfg = self.config
+        if cfg.latency_distribution == 'fixed':
+            return cfg.latency_median
+        if cfg.latency_distribution == 'uniform':
+            return rng.uniform(cfg.latency_median * (1 - cfg.latency_sigma), cfg.latency_median * (1 + cfg.latency_sigma))
+        return rng.lognormvariate(0, cfg.latency_sigma) * cfg.latency_median
+
+    async def _sleep(self, seconds: float):
+        self.stats['simulated_seconds'] += seconds
+        if self.config.time_scale > 0:
+            await asyncio.sleep(seconds * self.config.time_scale)
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats)
+
+    async def handle_chat_completion(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        self.stats['requests'] += 1
+        rng = self._request_rng(body)
+
+        roll = rng.random()
+        if roll < self.config.rate_limit_rate:
+            self.stats['rate_limited'] += 1
+            return web.json_response(
+                {'error': {'message': 'Rate limit reached (simulated)', 'type': 'rate_limit_error', 'code': 'rate_limit_exceeded'}},
+                status=429,
+                headers={'retry-after': str(self.config.retry_after)}
+            )
+        if roll < self.config.rate_limit_rate + self.config.server_error_rate:
+            self.stats['server_errors'] += 1
+            await self._sleep(self._sample_latency(rng))
+            status = rng.choice([500, 502, 503])
+            return web.json_response(
+                {'error': {'message': f'Simulated upstream error {status}', 'type': 'server_error'}},
+                status=status
+            )
+
+        prompt_text = prompt_text_of(body)
+        # `n` completions of the same prompt, generated side by side
+        samples = [generate_response_text(prompt_text, rng, body.get('max_tokens'), continued_words(body))
+                   for _ in range(max(1, int(body.get('n') or 1)))]
+        text, finish_reason = samples[0]
+        completion_tokens = estimate_tokens(text)
+        prompt_tokens = estimate_tokens(prompt_text)
+        cached_tokens = self._cached_prompt_tokens(prompt_text)
+
+        if body.get('stream'):
+            return await self._stream_response(request, body, rng, text, finish_reason, prompt_tokens, cached_tokens)
+
+        completion_tokens = sum(estimate_tokens(sample) for sample, _ in samples)
+        longest = max(estimate_tokens(sample) for sample, _ in samples)
+        await self._sleep(self._sample_latency(rng) + longest / self.config.tokens_per_second)
+
+        self.stats['completed'] += 1
+        self.stats['completion_tokens'] += completion_tokens
+        return web.json_response({
+            'id': f"chatcmpl-{uuid.UUID(int=rng.getrandbits(128)).hex}",
+            'object': 'chat.completion',
+            'created': int(time.time()),
+            'model': body.get('model', 'fake-essay-model'),
+            'choices': [{
+                'index': index,
+                'message': {'role': 'assistant', 'content': sample},
+                'finish_reason': sample_finish_reason
+            } for index, (sample, sample_finish_reason) in enumerate(samples)],
+            'usage': {
+                'prompt_tokens': prompt_tokens,
+                'completion_tokens': completion_tokens,
+                'total_tokens': prompt_tokens + completion_tokens,
+                'prompt_tokens_details': {'cached_tokens': cached_tokens}
+            }
+        })
+
+    async def _stream_response(self, request: web.Request, body: Dict, rng: random.Random,
+                               text: str, finish_reason: str, prompt_tokens: int,
+                               cached_tokens: int = 0) -> web.StreamResponse:
+        """Send the essay as server-sent chat.completion.chunk events."""
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache'})
+        await response.prepare(request)
+
+        chunk_id = f"chatcmpl-{uuid.UUID(int=rng.getrandbits(128)).hex}"
+        model = body.get('model', 'fake-essay-model')
+
+        async def send(delta: Dict, finish: Optional[str] = None, usage: Optional[Dict] = None):
+            payload = {
+                'id': chunk_id,
+                'object': 'chat.completion.chunk',
+                'created': int(time.time()),
+                'model': model,
+                'choices': [] if usage else [{'index': 0, 'delta': delta, 'finish_reason': finish}]
+            }
+            if usage:
+                payload['usage'] = usage
+            await response.write(f"data: {json.dumps(payload)}\n\n".encode())
+
+        # Time to first token, then emit a few words at a time at the configured rate
+        await self._sleep(self._sample_latency(rng))
+        pieces = re.findall(r'\S+\s*', text)
+        sent_tokens = 0
+        try:
+            await send({'role': 'assistant', 'content': ''})
+            for i in range(0, len(pieces), 5):
+                piece = ''.join(pieces[i:i + 5])
+                await send({'content': piece})
+                tokens = estimate_tokens(piece) or 1
+                sent_tokens += tokens
+                await self._sleep(tokens / self.config.tokens_per_second)
+            await send({}, finish=finish_reason)
+            if (body.get('stream_options') or {}).get('include_usage'):
+                await send({}, usage={
+                    'prompt_tokens': prompt_tokens,
+                    'completion_tokens': sent_tokens,
+                    'total_tokens': prompt_tokens + sent_tokens,
+                    'prompt_tokens_details': {'cached_tokens': cached_tokens}
+                })
+            await response.write(b"data: [DONE]\n\n")
+            await response.write_eof()
+        except (ConnectionResetError, asyncio.CancelledError):
+            # Client stopped reading, e.g. the length governor cut the stream
+            self.stats['cancelled_streams'] += 1
+            self.stats['completion_tokens'] += sent_tokens
+            return response
+
+        self.stats['completed'] += 1
+        self.stats['completion_tokens'] += sent_tokens
+        return response
+
+    def _batch_completion(self, body: Dict) -> Optional[Dict]:
+        """Complete one batched request without delay; None for an injected failure."""
+        self.stats['batch_requests'] += 1
+        rng = self._request_rng(body)
+        if rng.random() < self.config.server_error_rate:
+            self.stats['server_errors'] += 1
+            return None
+        prompt_text = prompt_text_of(body)
+        text, finish_reason = generate_response_text(prompt_text, rng, body.get('max_tokens'), continued_words(body))
+        completion_tokens = estimate_tokens(text)
+        self.stats['completed'] += 1
+        self.stats['completion_tokens'] += completion_tokens
+        return {
+            'id': uuid.UUID(int=rng.getrandbits(128)).hex,
+            'text': text,
+            'finish_reason': finish_reason,
+            'prompt_tokens': estimate_tokens(prompt_text),
+            'cached_tokens': self._cached_prompt_tokens(prompt_text),
+            'completion_tokens': completion_tokens
+        }
+
+    def _new_batch(self, batch: Dict) -> Dict:
+        self.stats['batches'] += 1
+        batch['_ready_at'] = time.monotonic() + self.config.batch_delay * self.config.time_scale
+        self.stats['simulated_seconds'] += self.config.batch_delay
+        self._batches[batch['id']] = batch
+        return batch
+
+    def _batch_ready(self, batch: Dict) -> bool:
+        return time.monotonic() >= batch['_ready_at']
+
+    @staticmethod
+    def _public(batch: Dict) -> Dict:
+        return {k: v for k, v in batch.items() if not k.startswith('_')}
+
+    async def handle_file_upload(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        upload = form.get('file')
+        if upload is None:
+            return web.json_response({'error': {'message': 'Missing file'}}, status=400)
+        content = upload.file.read().decode()
+        file_id = f"file-{uuid.uuid4().hex}"
+        self._files[file_id] = content
+        return web.json_response({
+            'id': file_id,
+            'object': 'file',
+            'bytes': len(content),
+            'created_at': int(time.time()),
+            'filename': upload.filename,
+            'purpose': form.get('purpose', 'batch')
+        })
+
+    async def handle_file_content(self, request: web.Request) -> web.Response:
+        content = self._files.get(request.match_info['file_id'])
+        if content is None:
+            return web.json_response({'error': {'message': 'No such file'}}, status=404)
+        return web.Response(text=content, content_type='application/jsonl')
+
+    async def handle_openai_batch_create(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        content = self._files.get(body.get('input_file_id'))
+        if content is None:
+            return web.json_response({'error': {'message': 'No such input file'}}, status=404)
+        lines = [json.loads(line) for line in content.splitlines() if line.strip()]
+        batch = self._new_batch({
+            'id': f"batch_{uuid.uuid4().hex}",
+            'object': 'batch',
+            'endpoint': body.get('endpoint'),
+            'input_file_id': body['input_file_id'],
+            'completion_window': body.get('completion_window', '24h'),
+            'status': 'in_progress',
+            'created_at': int(time.time()),
+            'output_file_id': None,
+            'error_file_id': None,
+            'request_counts': {'total': len(lines), 'completed': 0, 'failed': 0},
+            '_lines': lines
+        })
+        return web.json_response(self._public(batch))
+
+    async def handle_openai_batch_get(self, request: web.Request) -> web.Response:
+        batch = self._batches.get(request.match_info['batch_id'])
+        if batch is None:
+            return web.json_response({'error': {'message': 'No such batch'}}, status=404)
+        if batch['status'] == 'in_progress' and self._batch_ready(batch):
+            self._finish_openai_batch(batch)
+        return web.json_response(self._public(batch))
+
+    def _finish_openai_batch(self, batch: Dict):
+        outputs, errors = [], []
+        for line in batch['_lines']:
+            body = line.get('body', {})
+            result = self._batch_completion(body)
+            if result is None:
+                errors.append({
+                    'id': f"batch_req_{uuid.uuid4().hex}",
+                    'custom_id': line['custom_id'],
+                    'response': {'status_code': 500, 'body': {'error': {'message': 'Simulated upstream error'}}},
+                    'error': None
+                })
+                continue
+            outputs.append({
+                'id': f"batch_req_{result['id']}",
+                'custom_id': line['custom_id'],
+                'response': {
+                    'status_code': 200,
+                    'body': {
+                        'id': f"chatcmpl-{result['id']}",
+                        'object': 'chat.completion',
+                        'model': body.get('model', 'fake-essay-model'),
+                        'choices': [{
+                            'index': 0,
+                            'message': {'role': 'assistant', 'content': result['text']},
+                            'finish_reason': result['finish_reason']
+                        }],
+                        'usage': {
+                            'prompt_tokens': result['prompt_tokens'],
+                            'completion_tokens': result['completion_tokens'],
+                            'total_tokens': result['prompt_tokens'] + result['completion_tokens'],
+                            'prompt_tokens_details': {'cached_tokens': result['cached_tokens']}
+                        }
+                    }
+                },
+                'error': None
+            })
+
+        for key, rows in (('output_file_id', outputs), ('error_file_id', errors)):
+            if rows:
+                file_id = f"file-{uuid.uuid4().hex}"
+                self._files[file_id] = '\n'.join(json.dumps(row) for row in rows)
+                batch[key] = file_id
+        batch['request_counts'] = {'total': len(batch['_lines']), 'completed': len(outputs), 'failed': len(errors)}
+        batch['status'] = 'completed'
+        batch['completed_at'] = int(time.time())
+
+    async def handle_anthropic_batch_create(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        requests = body.get('requests', [])
+        batch = self._new_batch({
+            'id': f"msgbatch_{uuid.uuid4().hex}",
+            'type': 'message_batch',
+            'processing_status': 'in_progress',
+            'request_counts': {'processing': len(requests), 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0},
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'results_url': None,
+            '_requests': requests
+        })
+        return web.json_response(self._public(batch))
+
+    async def handle_anthropic_batch_get(self, request: web.Request) -> web.Response:
+        batch = self._batches.get(request.match_info['batch_id'])
+        if batch is None:
+            return web.json_response({'error': {'type': 'not_found_error', 'message': 'No such batch'}}, status=404)
+        if batch['processing_status'] == 'in_progress' and self._batch_ready(batch):
+            self._finish_anthropic_batch(batch, f"{request.url.origin()}/v1/messages/batches/{batch['id']}/results")
+        return web.json_response(self._public(batch))
+
+    def _finish_anthropic_batch(self, batch: Dict, results_url: str):
+        results = []
+        counts = {'processing': 0, 'succeeded': 0, 'errored': 0, 'canceled': 0, 'expired': 0}
+        for item in batch['_requests']:
+            params = item.get('params', {})
+            result = self._batch_completion(params)
+            if result is None:
+                counts['errored'] += 1
+                results.append({'custom_id': item['custom_id'], 'result': {
+                    'type': 'errored',
+                    'error': {'type': 'api_error', 'message': 'Simulated upstream error'}
+                }})
+                continue
+            counts['succeeded'] += 1
+            results.append({'custom_id': item['custom_id'], 'result': {
+                'type': 'succeeded',
+                'message': {
+                    'id': f"msg_{result['id']}",
+                    'type': 'message',
+                    'role': 'assistant',
+                    'model': params.get('model', 'fake-essay-model'),
+                    'content': [{'type': 'text', 'text': result['text']}],
+                    'stop_reason': 'max_tokens' if result['finish_reason'] == 'length' else 'end_turn',
+                    'usage': {
+                        'input_tokens': result['prompt_tokens'] - result['cached_tokens'],
+                        'cache_read_input_tokens': result['cached_tokens'],
+                        'output_tokens': result['completion_tokens']
+                    }
+                }
+            }})
+        batch['_results'] = '\n'.join(json.dumps(row) for row in results)
+        batch['request_counts'] = counts
+        batch['processing_status'] = 'ended'
+        batch['ended_at'] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+        batch['results_url'] = results_url
+
+    async def handle_anthropic_batch_results(self, request: web.Request) -> web.Response:
+        batch = self._batches.get(request.match_info['batch_id'])
+        if batch is None or '_results' not in batch:
+            return web.json_response({'error': {'type': 'not_found_error', 'message': 'Results not available'}}, status=404)
+        return web.Response(text=batch['_results'], content_type='application/jsonl')
+
+
+def message_text(content) -> str:
+    """Text of a message whose content is a string or a list of content blocks."""
+    if isinstance(content, list):
+        return ' '.join(str(block.get('text', '')) for block in content if isinstance(block, dict))
+    return str(content or '')
+
+
+def prompt_text_of(body: Dict) -> str:
+    """All prompt text in a chat-completions or Anthropic messages request body."""
+    parts = [message_text(body['system'])] if body.get('system') else []
+    parts.extend(message_text(m.get('content', '')) for m in body.get('messages', []))
+    return ' '.join(parts)
+
+
+def continued_words(body: Dict) -> int:
+    """Words of essay already written, for a continuation request that carries its partial essay."""
+    return sum(len(message_text(m.get('content', '')).split())
+               for m in body.get('messages', []) if m.get('role') == 'assistant')
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text.split()) * 1.3)
+
+
+def target_word_count(prompt: str, rng: random.Random) -> int:
+    """Pick a length from an 'approximately X-Y words' instruction, if present."""
+    match = re.search(r'(\d+)\s*-\s*(\d+)\s*words', prompt)
+    if match:
+        low, high = int(match.group(1)), int(match.group(2))
+    else:
+        low, high = 750, 1000
+    # Some responses overshoot the target, like real long-winded models do
+    return int(rng.uniform(low, high * 1.3))
+
+
+def generate_essay_text(prompt: str, rng: random.Random, max_tokens: Optional[int] = None,
+                        already_written: int = 0):
+    """Deterministic essay-shaped text; returns (text, finish_reason).
+
+    A continuation only writes the rest of the target length.
+    """
+    num_words = target_word_count(prompt, rng)
+    if already_written:
+        num_words = max(60, num_words - already_written)
+    finish_reason = 'stop'
+    if max_tokens and num_words * 1.3 > max_tokens:
+        num_words = int(max_tokens / 1.3)
+        finish_reason = 'length'
+
+    paragraphs: List[str] = []
+    remaining = num_words
+    while remaining > 0:
+        size = min(remaining, rng.randint(90, 160))
+        sentences = []
+        left = size
+        while left > 0:
+            length = min(left, rng.randint(8, 22))
+            words = [rng.choice(WORDS) for _ in range(length)]
+            sentences.append(' '.join(words).capitalize() + '.')
+            left -= length
+        paragraphs.append(' '.join(sentences))
+        remaining -= size
+
+    text = '\n\n'.join(paragraphs)
+    if finish_reason == 'length':
+        # Cut mid-sentence like a real truncation
+        text = text.rstrip('.')
+    return text, finish_reason
+
+
+def generate_response_text(prompt: str, rng: random.Random, max_tokens: Optional[int] = None,
+                           already_written: int = 0):
+    """Essay text, or a JSON array of essays for a packed multi-essay prompt."""
+    match = PACKED_PATTERN.search(prompt)
+    if not match:
+        return generate_essay_text(prompt, rng, max_tokens, already_written)
+
+    count = int(match.group(1))
+    per_essay = max_tokens // count if max_tokens else None
+    essays = [generate_essay_text(prompt, rng, per_essay) for _ in range(count)]
+    text = json.dumps([{'essay': i, 'text': essay} for i, (essay, _) in enumerate(essays, 1)])
+    if any(reason == 'length' for _, reason in essays):
+        # Out of tokens part way through the array
+        return text[:int(len(text) * 0.9)], 'length'
+    return text, 'stop'
+
+
+async def serve(host: str, port: int, config: FakeProviderConfig):
+    server = FakeProviderServer(config)
+    base_url = await server.start(host, port)
+    print(f"Fake provider listening at {base_url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a deterministic fake OpenAI-compatible provider')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--latency-distribution', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-median', type=float, default=0.5, help='Median base latency in seconds')
+    parser.add_argument('--latency-sigma', type=float, default=0.5, help='Spread of the latency distribution')
+    parser.add_argument('--tokens-per-second', type=float, default=400.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of requests answered with 429')
+    parser.add_argument('--server-error-rate', type=float, default=0.0, help='Fraction of requests answered with 5xx')
+    parser.add_argument('--retry-after', type=float, default=1.0, help='retry-after header on 429s')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-scale', type=float, default=1.0, help='Multiplier on all simulated delays')
+    parser.add_argument('--batch-delay', type=float, default=2.0, help='Seconds until a submitted batch finishes')
+    parser.add_argument('--prefix-cache-min-tokens', type=int, default=1024,
+                        help='Shortest prompt prefix reported as cached')
+    args = parser.parse_args()
+
+    config = FakeProviderConfig(
+        latency_distribution=args.latency_distribution,
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        time_scale=args.time_scale,
+        batch_delay=args.batch_delay,
+        prefix_cache_min_tokens=args.prefix_cache_min_tokens
+    )
+    try:
+        asyncio.run(serve(args.host, args.port, config))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
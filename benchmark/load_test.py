@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Offline load test: drive EssayGenerator and LLMManager against the fake provider.
+
+Example (10k essays across three fake models, delays scaled down 10x):
+
+    python -m benchmark.load_test --essays 10000 --models 3 --workers 200 \\
+        --time-scale 0.1 --rate-limit-rate 0.02 --server-error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import tempfile
+import time
+from pathlib import Path
+
+import litellm
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer
+from database.manager import DatabaseManager
+from generation import llm_manager
+from generation.generator import EssayGenerator
+
+SEED_ANGLES = [
+    "current debates", "controversial aspects", "future implications", "historical context",
+    "economic impacts", "social justice perspectives", "technological aspects",
+    "environmental considerations", "cultural differences", "ethical dilemmas"
+]
+
+
+def build_seeds(topic: str):
+    return [
+        {
+            'id': i + 1,
+            'angle': f"{angle} of {topic}",
+            'topic': topic,
+            'facts': [f"Fact {j} about {angle}" for j in range(5)],
+            'quotes': [f"Expert quote {j} on {angle}" for j in range(3)],
+            'sources': [f"Source {j} for {angle}" for j in range(3)]
+        }
+        for i, angle in enumerate(SEED_ANGLES)
+    ]
+
+
+class CompletionTimer:
+    """Wrap litellm's acompletion to time each HTTP round trip on the client.
+
+    Limiter waits, backoff sleeps and retry delays happen outside the call,
+    so they are not counted.
+    """
+
+    def __init__(self, acompletion):
+        self._acompletion = acompletion
+        self.calls = 0
+        self.seconds = 0.0
+
+    async def __call__(self, **kwargs):
+        start = time.monotonic()
+        try:
+            return await self._acompletion(**kwargs)
+        finally:
+            self.calls += 1
+            self.seconds += time.monotonic() - start
+
+
+def build_models(api_base: str, num_models: int):
+    return [
+        {
+            'model': f"openai/fake-essay-model-{i}",
+            'name': f"Fake Model {i}",
+            'provider': f"fake_{i}",
+            'temperature': 0.8,
+            'api_base': api_base,
+            'api_key': 'fake-key'
+        }
+        for i in range(num_models)
+    ]
+
+
+async def run_load_test(args) -> dict:
+    config = FakeProviderConfig(
+        latency_distribution=args.latency_distribution,
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        time_scale=args.time_scale
+    )
+    server = FakeProviderServer(config)
+    api_base = args.api_base or await server.start()
+
+    models = build_models(api_base, args.models)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseManager(str(Path(tmp) / "load_test.db"))
+        generator = EssayGenerator(models, db)
+        litellm.set_verbose = False
+        litellm.suppress_debug_info = True
+
+        num_combinations = math.ceil(args.essays / args.models)
+        combinations = generator.diversity_manager.generate_combinations(build_seeds(args.topic), num_combinations)
+
+        timer = CompletionTimer(llm_manager.acompletion)
+        llm_manager.acompletion = timer
+        start = time.monotonic()
+        try:
+            essays = await generator.generate_essays(
+                combinations,
+                batch_size=args.batch_size,
+                pipelined=args.mode == 'pipelined',
+                num_workers=args.workers
+            )
+        finally:
+            llm_manager.acompletion = timer._acompletion
+        wall = time.monotonic() - start
+
+    if not args.api_base:
+        await server.stop()
+
+    report = {
+        'mode': args.mode,
+        'requested_essays': num_combinations * args.models,
+        'delivered_essays': len(essays),
+        'wall_seconds': round(wall, 2),
+        'essays_per_minute': round(len(essays) / wall * 60, 1) if wall else 0.0,
+        'server': server.stats if not args.api_base else None,
+        'backoff_status': generator.llm_manager.get_backoff_status()
+    }
+    if generator.pipeline_stats is not None:
+        report['pipeline'] = generator.pipeline_stats.to_dict()
+
+    if not args.api_base and timer.calls:
+        # Time inside acompletion beyond what the server spent simulating latency:
+        # litellm request building, HTTP and response parsing, without limiter or retry waits.
+        # Under concurrency it includes queueing on the event loop, which the in-process server shares
+        scaled_server_seconds = server.stats['simulated_seconds'] * args.time_scale
+        report['client_overhead_ms_per_request'] = round(
+            max(0.0, timer.seconds - scaled_server_seconds) / timer.calls * 1000, 2
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the generation pipeline against a fake provider')
+    parser.add_argument('--essays', type=int, default=1000, help='Total essays to request')
+    parser.add_argument('--models', type=int, default=3, help='Number of fake models')
+    parser.add_argument('--mode', choices=['pipelined', 'batch'], default='pipelined')
+    parser.add_argument('--workers', type=int, default=100, help='Workers in pipelined mode')
+    parser.add_argument('--batch-size', type=int, default=5, help='Combinations per batch in batch mode')
+    parser.add_argument('--topic', default='generative AI in creative industries')
+    parser.add_argument('--api-base', help='Use an already running fake provider instead of starting one')
+    parser.add_argument('--latency-distribution', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--latency-median', type=float, default=0.5)
+    parser.add_argument('--latency-sigma', type=float, default=0.5)
+    parser.add_argument('--tokens-per-second', type=float, default=400.0)
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    parser.add_argument('--server-error-rate', type=float, default=0.0)
+    parser.add_argument('--retry-after', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-scale', type=float, default=0.1)
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger('aiohttp.access').setLevel(logging.WARNING)
+
+    report = asyncio.run(run_load_test(args))
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
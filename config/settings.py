@@ -24,10 +24,75 @@ class Settings:
         # Model configurations
         self.models = self.config.get("models", [])
         
+        # Per-provider request/token limits, keyed by model `provider`
+        self.rate_limits = self.config.get("rate_limits", {})
+        
+        # Several API keys and/or endpoints per provider
+        self.credential_pools = self.config.get("credential_pools", {})
+        
+        # Pacing from x-ratelimit-* / anthropic-ratelimit-* response headers
+        self.header_pacing = self.config.get("header_pacing", {})
+        
+        # Adaptive (AIMD) in-flight limit per model
+        self.concurrency = self.config.get("concurrency", {})
+        
+        # Warm start of limiters and concurrency from limits learned by earlier runs
+        self.learned_limits = self.config.get("learned_limits", {})
+        
+        # On-disk LLM response cache
+        self.response_cache = self.config.get("response_cache", {})
+        
+        # Streaming completions and length governor
+        self.streaming = self.config.get("streaming", {})
+        
+        # Hedged requests for slow calls
+        self.hedging = self.config.get("hedging", {})
+        
+        # Per-provider circuit breakers
+        self.circuit_breaker = self.config.get("circuit_breaker", {})
+        
+        # Per-run token/cost budget
+        self.budget = self.config.get("budget", {})
+        
+        # Provider batch-API execution mode
+        self.batch_api = self.config.get("batch_api", {})
+        
+        # Provider prompt caching and seed-grouped dispatch
+        self.prompt_caching = self.config.get("prompt_caching", {})
+        
+        # Retry classification, delays and run-wide retry budget
+        self.retry = self.config.get("retry", {})
+        
+        # Connect/read timeouts per request and a deadline per job
+        self.timeouts = self.config.get("timeouts", {})
+        
+        # Offline prompt token counting and per-request max_tokens
+        self.token_sizing = self.config.get("token_sizing", {})
+        
+        # Continuation of essays truncated at max_tokens
+        self.continuation = self.config.get("continuation", {})
+        
+        # Multi-essay-per-request packing
+        self.packing = self.config.get("packing", {})
+        
+        # Several drafts per prompt from one request (`n`), optionally at several temperatures
+        self.sampling = self.config.get("sampling", {})
+        
+        # Throughput- and cost-aware routing of combinations to models
+        self.routing = self.config.get("routing", {})
+        
+        # Optional wall-clock budget for a run (--time-budget)
+        self.deadline = self.config.get("deadline", {})
+        
+        # Stratified dispatch order across stance, grade, seed and model
+        self.stratification = self.config.get("stratification", {})
+        
         # Generation settings
         self.default_num_essays = self.config.get("generation", {}).get("default_num_essays", 60)
         self.batch_size = self.config.get("generation", {}).get("batch_size", 5)
         self.base_max_tokens = self.config.get("generation", {}).get("base_max_tokens", 1500)
+        self.pipelined = self.config.get("generation", {}).get("pipelined", False)
+        self.num_workers = self.config.get("generation", {}).get("num_workers", 10)
         
     def _load_config(self) -> Dict:
         if not os.path.exists(self.config_path):
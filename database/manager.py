@@ -1,6 +1,7 @@
+import json
 import os
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 from contextlib import contextmanager
 
 from sqlalchemy import create_engine
@@ -9,7 +10,7 @@ from sqlalchemy.exc import SQLAlchemyError
 
 from database.schema import (
     Base, ResearchSeed, Stance, Persona, EvidencePattern,
-    StyleParameter, QualityLevel, Essay, GenerationRun, Prompt, PersonaUsage
+    StyleParameter, QualityLevel, Essay, GenerationRun, Prompt, PersonaUsage, RunPlan, ProviderLimit
 )
 
 class DatabaseManager:
@@ -138,7 +139,17 @@ class DatabaseManager:
                 model_name=essay_data['model_name'],
                 temperature=essay_data['temperature'],
                 prompt_hash=essay_data['prompt_hash'],
-                prompt_id=essay_data.get('prompt_id')  # Add prompt_id if provided
+                prompt_id=essay_data.get('prompt_id'),  # Add prompt_id if provided
+                run_id=run_id,
+                combination_id=essay_data.get('combination_id'),
+                sample_index=essay_data.get('sample_index'),
+                prompt_tokens=essay_data.get('prompt_tokens'),
+                completion_tokens=essay_data.get('completion_tokens'),
+                reasoning_tokens=essay_data.get('reasoning_tokens'),
+                cached_tokens=essay_data.get('cached_tokens'),
+                finish_reason=essay_data.get('finish_reason'),
+                attempts=essay_data.get('attempts'),
+                cost_usd=essay_data.get('cost_usd')
             )
             session.add(essay)
             session.flush()  # Ensure essay gets an ID
@@ -171,17 +182,117 @@ class DatabaseManager:
     
     def save_generation_run(self, run_id: str, main_topic: str, 
                           total_essays: int, duration_seconds: float, 
-                          config: Optional[Dict] = None):
+                          config: Optional[Dict] = None, usage: Optional[Dict] = None,
+                          status: str = 'completed'):
+        """Create or update the run record; runs are first saved as 'running' when they start."""
+        totals = (usage or {}).get('totals', {})
         with self.get_session() as session:
-            run = GenerationRun(
-                run_id=run_id,
-                main_topic=main_topic,
-                config=config or {},
-                total_essays=total_essays,
-                duration_seconds=duration_seconds,
-                created_at=datetime.now()
-            )
-            session.add(run)
+            run = session.query(GenerationRun).filter_by(run_id=run_id).first()
+            if run is None:
+                run = GenerationRun(run_id=run_id, created_at=datetime.now())
+                session.add(run)
+            run.main_topic = main_topic
+            run.config = config or {}
+            run.total_essays = total_essays
+            run.duration_seconds = duration_seconds
+            run.status = status
+            run.total_prompt_tokens = totals.get('prompt_tokens')
+            run.total_completion_tokens = totals.get('completion_tokens')
+            run.total_reasoning_tokens = totals.get('reasoning_tokens')
+            run.total_cached_tokens = totals.get('cached_tokens')
+            run.total_cost_usd = totals.get('cost_usd')
+            run.usage = usage
+    
+    def get_generation_run(self, run_id: str) -> Optional[GenerationRun]:
+        with self.get_session() as session:
+            return session.query(GenerationRun).filter_by(run_id=run_id).first()
+    
+    def save_provider_limits(self, run_id: str, limits: Dict[str, Dict]):
+        """Create or update the learned limits of each provider."""
+        with self.get_session() as session:
+            for provider, learned in limits.items():
+                record = session.query(ProviderLimit).filter_by(provider=provider).first()
+                if record is None:
+                    record = ProviderLimit(provider=provider)
+                    session.add(record)
+                record.run_id = run_id
+                record.requests_per_minute = learned.get('requests_per_minute')
+                record.tokens_per_minute = learned.get('tokens_per_minute')
+                record.rate_limited = learned.get('rate_limited', False)
+                record.latency_p50 = learned.get('latency_p50')
+                record.latency_p95 = learned.get('latency_p95')
+                record.concurrency = learned.get('concurrency') or {}
+                record.updated_at = datetime.now()
+    
+    def get_provider_limits(self) -> Dict[str, Dict]:
+        """Learned limits per provider, with the time each was last updated."""
+        with self.get_session() as session:
+            return {
+                record.provider: {
+                    'requests_per_minute': record.requests_per_minute,
+                    'tokens_per_minute': record.tokens_per_minute,
+                    'rate_limited': bool(record.rate_limited),
+                    'latency_p50': record.latency_p50,
+                    'latency_p95': record.latency_p95,
+                    'concurrency': record.concurrency or {},
+                    'updated_at': record.updated_at
+                }
+                for record in session.query(ProviderLimit).all()
+            }
+    
+    def save_run_plan(self, run_id: str, combinations: List[Dict]):
+        """Persist a run's combinations so it can be resumed after a crash."""
+        with self.get_session() as session:
+            for combo in combinations:
+                session.add(RunPlan(
+                    run_id=run_id,
+                    combination_id=combo['combination_id'],
+                    # Round-trip through JSON so non-serializable values (datetimes) become strings
+                    combination=json.loads(json.dumps(combo, default=str)),
+                    created_at=datetime.now()
+                ))
+    
+    def get_run_plan(self, run_id: str) -> List[Dict]:
+        with self.get_session() as session:
+            plans = session.query(RunPlan).filter_by(run_id=run_id).order_by(RunPlan.id).all()
+            return [plan.combination for plan in plans]
+    
+    def get_completed_jobs(self, run_id: str) -> Set[Tuple[str, str]]:
+        """(combination_id, model_name) pairs that already have a saved essay."""
+        with self.get_session() as session:
+            rows = session.query(Essay.combination_id, Essay.model_name).filter_by(run_id=run_id).all()
+            return {(combination_id, model_name) for combination_id, model_name in rows}
+    
+    def get_run_essays(self, run_id: str) -> List[Dict]:
+        """Saved essays of a run as essay dicts, with their combination as metadata."""
+        plan = {combo['combination_id']: combo for combo in self.get_run_plan(run_id)}
+        with self.get_session() as session:
+            essays = session.query(Essay).filter_by(run_id=run_id).order_by(Essay.id).all()
+            return [
+                {
+                    'content': essay.content,
+                    'model_name': essay.model_name,
+                    'temperature': essay.temperature,
+                    'prompt_hash': essay.prompt_hash,
+                    'prompt_id': essay.prompt_id,
+                    'combination_id': essay.combination_id,
+                    'seed_id': essay.seed_id,
+                    'stance_id': essay.stance_id,
+                    'persona_id': essay.persona_id,
+                    'evidence_id': essay.evidence_id,
+                    'style_id': essay.style_id,
+                    'quality_id': essay.quality_id,
+                    'prompt_tokens': essay.prompt_tokens,
+                    'completion_tokens': essay.completion_tokens,
+                    'reasoning_tokens': essay.reasoning_tokens,
+                    'cached_tokens': essay.cached_tokens,
+                    'finish_reason': essay.finish_reason,
+                    'attempts': essay.attempts,
+                    'cost_usd': essay.cost_usd,
+                    'metadata': plan.get(essay.combination_id, {})
+                }
+                for essay in essays
+            ]
     
     def save_prompt(self, base_prompt: str, modulated_prompt: str, metadata: Dict, prompt_hash: str) -> Prompt:
         with self.get_session() as session:
@@ -12,6 +12,40 @@ from database.schema import Base, Prompt
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns added after the original schema: {table: [(name, sqlite type)]}
+ADDED_COLUMNS = {
+    'essays': [
+        ('run_id', 'VARCHAR(36)'),
+        ('combination_id', 'VARCHAR(20)'),
+        ('prompt_tokens', 'INTEGER'),
+        ('completion_tokens', 'INTEGER'),
+        ('reasoning_tokens', 'INTEGER'),
+        ('cached_tokens', 'INTEGER'),
+        ('finish_reason', 'VARCHAR(20)'),
+        ('attempts', 'INTEGER'),
+        ('cost_usd', 'FLOAT'),
+        ('sample_index', 'INTEGER'),
+    ],
+    'generation_runs': [
+        ('status', 'VARCHAR(20)'),
+        ('total_prompt_tokens', 'INTEGER'),
+        ('total_completion_tokens', 'INTEGER'),
+        ('total_reasoning_tokens', 'INTEGER'),
+        ('total_cached_tokens', 'INTEGER'),
+        ('total_cost_usd', 'FLOAT'),
+        ('usage', 'JSON'),
+    ],
+}
+
+def add_missing_columns(conn, table: str, columns):
+    """ALTER TABLE in any of `columns` the existing table does not have yet."""
+    existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+    for name, column_type in columns:
+        if name not in existing:
+            logger.info(f"Adding {name} column to {table} table...")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}"))
+    conn.commit()
+
 def migrate_database(db_path: str = "synthetic_essays.db"):
     """Migrate database to add Prompt table and link existing essays."""
     
@@ -42,6 +76,9 @@ def migrate_database(db_path: str = "synthetic_essays.db"):
                 logger.info("Added prompt_id column successfully")
             else:
                 logger.info("prompt_id column already exists")
+            
+            for table, columns in ADDED_COLUMNS.items():
+                add_missing_columns(conn, table, columns)
         
         # Migrate existing essays by creating generic prompt records
         with Session() as session:
@@ -108,6 +108,22 @@ class Essay(Base):
     temperature = Column(Float)
     prompt_hash = Column(String(64))
     
+    # Run membership, so interrupted runs can be resumed
+    run_id = Column(String(36), index=True)
+    combination_id = Column(String(20))
+    
+    # Draft number among the completions sampled for the same prompt and model
+    sample_index = Column(Integer)
+    
+    # Token usage across all API attempts for this essay, including failed retries
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    reasoning_tokens = Column(Integer)
+    cached_tokens = Column(Integer)
+    finish_reason = Column(String(20))
+    attempts = Column(Integer)
+    cost_usd = Column(Float)
+    
     # Relationships
     seed = relationship("ResearchSeed", back_populates="essays")
     stance = relationship("Stance", back_populates="essays")
@@ -127,6 +143,40 @@ class GenerationRun(Base):
     total_essays = Column(Integer)
     duration_seconds = Column(Float)
     created_at = Column(DateTime)
+    status = Column(String(20))  # running, completed, or partial (time budget reached)
+    
+    # Run-wide token usage and cost, with a per-model breakdown in `usage`
+    total_prompt_tokens = Column(Integer)
+    total_completion_tokens = Column(Integer)
+    total_reasoning_tokens = Column(Integer)
+    total_cached_tokens = Column(Integer)
+    total_cost_usd = Column(Float)
+    usage = Column(JSON)
+
+class ProviderLimit(Base):
+    """Limits learned for one provider, updated at the end of every run."""
+    __tablename__ = 'provider_limits'
+    
+    id = Column(Integer, primary_key=True)
+    provider = Column(String(50), unique=True)
+    run_id = Column(String(36))  # Run that last updated the record
+    requests_per_minute = Column(Float)
+    tokens_per_minute = Column(Float)
+    rate_limited = Column(Boolean)  # True if the rates are a ceiling hit by a rate limit
+    latency_p50 = Column(Float)
+    latency_p95 = Column(Float)
+    concurrency = Column(JSON)  # {model_name: in-flight limit at the end of the run}
+    updated_at = Column(DateTime)
+
+class RunPlan(Base):
+    """One planned diversity combination of a generation run."""
+    __tablename__ = 'run_plans'
+    
+    id = Column(Integer, primary_key=True)
+    run_id = Column(String(36), index=True)
+    combination_id = Column(String(20))
+    combination = Column(JSON)
+    created_at = Column(DateTime)
 
 class PersonaUsage(Base):
     __tablename__ = 'persona_usage'
@@ -90,10 +90,9 @@ Write ONLY the essay text itself. Do not include any meta-commentary, titles, or
 
 The essay should be approximately 750-1000 words."""
         
-        # Create modulated prompt (base + diversity components)
-        modulated_prompt = f"""{base_prompt}
-
-{stance_prompt}
+        # Per-essay diversity components, kept after the seed-level base prompt
+        # so every prompt for a seed shares a cacheable prefix
+        diversity_prompt = f"""{stance_prompt}
 
 {persona_prompt}
 
@@ -103,6 +102,11 @@ The essay should be approximately 750-1000 words."""
 
 {quality_prompt}"""
         
+        # Create modulated prompt (base + diversity components)
+        modulated_prompt = f"""{base_prompt}
+
+{diversity_prompt}"""
+        
         # Create prompt metadata
         prompt_metadata = {
             'stance': stance_prompt,
@@ -115,6 +119,7 @@ The essay should be approximately 750-1000 words."""
         return {
             'prompt': modulated_prompt,  # The full prompt for the LLM
             'base_prompt': base_prompt,  # The base prompt without diversity
+            'diversity_prompt': diversity_prompt,  # The per-essay suffix after the base prompt
             'prompt_metadata': prompt_metadata,  # Breakdown of diversity components
             'metadata': combination  # Original combination data
         }
@@ -0,0 +1,442 @@
+"""
+Batch-API execution: submit compiled prompts as provider batch jobs instead of live calls.
+
+OpenAI-format models go through the Files + Batches API (one JSONL file of
+/v1/chat/completions requests per model); Anthropic models go through the
+Message Batches API. Models without a batch API, and requests a batch fails,
+fall back to the interactive `LLMManager.dispatch` path.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+import aiohttp
+
+from .token_calculator import estimate_request_tokens
+from .usage import call_cost, empty_usage, add_call
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_API_BASES = {
+    'openai': 'https://api.openai.com/v1',
+    'anthropic': 'https://api.anthropic.com/v1'
+}
+API_KEY_ENV = {
+    'openai': 'OPENAI_API_KEY',
+    'anthropic': 'ANTHROPIC_API_KEY'
+}
+ANTHROPIC_VERSION = '2023-06-01'
+OPENAI_TERMINAL_STATES = ('completed', 'failed', 'expired', 'cancelled')
+
+
+class BatchJobError(Exception):
+    """Raised when a provider batch cannot be submitted or ends without results."""
+
+
+def batch_format(model_config: Dict) -> Optional[str]:
+    """'openai' or 'anthropic' from the litellm model prefix, or None if unsupported."""
+    prefix = model_config['model'].split('/', 1)[0]
+    return prefix if prefix in DEFAULT_API_BASES else None
+
+
+def provider_model_name(model_config: Dict) -> str:
+    """Strip the litellm provider prefix, e.g. openai/gpt-4o -> gpt-4o."""
+    return model_config['model'].split('/', 1)[-1]
+
+
+def build_openai_line(custom_id: str, model_config: Dict, messages: List[Dict], max_tokens: int) -> Dict:
+    return {
+        'custom_id': custom_id,
+        'method': 'POST',
+        'url': '/v1/chat/completions',
+        'body': {
+            'model': provider_model_name(model_config),
+            'messages': messages,
+            'temperature': model_config.get('temperature', 0.8),
+            'max_tokens': max_tokens
+        }
+    }
+
+
+def build_anthropic_request(custom_id: str, model_config: Dict, messages: List[Dict], max_tokens: int) -> Dict:
+    system = [m['content'] for m in messages if m['role'] == 'system']
+    params = {
+        'model': provider_model_name(model_config),
+        'max_tokens': max_tokens,
+        'temperature': model_config.get('temperature', 0.8),
+        'messages': [m for m in messages if m['role'] != 'system']
+    }
+    if system:
+        params['system'] = system[0]
+    return {'custom_id': custom_id, 'params': params}
+
+
+def parse_openai_result(line: Dict) -> Tuple[Optional[str], Optional[Dict]]:
+    """(content, usage) from one line of an OpenAI batch output file."""
+    response = line.get('response') or {}
+    if line.get('error') or response.get('status_code') != 200:
+        return None, None
+    body = response['body']
+    choice = body['choices'][0]
+    usage = body.get('usage') or {}
+    details = usage.get('completion_tokens_details') or {}
+    prompt_details = usage.get('prompt_tokens_details') or {}
+    return choice['message'].get('content'), {
+        'prompt_tokens': usage.get('prompt_tokens', 0),
+        'completion_tokens': usage.get('completion_tokens', 0),
+        'reasoning_tokens': details.get('reasoning_tokens') or 0,
+        'cached_tokens': prompt_details.get('cached_tokens') or 0,
+        'finish_reason': choice.get('finish_reason')
+    }
+
+
+def parse_anthropic_result(line: Dict) -> Tuple[Optional[str], Optional[Dict]]:
+    """(content, usage) from one line of an Anthropic batch results file."""
+    result = line.get('result') or {}
+    if result.get('type') != 'succeeded':
+        return None, None
+    message = result['message']
+    text = ''.join(block.get('text', '') for block in message.get('content', []) if block.get('type') == 'text')
+    usage = message.get('usage') or {}
+    stop_reason = message.get('stop_reason')
+    cache_read = usage.get('cache_read_input_tokens') or 0
+    cache_write = usage.get('cache_creation_input_tokens') or 0
+    return text or None, {
+        # input_tokens excludes cache reads and writes; count them all as prompt
+        'prompt_tokens': usage.get('input_tokens', 0) + cache_read + cache_write,
+        'completion_tokens': usage.get('output_tokens', 0),
+        'reasoning_tokens': 0,
+        'cached_tokens': cache_read,
+        # Normalise to the chat-completions vocabulary used everywhere else
+        'finish_reason': 'length' if stop_reason == 'max_tokens' else 'stop'
+    }
+
+
+class BatchExecutor:
+    """Run (prompt, model) jobs through provider batch APIs.
+
+    Each model's jobs are split into batch files of at most
+    `max_requests_per_batch`, submitted, polled every `poll_interval`
+    seconds and ingested into the same essay dicts `LLMManager.dispatch`
+    returns. Costs are scaled by `cost_multiplier` for the batch discount.
+    """
+
+    def __init__(self, llm_manager, poll_interval: float = 30.0, max_requests_per_batch: int = 10000,
+                 max_wait_seconds: float = 24 * 3600, cost_multiplier: float = 0.5,
+                 fallback_interactive: bool = True):
+        self.llm_manager = llm_manager
+        self.poll_interval = poll_interval
+        self.max_requests_per_batch = max_requests_per_batch
+        self.max_wait_seconds = max_wait_seconds
+        self.cost_multiplier = cost_multiplier
+        self.fallback_interactive = fallback_interactive
+        self.stats = {
+            'batches_submitted': 0,
+            'requests_submitted': 0,
+            'requests_succeeded': 0,
+            'requests_failed': 0,
+            'fallback_interactive': 0,
+            'budget_skipped': 0,
+            'cache_hits': 0,
+            'replay_skipped': 0,
+            'deadline_skipped': 0
+        }
+        # Every batch request is one prompt for one essay
+        ignored = [name for name, policy in (('packing', llm_manager.packing), ('sampling', llm_manager.sampling))
+                   if policy is not None]
+        if ignored:
+            logger.warning(f"Batch API sends one essay per request, ignoring the {' and '.join(ignored)} settings")
+
+    def _api_base(self, model_config: Dict, fmt: str) -> str:
+        return (model_config.get('batch_api_base') or model_config.get('api_base') or DEFAULT_API_BASES[fmt]).rstrip('/')
+
+    def _api_key(self, model_config: Dict, fmt: str) -> str:
+        return model_config.get('api_key') or os.getenv(API_KEY_ENV[fmt], '')
+
+    def _priced(self, model_config: Dict) -> Dict:
+        """Model config with prices scaled to the batch discount."""
+        priced = dict(model_config)
+        for price in ('input_cost_per_mtok', 'cached_input_cost_per_mtok', 'output_cost_per_mtok'):
+            if price in model_config:
+                priced[price] = model_config[price] * self.cost_multiplier
+        return priced
+
+    async def run(self, prompts: List[Dict], models: Optional[List[Dict]] = None,
+                  skip: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """Generate essays for the planned (prompt, model) pairs not in `skip`; returns successful results.
+
+        Pairs come from LLMManager.plan_jobs: every model, or the routed ones.
+        """
+        interactive = []
+        groups = []
+        for model_config, pending in self.llm_manager.plan_jobs(prompts, models, skip):
+            if batch_format(model_config) is None:
+                logger.info(f"{model_config['name']} has no batch API, using interactive calls")
+                interactive.extend((prompt_data, model_config) for prompt_data in pending)
+                continue
+            for i in range(0, len(pending), self.max_requests_per_batch):
+                groups.append((model_config, pending[i:i + self.max_requests_per_batch]))
+
+        tasks = [self._run_group(model_config, chunk) for model_config, chunk in groups]
+        tasks.extend(self.llm_manager.dispatch(prompt_data, model_config) for prompt_data, model_config in interactive)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        essays = []
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Batch execution failed: {result}")
+            elif isinstance(result, list):
+                essays.extend(result)
+            elif result is not None:
+                essays.append(result)
+        logger.info(f"Batch API produced {len(essays)} essays")
+        return essays
+
+    async def _run_group(self, model_config: Dict, prompts: List[Dict]) -> List[Dict]:
+        """Serve one model's jobs from the response cache, batching only the misses.
+
+        Jobs are admitted as interactive dispatch admits them: none for an
+        aborted model, and only those the run deadline still has time for.
+        In replay mode misses are dropped instead of submitted.
+        """
+        name = model_config['name']
+        if name in self.llm_manager.aborted_models:
+            return []
+        deadline = self.llm_manager.deadline
+        if deadline is not None:
+            admitted = [prompt_data for prompt_data in prompts if deadline.admit(name)]
+            self.stats['deadline_skipped'] += len(prompts) - len(admitted)
+            prompts = admitted
+        try:
+            return await self._serve_group(model_config, prompts)
+        finally:
+            if deadline is not None:
+                # A batch's turnaround says nothing about how long a live job takes
+                for _ in prompts:
+                    deadline.finish(name, None)
+
+    async def _serve_group(self, model_config: Dict, prompts: List[Dict]) -> List[Dict]:
+        cache = self.llm_manager.response_cache
+        if cache is None:
+            return await self._submit_group(model_config, prompts)
+
+        essays = []
+        misses = []
+        skipped = 0
+        for prompt_data in prompts:
+            cached = cache.get(self.llm_manager._cache_key(prompt_data, model_config))
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                prompt_hash = hashlib.sha256(prompt_data['prompt'].encode()).hexdigest()
+                essays.append(self.llm_manager._build_result(cached['content'], prompt_data, model_config,
+                                                             prompt_hash, cached=True))
+            elif cache.read_only:
+                skipped += 1
+            else:
+                misses.append(prompt_data)
+        if skipped:
+            self.stats['replay_skipped'] += skipped
+            logger.warning(f"Replay mode: no cached response for {skipped} {model_config['name']} requests, skipping")
+        if misses:
+            essays.extend(await self._submit_group(model_config, misses))
+        return essays
+
+    async def _submit_group(self, model_config: Dict, prompts: List[Dict]) -> List[Dict]:
+        """Submit one model's batch, wait for it and turn the results into essays."""
+        fmt = batch_format(model_config)
+
+        # Reserve budget per request, exactly as interactive dispatch does. Each request
+        # is sent with its own planned max_tokens, the one its cache key is made with
+        jobs: Dict[str, Tuple[Dict, int, float]] = {}
+        requests: Dict[str, Tuple[List[Dict], int]] = {}
+        for i, prompt_data in enumerate(prompts):
+            token_config = self.llm_manager._token_config(prompt_data, model_config)
+            max_tokens = token_config['max_tokens']
+            tokens = estimate_request_tokens(prompt_data['prompt'], token_config)
+            cost = call_cost(self._priced(model_config), tokens - max_tokens, max_tokens)
+            if not self.llm_manager.usage.reserve(tokens, cost):
+                self.stats['budget_skipped'] += 1
+                continue
+            jobs[f"job-{i}"] = (prompt_data, tokens, cost)
+            requests[f"job-{i}"] = (self.llm_manager._build_messages(prompt_data, model_config), max_tokens)
+        if not jobs:
+            return []
+
+        try:
+            try:
+                async with aiohttp.ClientSession() as session:
+                    if fmt == 'openai':
+                        outputs = await self._run_openai(session, model_config, requests)
+                    else:
+                        outputs = await self._run_anthropic(session, model_config, requests)
+            except (BatchJobError, aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.error(f"Batch for {model_config['name']} failed: {e}")
+                outputs = {}
+        finally:
+            for _, tokens, cost in jobs.values():
+                self.llm_manager.usage.release(tokens, cost)
+
+        essays = []
+        retry = []
+        truncated = []
+        for custom_id, (prompt_data, _, _) in jobs.items():
+            content, call_usage = outputs.get(custom_id, (None, None))
+            job_usage = empty_usage()
+            add_call(job_usage, self._priced(model_config), call_usage, content is not None)
+            self.llm_manager.usage.record_call(self._priced(model_config), call_usage, content is not None)
+            if content is None:
+                self.stats['requests_failed'] += 1
+                retry.append(prompt_data)
+                continue
+            self.stats['requests_succeeded'] += 1
+            if call_usage['finish_reason'] == 'length' and self.llm_manager.continuation is not None:
+                truncated.append((custom_id, prompt_data, content, job_usage))
+                continue
+            essays.append(self._finish(prompt_data, model_config, content, job_usage))
+
+        if truncated:
+            # Continue cut-off essays with live calls, as interactive dispatch does
+            continued = await asyncio.gather(*(
+                self.llm_manager.continue_truncated(
+                    content,
+                    self.llm_manager._request_kwargs(
+                        requests[custom_id][0], model_config, self.llm_manager._token_config(prompt_data, model_config)
+                    ),
+                    model_config, job_usage
+                )
+                for custom_id, prompt_data, content, job_usage in truncated
+            ))
+            for (_, prompt_data, _, job_usage), content in zip(truncated, continued):
+                essays.append(self._finish(prompt_data, model_config, content, job_usage))
+
+        if retry and self.fallback_interactive:
+            self.stats['fallback_interactive'] += len(retry)
+            logger.info(f"Retrying {len(retry)} failed batch requests for {model_config['name']} interactively")
+            fallbacks = await asyncio.gather(
+                *(self.llm_manager.dispatch(prompt_data, model_config) for prompt_data in retry),
+                return_exceptions=True
+            )
+            essays.extend(r for r in fallbacks if isinstance(r, dict))
+        return essays
+
+    def _finish(self, prompt_data: Dict, model_config: Dict, content: str, job_usage: Dict) -> Dict:
+        prompt_hash = hashlib.sha256(prompt_data['prompt'].encode()).hexdigest()
+        result = self.llm_manager._build_result(content, prompt_data, model_config, prompt_hash, usage=job_usage)
+        self._cache_result(result, prompt_data, model_config)
+        return result
+
+    def _cache_result(self, result: Dict, prompt_data: Dict, model_config: Dict):
+        cache = self.llm_manager.response_cache
+        if cache is not None and not cache.read_only:
+            cache.put(self.llm_manager._cache_key(prompt_data, model_config), {'content': result['content']})
+
+    async def _wait(self, poll, is_done, description: str) -> Dict:
+        """Poll until `is_done(status)` or the wait limit passes."""
+        deadline = time.monotonic() + self.max_wait_seconds
+        while True:
+            status = await poll()
+            if is_done(status):
+                return status
+            if time.monotonic() > deadline:
+                raise BatchJobError(f"{description} did not finish within {self.max_wait_seconds}s")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _run_openai(self, session: aiohttp.ClientSession, model_config: Dict,
+                          requests: Dict[str, Tuple[List[Dict], int]]) -> Dict[str, Tuple]:
+        base = self._api_base(model_config, 'openai')
+        headers = {'Authorization': f"Bearer {self._api_key(model_config, 'openai')}"}
+
+        jsonl = '\n'.join(
+            json.dumps(build_openai_line(custom_id, model_config, messages, max_tokens))
+            for custom_id, (messages, max_tokens) in requests.items()
+        )
+        form = aiohttp.FormData()
+        form.add_field('purpose', 'batch')
+        form.add_field('file', jsonl.encode(), filename='essays.jsonl', content_type='application/jsonl')
+        async with session.post(f"{base}/files", data=form, headers=headers) as resp:
+            if resp.status != 200:
+                raise BatchJobError(f"file upload returned {resp.status}: {await resp.text()}")
+            input_file_id = (await resp.json())['id']
+
+        async with session.post(f"{base}/batches", headers=headers, json={
+            'input_file_id': input_file_id,
+            'endpoint': '/v1/chat/completions',
+            'completion_window': '24h'
+        }) as resp:
+            if resp.status != 200:
+                raise BatchJobError(f"batch creation returned {resp.status}: {await resp.text()}")
+            batch_id = (await resp.json())['id']
+        self.stats['batches_submitted'] += 1
+        self.stats['requests_submitted'] += len(requests)
+        logger.info(f"Submitted OpenAI batch {batch_id} with {len(requests)} requests for {model_config['name']}")
+
+        async def poll():
+            async with session.get(f"{base}/batches/{batch_id}", headers=headers) as resp:
+                resp.raise_for_status()
+                return await resp.json()
+        batch = await self._wait(poll, lambda b: b['status'] in OPENAI_TERMINAL_STATES, f"Batch {batch_id}")
+
+        outputs = {}
+        for file_id in (batch.get('output_file_id'), batch.get('error_file_id')):
+            if not file_id:
+                continue
+            async with session.get(f"{base}/files/{file_id}/content", headers=headers) as resp:
+                resp.raise_for_status()
+                for raw in (await resp.text()).splitlines():
+                    if raw.strip():
+                        line = json.loads(raw)
+                        outputs[line['custom_id']] = parse_openai_result(line)
+        if batch['status'] != 'completed':
+            logger.warning(f"OpenAI batch {batch_id} ended as {batch['status']}")
+        return outputs
+
+    async def _run_anthropic(self, session: aiohttp.ClientSession, model_config: Dict,
+                             requests: Dict[str, Tuple[List[Dict], int]]) -> Dict[str, Tuple]:
+        base = self._api_base(model_config, 'anthropic')
+        headers = {
+            'x-api-key': self._api_key(model_config, 'anthropic'),
+            'anthropic-version': ANTHROPIC_VERSION
+        }
+
+        body = {'requests': [
+            build_anthropic_request(custom_id, model_config, messages, max_tokens)
+            for custom_id, (messages, max_tokens) in requests.items()
+        ]}
+        async with session.post(f"{base}/messages/batches", headers=headers, json=body) as resp:
+            if resp.status != 200:
+                raise BatchJobError(f"batch creation returned {resp.status}: {await resp.text()}")
+            batch_id = (await resp.json())['id']
+        self.stats['batches_submitted'] += 1
+        self.stats['requests_submitted'] += len(requests)
+        logger.info(f"Submitted Anthropic batch {batch_id} with {len(requests)} requests for {model_config['name']}")
+
+        async def poll():
+            async with session.get(f"{base}/messages/batches/{batch_id}", headers=headers) as resp:
+                resp.raise_for_status()
+                return await resp.json()
+        batch = await self._wait(poll, lambda b: b['processing_status'] == 'ended', f"Batch {batch_id}")
+
+        outputs = {}
+        async with session.get(batch['results_url'], headers=headers) as resp:
+            resp.raise_for_status()
+            for raw in (await resp.text()).splitlines():
+                if raw.strip():
+                    line = json.loads(raw)
+                    outputs[line['custom_id']] = parse_anthropic_result(line)
+        return outputs
+
+    def get_stats(self) -> Dict:
+        return dict(self.stats)
+
+
+def build_batch_executor(batch_config: Optional[Dict], llm_manager) -> Optional[BatchExecutor]:
+    """Create the executor from the `batch_api` section of settings.yaml."""
+    if not batch_config or not batch_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in batch_config.items() if k != 'enabled'}
+    return BatchExecutor(llm_manager, **options)
@@ -0,0 +1,151 @@
+"""
+Per-provider circuit breakers driven by a rolling health score.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitOpenError(Exception):
+    """Raised when a request is refused because its provider's circuit is open."""
+
+    def __init__(self, provider: str):
+        super().__init__(f"Circuit open for provider {provider}")
+        self.provider = provider
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one provider.
+
+    The health score is the mean outcome over the last `window_size` calls:
+    1.0 for a healthy success, 0.5 for a success slower than
+    `slow_call_seconds`, and 0.0 for a failure. The circuit opens when the
+    score drops below `health_threshold`, stays open for `open_seconds`
+    (doubling after each failed probe), then lets one half-open probe through.
+    """
+
+    def __init__(self, provider: str, window_size: int = 20, min_calls: int = 5,
+                 health_threshold: float = 0.5, open_seconds: float = 30.0,
+                 max_open_seconds: float = 300.0, slow_call_seconds: Optional[float] = None):
+        self.provider = provider
+        self.window_size = window_size
+        self.min_calls = min_calls
+        self.health_threshold = health_threshold
+        self.base_open_seconds = open_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.slow_call_seconds = slow_call_seconds
+
+        self.state = CLOSED
+        self.scores = deque(maxlen=window_size)
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+        self._state_changed = asyncio.Event()
+
+    def health_score(self) -> float:
+        if not self.scores:
+            return 1.0
+        return sum(self.scores) / len(self.scores)
+
+    def _transition(self, state: str):
+        self.state = state
+        self._state_changed.set()
+        self._state_changed = asyncio.Event()
+
+    def _probe_due(self) -> bool:
+        return time.monotonic() >= self.opened_at + self.open_seconds
+
+    def is_available(self) -> bool:
+        """Whether new work may be routed here, without claiming the probe."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return self._probe_due()
+        return not self.probe_in_flight
+
+    def allow_request(self) -> bool:
+        """Admit one call, claiming the half-open probe slot when applicable."""
+        if self.state == OPEN and self._probe_due():
+            self._transition(HALF_OPEN)
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self, latency: float):
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+            self.scores.clear()
+            self.open_seconds = self.base_open_seconds
+            self._transition(CLOSED)
+            return
+        slow = self.slow_call_seconds is not None and latency > self.slow_call_seconds
+        self.scores.append(0.5 if slow else 1.0)
+        self._check_health()
+
+    def record_failure(self):
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+            self.open_seconds = min(self.open_seconds * 2, self.max_open_seconds)
+            self._open()
+            return
+        self.scores.append(0.0)
+        self._check_health()
+
+    def release_probe(self):
+        """Give back an unused probe slot, e.g. after a rate limit."""
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+
+    def _check_health(self):
+        if self.state == CLOSED and len(self.scores) >= self.min_calls and self.health_score() < self.health_threshold:
+            self._open()
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self.times_opened += 1
+        self._transition(OPEN)
+
+    async def wait_until_available(self):
+        """Park until the circuit closes or a probe can be attempted."""
+        while not self.is_available():
+            if self.state == OPEN:
+                remaining = self.opened_at + self.open_seconds - time.monotonic()
+                try:
+                    await asyncio.wait_for(self._state_changed.wait(), timeout=max(remaining, 0.01))
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await self._state_changed.wait()
+
+    def get_status(self) -> Dict:
+        status = {
+            'state': self.state,
+            'health_score': round(self.health_score(), 3),
+            'calls_in_window': len(self.scores),
+            'times_opened': self.times_opened,
+            'rejected': self.rejected
+        }
+        if self.state == OPEN:
+            status['seconds_until_probe'] = round(max(0.0, self.opened_at + self.open_seconds - time.monotonic()), 1)
+        return status
+
+
+def build_circuit_breakers(breaker_config: Optional[Dict], models_config) -> Dict[str, CircuitBreaker]:
+    """One breaker per configured provider, from the `circuit_breaker` settings section."""
+    if not breaker_config or not breaker_config.get('enabled', False):
+        return {}
+    options = {k: v for k, v in breaker_config.items() if k not in ('enabled', 'reroute')}
+    providers = {m.get('provider', 'unknown') for m in models_config}
+    return {provider: CircuitBreaker(provider, **options) for provider in providers}
@@ -0,0 +1,124 @@
+"""
+Adaptive (AIMD) concurrency control for model calls.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Optional
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a sequence, `pct` in [0, 1]."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class AdaptiveConcurrencyController:
+    """Additive-increase / multiplicative-decrease limit on in-flight calls.
+
+    The limit grows by roughly `increase_step` for every `limit` healthy
+    completions and is multiplied by `decrease_factor` on rate limits,
+    timeouts, a high error rate in the recent window, or a p95 latency that
+    has drifted well above the best p95 seen so far.
+    """
+
+    def __init__(self, provider: str = 'unknown', initial_limit: int = 4, min_limit: int = 1,
+                 max_limit: int = 32, increase_step: float = 1.0, decrease_factor: float = 0.5,
+                 window_size: int = 20, error_rate_threshold: float = 0.2,
+                 latency_tolerance: float = 2.0, min_samples: int = 10):
+        self.provider = provider
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.error_rate_threshold = error_rate_threshold
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+
+        self.in_flight = 0
+        self.latencies = deque(maxlen=window_size)
+        self.outcomes = deque(maxlen=window_size)  # True for success, False for failure
+        self.baseline_p95: Optional[float] = None
+        self.last_decrease = 0.0
+        self.last_decrease_reason: Optional[str] = None
+        self.increases = 0
+        self.decreases = 0
+        self._condition = asyncio.Condition()
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_limit, int(self.limit))
+
+    async def acquire(self):
+        """Wait for a free slot under the current limit."""
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+
+    async def release(self):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+
+        if len(self.latencies) >= self.min_samples:
+            p95 = percentile(self.latencies, 0.95)
+            if self.baseline_p95 is None or p95 < self.baseline_p95:
+                self.baseline_p95 = p95
+            elif p95 > self.baseline_p95 * self.latency_tolerance:
+                self._decrease('latency')
+                return
+
+        if self._error_rate() > self.error_rate_threshold:
+            return
+
+        # Additive increase: about `increase_step` per full window of the current limit
+        self.limit = min(self.max_limit, self.limit + self.increase_step / max(self.limit, 1.0))
+        self.increases += 1
+
+    def record_failure(self, kind: str = 'error'):
+        """Record a failed call: 'rate_limit', 'timeout' or 'error'."""
+        self.outcomes.append(False)
+        if kind in ('rate_limit', 'timeout'):
+            self._decrease(kind)
+        elif len(self.outcomes) >= self.min_samples and self._error_rate() > self.error_rate_threshold:
+            self._decrease('error_rate')
+
+    def _error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok in self.outcomes if not ok) / len(self.outcomes)
+
+    def _decrease(self, reason: str):
+        # A burst of concurrent failures reflects one overload event, so cut
+        # at most once per typical call latency.
+        now = time.monotonic()
+        cooldown = percentile(self.latencies, 0.5) if self.latencies else 1.0
+        if now - self.last_decrease < cooldown:
+            return
+        self.last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+        self.decreases += 1
+        self.last_decrease_reason = reason
+        # Latency baseline is re-learned at the new level
+        if reason == 'latency':
+            self.baseline_p95 = None
+            self.latencies.clear()
+
+    def get_status(self) -> Dict:
+        return {
+            'limit': self.current_limit,
+            'in_flight': self.in_flight,
+            'p95_latency': round(percentile(self.latencies, 0.95), 3) if self.latencies else None,
+            'error_rate': round(self._error_rate(), 3),
+            'increases': self.increases,
+            'decreases': self.decreases
+        }
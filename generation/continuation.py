@@ -0,0 +1,79 @@
+"""
+Continuation of essays cut off at max_tokens, stitched back into one essay.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+CONTINUE_INSTRUCTION = (
+    "Your essay was cut off. Continue it from exactly where it stops. Do not repeat "
+    "earlier text, do not add a preamble, and bring it to a conclusion within the requested length."
+)
+
+# End of a sentence, allowing a closing quote or bracket
+SENTENCE_END = re.compile(r'[.!?]["\')\]]?(?=\s)')
+
+# Characters from the end of the partial essay used to find repeated text
+OVERLAP_PROBE_CHARS = 80
+
+
+def trim_to_boundary(text: str, max_trim_chars: int = 400) -> str:
+    """Drop the unfinished tail of a cut-off essay so the continuation starts cleanly.
+
+    Cuts back to the last sentence end within `max_trim_chars`, else to the
+    last whole word.
+    """
+    text = text.rstrip()
+    window_start = max(0, len(text) - max_trim_chars)
+    ends = [m.end() for m in SENTENCE_END.finditer(text + ' ', window_start)]
+    if ends:
+        return text[:ends[-1]]
+    cut = text.rfind(' ')
+    return text[:cut] if cut > 0 else text
+
+
+def build_continuation_messages(messages: List[Dict], partial: str) -> List[Dict]:
+    """The original request plus the partial essay and an instruction to go on."""
+    return messages + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUE_INSTRUCTION}
+    ]
+
+
+def stitch(partial: str, continuation: str) -> str:
+    """Join a partial essay and its continuation, dropping any text the model repeated."""
+    probe = partial[-OVERLAP_PROBE_CHARS:]
+    if len(partial) >= OVERLAP_PROBE_CHARS and probe in continuation:
+        continuation = continuation[continuation.index(probe) + len(probe):]
+    if continuation.startswith('\n'):
+        return partial + continuation.rstrip()
+    return f"{partial} {continuation.strip()}"
+
+
+class ContinuationPolicy:
+    """How many continuation requests a truncated essay may use, plus counts."""
+
+    def __init__(self, max_continuations: int = 2, max_trim_chars: int = 400):
+        self.max_continuations = max_continuations
+        self.max_trim_chars = max_trim_chars
+
+        self.truncated = 0
+        self.continuations = 0
+        self.completed = 0
+        self.failed = 0
+
+    def get_stats(self) -> Dict:
+        return {
+            'truncated': self.truncated,
+            'continuations': self.continuations,
+            'completed': self.completed,
+            'failed': self.failed
+        }
+
+
+def build_continuation_policy(continuation_config: Optional[Dict]) -> Optional[ContinuationPolicy]:
+    """Create the policy from the `continuation` section of settings.yaml."""
+    if not continuation_config or not continuation_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in continuation_config.items() if k != 'enabled'}
+    return ContinuationPolicy(**options)
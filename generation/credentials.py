@@ -0,0 +1,186 @@
+"""
+Pools of API keys and endpoints per provider, each with its own limiter and health.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+
+from .circuit_breaker import CircuitOpenError
+from .rate_limiter import ProviderRateLimiter
+from .retry import FATAL_MODEL, RATE_LIMIT, classify_error, is_credential_error
+
+logger = logging.getLogger(__name__)
+
+
+class NoUsableCredentialError(Exception):
+    """Raised when every credential in a provider's pool has been disabled."""
+
+    # Classified like an authentication failure, which aborts the model
+    status_code = 401
+
+    def __init__(self, provider: str):
+        super().__init__(f"No usable credentials left for provider {provider}")
+        self.provider = provider
+
+
+class Credential:
+    """One API key and/or base URL of a provider pool."""
+
+    def __init__(self, name: str, api_key: Optional[str] = None, api_base: Optional[str] = None,
+                 requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.name = name
+        self.api_key = api_key
+        self.api_base = api_base
+        self.limiter = (ProviderRateLimiter(requests_per_minute, tokens_per_minute)
+                        if requests_per_minute or tokens_per_minute else None)
+
+        self.in_flight = 0
+        self.cooling_until = 0.0
+        self.disabled_reason: Optional[str] = None
+
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost_usd = 0.0
+        self.rate_limited = 0
+        self.errors = 0
+
+    @property
+    def load(self) -> int:
+        """Calls sent or queued on this credential's limiter."""
+        return self.in_flight + (self.limiter.waiting if self.limiter else 0)
+
+    def request_kwargs(self) -> Dict:
+        kwargs = {}
+        if self.api_key:
+            kwargs['api_key'] = self.api_key
+        if self.api_base:
+            kwargs['api_base'] = self.api_base
+        return kwargs
+
+    def get_stats(self) -> Dict:
+        return {
+            'requests': self.requests,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cost_usd': round(self.cost_usd, 4),
+            'rate_limited': self.rate_limited,
+            'errors': self.errors,
+            'disabled': self.disabled_reason
+        }
+
+
+class CredentialPool:
+    """Least-loaded selection across a provider's credentials.
+
+    A rate-limited credential cools down for `cooldown_seconds` (doubling on
+    repeated limits) while the others keep serving; an authentication or
+    permission error disables it for the rest of the run. A call only waits
+    when every usable credential is cooling down.
+    """
+
+    def __init__(self, provider: str, credentials: List[Credential], cooldown_seconds: float = 30.0,
+                 max_cooldown_seconds: float = 300.0):
+        self.provider = provider
+        self.credentials = credentials
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        # Current cooldown per credential, reset by a success: {name: seconds}
+        self.cooldowns: Dict[str, float] = {}
+
+    @property
+    def usable(self) -> List[Credential]:
+        return [c for c in self.credentials if c.disabled_reason is None]
+
+    async def acquire(self, tokens: int = 0) -> Optional[Credential]:
+        """Claim the least-loaded usable credential and wait for its limiter; None if none are usable."""
+        usable = self.usable
+        if not usable:
+            return None
+        now = time.monotonic()
+        ready = [c for c in usable if c.cooling_until <= now]
+        if not ready:
+            credential = min(usable, key=lambda c: c.cooling_until)
+            await asyncio.sleep(credential.cooling_until - now)
+            ready = [credential]
+
+        credential = min(ready, key=lambda c: c.load)
+        credential.in_flight += 1
+        if credential.limiter:
+            try:
+                await credential.limiter.acquire(tokens)
+            except BaseException:
+                credential.in_flight -= 1
+                raise
+        return credential
+
+    def headroom(self) -> float:
+        """Free limiter capacity of the best usable credential."""
+        return max((c.limiter.headroom() if c.limiter else 1.0 for c in self.usable), default=0.0)
+
+    def release(self, credential: Credential, usage: Optional[Dict] = None, cost: float = 0.0,
+                error: Optional[BaseException] = None, retry_after: Optional[float] = None):
+        """Return a credential after its call, recording the outcome.
+
+        A rate limit with a provider-reported `retry_after` cools the
+        credential down for exactly that long. A cancelled call, or one an
+        open circuit refused before it was sent, says nothing about the key.
+        """
+        credential.in_flight -= 1
+        if isinstance(error, (asyncio.CancelledError, CircuitOpenError)):
+            return
+        if error is None:
+            credential.requests += 1
+            credential.prompt_tokens += (usage or {}).get('prompt_tokens', 0)
+            credential.completion_tokens += (usage or {}).get('completion_tokens', 0)
+            credential.cost_usd += cost
+            self.cooldowns.pop(credential.name, None)
+            return
+
+        credential.errors += 1
+        error_kind = classify_error(error)
+        if error_kind == RATE_LIMIT:
+            credential.rate_limited += 1
+            if retry_after is not None:
+                cooldown = retry_after
+            else:
+                cooldown = min(self.max_cooldown_seconds,
+                               self.cooldowns.get(credential.name, self.cooldown_seconds / 2) * 2)
+                self.cooldowns[credential.name] = cooldown
+            credential.cooling_until = time.monotonic() + cooldown
+            logger.warning(f"{self.provider} credential {credential.name} rate limited, cooling down {cooldown:.0f}s")
+        elif error_kind == FATAL_MODEL and is_credential_error(error):
+            credential.disabled_reason = f"{type(error).__name__}: {error}"
+            logger.error(f"Disabling {self.provider} credential {credential.name}: {credential.disabled_reason}")
+
+    def get_stats(self) -> Dict:
+        return {credential.name: credential.get_stats() for credential in self.credentials}
+
+
+def build_credential_pools(pools_config: Optional[Dict], rate_limits: Optional[Dict] = None) -> Dict[str, CredentialPool]:
+    """Create pools from the `credential_pools` section of settings.yaml.
+
+    Keys come from `api_key_env` (or a literal `api_key`); entries without
+    their own requests/tokens per minute inherit the provider's `rate_limits`.
+    """
+    pools = {}
+    for provider, pool_config in (pools_config or {}).items():
+        pool_config = pool_config or {}
+        defaults = (rate_limits or {}).get(provider) or {}
+        credentials = []
+        for i, entry in enumerate(pool_config.get('credentials', [])):
+            api_key = entry.get('api_key') or (os.getenv(entry['api_key_env']) if entry.get('api_key_env') else None)
+            credentials.append(Credential(
+                name=entry.get('name', f"{provider}-{i}"),
+                api_key=api_key,
+                api_base=entry.get('api_base'),
+                requests_per_minute=entry.get('requests_per_minute', defaults.get('requests_per_minute')),
+                tokens_per_minute=entry.get('tokens_per_minute', defaults.get('tokens_per_minute'))
+            ))
+        if credentials:
+            options = {k: v for k, v in pool_config.items() if k != 'credentials'}
+            pools[provider] = CredentialPool(provider, credentials, **options)
+    return pools
@@ -0,0 +1,94 @@
+"""
+Deadline mode: admit only jobs that can finish within the run's time budget.
+"""
+
+import time
+from collections import deque
+from typing import Dict, Optional
+
+from .concurrency import percentile
+
+
+class RunDeadline:
+    """Wall-clock budget for a run, with per-model job time estimates.
+
+    A model's estimate is the `percentile` of its recent job durations, or
+    `default_job_seconds` before any job has finished. A job is admitted
+    only if its estimate, padded by `safety_margin`, fits in the time left.
+    At the deadline, in-flight work gets `grace_seconds` before it is cancelled.
+    The clock starts on `start()`, or on first use.
+    """
+
+    def __init__(self, time_budget_seconds: float, percentile: float = 0.9, window_size: int = 50,
+                 default_job_seconds: float = 90.0, safety_margin: float = 0.1, grace_seconds: float = 5.0):
+        self.time_budget_seconds = time_budget_seconds
+        self.percentile = percentile
+        self.window_size = window_size
+        self.default_job_seconds = default_job_seconds
+        self.safety_margin = safety_margin
+        self.grace_seconds = grace_seconds
+
+        self.started_at: Optional[float] = None
+        self.durations: Dict[str, deque] = {}
+        self.in_flight = 0
+        self.not_admitted: Dict[str, int] = {}
+        self.cancelled_in_flight = 0
+        self.reached = False
+
+    def start(self):
+        self.started_at = time.monotonic()
+
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            self.start()
+        return time.monotonic() - self.started_at
+
+    def remaining(self) -> float:
+        return max(0.0, self.time_budget_seconds - self.elapsed())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def estimate(self, model_name: str) -> float:
+        """Seconds a new job on this model is expected to take."""
+        samples = self.durations.get(model_name)
+        if not samples:
+            return self.default_job_seconds
+        return percentile(samples, self.percentile)
+
+    def can_finish(self, model_name: str) -> bool:
+        return self.estimate(model_name) * (1 + self.safety_margin) <= self.remaining()
+
+    def admit(self, model_name: str) -> bool:
+        """Start a job if it can finish in time; count it as dropped otherwise."""
+        if not self.can_finish(model_name):
+            self.not_admitted[model_name] = self.not_admitted.get(model_name, 0) + 1
+            self.reached = True
+            return False
+        self.in_flight += 1
+        return True
+
+    def finish(self, model_name: str, seconds: Optional[float]):
+        """End an admitted job; `seconds` is its duration, or None if it was not a live call."""
+        self.in_flight -= 1
+        if seconds is not None:
+            self.durations.setdefault(model_name, deque(maxlen=self.window_size)).append(seconds)
+
+    def get_stats(self) -> Dict:
+        return {
+            'time_budget_seconds': self.time_budget_seconds,
+            'elapsed_seconds': round(self.elapsed(), 1),
+            'reached': self.reached,
+            'not_admitted': dict(self.not_admitted),
+            'cancelled_in_flight': self.cancelled_in_flight,
+            'estimates': {name: round(self.estimate(name), 1) for name in self.durations}
+        }
+
+
+def build_run_deadline(deadline_config: Optional[Dict]) -> Optional[RunDeadline]:
+    """Create the deadline from the `deadline` section of settings.yaml; None without a time budget."""
+    if not deadline_config or not deadline_config.get('time_budget_minutes'):
+        return None
+    options = {k: v for k, v in deadline_config.items() if k != 'time_budget_minutes'}
+    return RunDeadline(deadline_config['time_budget_minutes'] * 60, **options)
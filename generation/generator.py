@@ -1,24 +1,88 @@
 import asyncio
 import hashlib
+import logging
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple
 
 from database.manager import DatabaseManager
 from diversity.manager import DiversityManager
+from generation.batch_api import build_batch_executor
 from generation.llm_manager import LLMManager
+from generation.pipeline import PipelineStats
+from generation.stratified import build_stratified_dispatch
+
+logger = logging.getLogger(__name__)
 
 class EssayGenerator:
-    def __init__(self, models_config: List[Dict], db_manager: DatabaseManager, base_tokens: int = 1500):
-        self.llm_manager = LLMManager(models_config, base_tokens)
+    def __init__(self, models_config: List[Dict], db_manager: DatabaseManager, base_tokens: int = 1500,
+                 rate_limits: Optional[Dict] = None, concurrency: Optional[Dict] = None,
+                 response_cache: Optional[Dict] = None, streaming: Optional[Dict] = None,
+                 hedging: Optional[Dict] = None, circuit_breaker: Optional[Dict] = None,
+                 budget: Optional[Dict] = None, batch_api: Optional[Dict] = None,
+                 prompt_caching: Optional[Dict] = None, retry: Optional[Dict] = None,
+                 token_sizing: Optional[Dict] = None, continuation: Optional[Dict] = None,
+                 packing: Optional[Dict] = None, routing: Optional[Dict] = None,
+                 deadline: Optional[Dict] = None, stratification: Optional[Dict] = None,
+                 credential_pools: Optional[Dict] = None, header_pacing: Optional[Dict] = None,
+                 timeouts: Optional[Dict] = None, sampling: Optional[Dict] = None):
+        self.llm_manager = LLMManager(models_config, base_tokens, rate_limits, concurrency,
+                                      response_cache, streaming, hedging, circuit_breaker, budget,
+                                      prompt_caching, retry, token_sizing=token_sizing,
+                                      continuation=continuation, packing=packing, routing=routing,
+                                      deadline=deadline, credential_pools=credential_pools,
+                                      header_pacing=header_pacing, timeouts=timeouts, sampling=sampling)
+        # Dispatch jobs sharing a seed (and so a prompt prefix) back to back per model
+        self.group_by_seed = (prompt_caching or {}).get('group_dispatch', False)
+        # Provider batch jobs instead of live calls, for latency-insensitive corpora
+        self.batch_executor = build_batch_executor(batch_api, self.llm_manager)
+        # Dispatch interleaved across stance/grade/seed/model so partial runs stay representative
+        self.stratification = build_stratified_dispatch(stratification)
         self.db_manager = db_manager
         self.diversity_manager = DiversityManager()
+        self.pipeline_stats: Optional[PipelineStats] = None
+        # Current run: essays are saved as they arrive and finished jobs skipped
+        self.run_id: Optional[str] = None
+        self.completed_jobs: Set[Tuple[str, str]] = set()
+        # Essays saved so far this run, kept when a deadline cancels the rest
+        self.delivered: List[Dict] = []
+    
+    async def generate_essays(self, combinations: List[Dict], batch_size: int = 5,
+                              pipelined: bool = False, num_workers: int = 10,
+                              run_id: Optional[str] = None,
+                              completed_jobs: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """Generate essays from combinations, managing database interactions.
+        
+        With a run_id each essay is written to the database as soon as it
+        arrives, and (combination_id, model_name) pairs in completed_jobs
+        are not dispatched again. With a deadline, whatever is still running
+        when time is up is cancelled and the essays saved so far are returned.
+        """
+        self.run_id = run_id
+        self.completed_jobs = completed_jobs or set()
+        self.delivered = []
+        run = self._generate_essays(combinations, batch_size, pipelined, num_workers)
+        if self.llm_manager.deadline is None:
+            return await run
+        return await self._run_until_deadline(run)
     
-    async def generate_essays(self, combinations: List[Dict], batch_size: int = 5) -> List[Dict]:
-        """Generate essays from combinations, managing database interactions."""
+    async def _generate_essays(self, combinations: List[Dict], batch_size: int,
+                               pipelined: bool, num_workers: int) -> List[Dict]:
+        if self.batch_executor is not None:
+            return await self.generate_essays_batch_api(combinations)
+        if pipelined:
+            return await self.generate_essays_pipelined(combinations, num_workers)
+        
         all_essays = []
+        combinations = [combo for group in self._dispatch_groups(combinations) for combo in group]
         
         # Process in batches to manage memory and API rate limits
         for i in range(0, len(combinations), batch_size):
+            if self.llm_manager.usage.exhausted:
+                logger.warning("Run budget exhausted, skipping remaining batches")
+                break
+            if self._deadline_expired():
+                logger.warning("Time budget used up, skipping remaining batches")
+                break
             batch = combinations[i:i + batch_size]
             print(f"Processing batch {i//batch_size + 1}/{(len(combinations) + batch_size - 1)//batch_size}")
             
@@ -29,60 +93,13 @@ class EssayGenerator:
                 prompts.append(prompt_data)
             
             # Generate essays for this batch
-            batch_essays = await self.llm_manager.generate_batch(prompts)
+            batch_essays = await self.llm_manager.generate_batch(prompts, skip=self.completed_jobs)
             
             # Process and save each essay
             for essay in batch_essays:
                 if essay is None:
                     continue
-                
-                # Extract metadata components
-                metadata = essay['metadata']
-                
-                # Append citations to the essay content
-                content_with_citations = self._append_citations(
-                    essay['content'], 
-                    metadata['seed'].get('sources', [])
-                )
-                
-                # Save prompt to database
-                prompt_hash = essay['prompt_hash']
-                base_prompt = essay.get('base_prompt', '')
-                modulated_prompt = essay.get('modulated_prompt', '')
-                prompt_metadata = essay.get('prompt_metadata', {})
-                
-                saved_prompt = self.db_manager.save_prompt(
-                    base_prompt=base_prompt,
-                    modulated_prompt=modulated_prompt,
-                    metadata=prompt_metadata,
-                    prompt_hash=prompt_hash
-                )
-                
-                # Save components to database if they don't exist
-                stance = self.db_manager.get_or_create_stance(metadata['stance'])
-                persona = self.db_manager.save_persona(metadata['persona'])
-                evidence = self.db_manager.save_evidence_pattern(metadata['evidence'])
-                style = self.db_manager.save_style_parameters(metadata['style'])
-                quality = self.db_manager.save_quality_level(metadata['quality'])
-                
-                # Prepare essay data for database while preserving metadata
-                essay_data = {
-                    'content': content_with_citations,
-                    'seed_id': metadata['seed']['id'] if 'id' in metadata['seed'] else None,
-                    'topic': metadata['seed'].get('topic') or metadata['seed'].get('angle'),  # Include topic directly
-                    'stance_id': stance.id,
-                    'persona_id': persona.id,
-                    'evidence_id': evidence.id,
-                    'style_id': style.id,
-                    'quality_id': quality.id,
-                    'model_name': essay['model_name'],
-                    'temperature': essay['temperature'],
-                    'prompt_hash': essay['prompt_hash'],
-                    'prompt_id': saved_prompt.id,  # Link to saved prompt
-                    'metadata': metadata  # Preserve original metadata for export
-                }
-                
-                all_essays.append(essay_data)
+                all_essays.append(self._save_essay(essay))
             
             # Small delay between batches to respect rate limits
             if i + batch_size < len(combinations):
@@ -90,6 +107,235 @@ class EssayGenerator:
         
         return all_essays
     
+    async def generate_essays_pipelined(self, combinations: List[Dict], num_workers: int = 10) -> List[Dict]:
+        """Generate essays through a bounded work queue drained by long-lived workers.
+        
+        Every (prompt, model) pair is an independent job, so a worker picks up the
+        next job as soon as its current call returns instead of waiting for the
+        slowest model in a batch.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=num_workers * 2)
+        stats = PipelineStats(num_workers)
+        self.pipeline_stats = stats
+        all_essays = []
+        
+        async def produce():
+            for group in self._dispatch_groups(combinations):
+                if self.llm_manager.usage.exhausted:
+                    logger.warning("Run budget exhausted, no more jobs will be queued")
+                    break
+                if self._deadline_expired():
+                    logger.warning("Time budget used up, no more jobs will be queued")
+                    break
+                prompts = [self.diversity_manager.create_composite_prompt(combo) for combo in group]
+                # Routed when the group is queued, so assignments follow observed throughput
+                for model_config, pending in self.llm_manager.plan_jobs(prompts, skip=self.completed_jobs):
+                    # Models with a pack_size take several of the seed's prompts per request
+                    for pack in self.llm_manager.pack_jobs(pending, model_config):
+                        await queue.put((pack, model_config))
+            for _ in range(num_workers):
+                await queue.put(None)
+        
+        async def work():
+            while True:
+                job = await queue.get()
+                try:
+                    if job is None:
+                        return
+                    pack, model_config = job
+                    for _ in pack:
+                        stats.job_started()
+                    essays = []
+                    try:
+                        essays = await self.llm_manager.generate_assigned(pack, model_config)
+                    except Exception as e:
+                        logger.error(f"Worker failed on {model_config['name']}: {e}", exc_info=True)
+                    saved = 0
+                    for essay in essays:
+                        try:
+                            all_essays.append(self._save_essay(essay))
+                            saved += 1
+                        except Exception as e:
+                            logger.error(f"Failed to save essay from {model_config['name']}: {e}", exc_info=True)
+                    stats.essays_saved(saved)
+                    for i in range(len(pack)):
+                        stats.job_finished(i < saved)
+                finally:
+                    queue.task_done()
+        
+        total_jobs = self.llm_manager.pending_job_count(combinations, self.completed_jobs)
+        print(f"Processing {total_jobs} jobs with {num_workers} workers")
+        
+        stats.start_run()
+        workers = [asyncio.create_task(work()) for _ in range(num_workers)]
+        try:
+            await asyncio.gather(produce(), *workers)
+        finally:
+            # Workers still running (cancelled run, failed producer) take their requests down with them
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            stats.end_run()
+        
+        summary = stats.to_dict()
+        logger.info(f"Pipeline finished: {summary['jobs_completed']}/{total_jobs} jobs, "
+                    f"{summary['essays_delivered']} essays, "
+                    f"{summary['average_in_flight']} avg in flight, "
+                    f"{summary['essays_per_minute']} essays/min")
+        return all_essays
+    
+    async def generate_essays_batch_api(self, combinations: List[Dict]) -> List[Dict]:
+        """Generate every (prompt, model) pair through provider batch jobs."""
+        prompts = [
+            self.diversity_manager.create_composite_prompt(combo)
+            for group in self._dispatch_groups(combinations) for combo in group
+        ]
+        print(f"Submitting {self.llm_manager.pending_job_count(combinations, self.completed_jobs)} "
+              f"requests as provider batch jobs")
+        
+        all_essays = []
+        for essay in await self.batch_executor.run(prompts, skip=self.completed_jobs):
+            try:
+                all_essays.append(self._save_essay(essay))
+            except Exception as e:
+                logger.error(f"Failed to save essay from {essay['model_name']}: {e}", exc_info=True)
+        return all_essays
+    
+    async def _run_until_deadline(self, run) -> List[Dict]:
+        """Await a generation run, cancelling it a grace period after the deadline."""
+        deadline = self.llm_manager.deadline
+        task = asyncio.create_task(run)
+        try:
+            done, _ = await asyncio.wait({task}, timeout=deadline.remaining() + deadline.grace_seconds)
+        except asyncio.CancelledError:
+            # The caller was cancelled; stop the run rather than leave it going in the background
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise
+        if task in done:
+            return task.result()
+        
+        deadline.reached = True
+        deadline.cancelled_in_flight = deadline.in_flight
+        logger.warning(f"Time budget reached, cancelling {deadline.in_flight} in-flight jobs")
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return list(self.delivered)
+    
+    def _deadline_expired(self) -> bool:
+        deadline = self.llm_manager.deadline
+        if deadline is None or not deadline.expired:
+            return False
+        deadline.reached = True
+        return True
+    
+    def _save_essay(self, essay: Dict) -> Dict:
+        """Build the essay's record and, within a run, persist it immediately."""
+        record = self._build_essay_record(essay)
+        if self.run_id is not None:
+            self.db_manager.save_essay(record, self.run_id)
+        self.delivered.append(record)
+        if self.stratification is not None:
+            self.stratification.record(record)
+        return record
+    
+    def _dispatch_groups(self, combinations: List[Dict]) -> List[List[Dict]]:
+        """Split combinations into the units jobs are queued in.
+        
+        With seed grouping, all combinations for one research seed form a group,
+        and each model works through the whole group before the next model starts,
+        so provider prompt caches see the shared prefix repeatedly while warm.
+        With stratification, combinations are first put in stratified order and
+        seeds are only grouped within consecutive windows of `group_window`
+        combinations, so a run cut short after any window still covers every
+        seed in proportion.
+        """
+        window = len(combinations)
+        if self.stratification is not None:
+            combinations = self.stratification.plan(combinations, self._model_shares())
+            window = self.stratification.group_window
+        if not self.group_by_seed:
+            return [[combo] for combo in combinations]
+        
+        groups: List[List[Dict]] = []
+        for start in range(0, len(combinations), max(window, 1)):
+            by_seed: Dict = {}
+            for combo in combinations[start:start + window]:
+                seed = combo['seed']
+                by_seed.setdefault(seed.get('id', seed.get('angle')), []).append(combo)
+            groups.extend(by_seed.values())
+        return groups
+    
+    def _model_shares(self) -> Dict[str, float]:
+        """Share of essays each model is expected to write."""
+        models = [m for m in self.llm_manager.models if m['name'] not in self.llm_manager.aborted_models]
+        scheduler = self.llm_manager.scheduler
+        if scheduler is not None:
+            return {m['name']: scheduler.target_share(m['name'], models) for m in models}
+        return {m['name']: 1 / len(models) for m in models}
+    
+    def _build_essay_record(self, essay: Dict) -> Dict:
+        """Save the essay's prompt and components and build its database record."""
+        # Extract metadata components
+        metadata = essay['metadata']
+        
+        # Append citations to the essay content
+        content_with_citations = self._append_citations(
+            essay['content'], 
+            metadata['seed'].get('sources', [])
+        )
+        
+        # Save prompt to database
+        prompt_hash = essay['prompt_hash']
+        base_prompt = essay.get('base_prompt', '')
+        modulated_prompt = essay.get('modulated_prompt', '')
+        prompt_metadata = essay.get('prompt_metadata', {})
+        
+        saved_prompt = self.db_manager.save_prompt(
+            base_prompt=base_prompt,
+            modulated_prompt=modulated_prompt,
+            metadata=prompt_metadata,
+            prompt_hash=prompt_hash
+        )
+        
+        # Save components to database if they don't exist
+        stance = self.db_manager.get_or_create_stance(metadata['stance'])
+        persona = self.db_manager.save_persona(metadata['persona'])
+        evidence = self.db_manager.save_evidence_pattern(metadata['evidence'])
+        style = self.db_manager.save_style_parameters(metadata['style'])
+        quality = self.db_manager.save_quality_level(metadata['quality'])
+        
+        usage = essay.get('usage') or {}
+        
+        # Prepare essay data for database while preserving metadata
+        return {
+            'content': content_with_citations,
+            'seed_id': metadata['seed']['id'] if 'id' in metadata['seed'] else None,
+            'topic': metadata['seed'].get('topic') or metadata['seed'].get('angle'),  # Include topic directly
+            'stance_id': stance.id,
+            'persona_id': persona.id,
+            'evidence_id': evidence.id,
+            'style_id': style.id,
+            'quality_id': quality.id,
+            'model_name': essay['model_name'],
+            'temperature': essay['temperature'],
+            'prompt_hash': essay['prompt_hash'],
+            'prompt_id': saved_prompt.id,  # Link to saved prompt
+            'combination_id': metadata.get('combination_id'),
+            'sample_index': essay.get('sample_index'),
+            'prompt_tokens': usage.get('prompt_tokens'),
+            'completion_tokens': usage.get('completion_tokens'),
+            'reasoning_tokens': usage.get('reasoning_tokens'),
+            'cached_tokens': usage.get('cached_tokens'),
+            'finish_reason': usage.get('finish_reason'),
+            'attempts': usage.get('attempts'),
+            'cost_usd': usage.get('cost_usd'),
+            'metadata': metadata  # Preserve original metadata for export
+        }
+    
     def _append_citations(self, content: str, sources: List[str]) -> str:
         """Append properly formatted citations to the essay content."""
         if not sources:
@@ -105,23 +351,65 @@ class EssayGenerator:
         return content + citations
     
     async def generate_with_diversity_report(self, combinations: List[Dict], 
-                                          batch_size: int = 5) -> Dict:
+                                          batch_size: int = 5,
+                                          pipelined: bool = False,
+                                          num_workers: int = 10,
+                                          run_id: Optional[str] = None,
+                                          completed_jobs: Optional[Set[Tuple[str, str]]] = None) -> Dict:
         """Generate essays and include a diversity report."""
         
         # Generate diversity report before starting
         diversity_report = self.diversity_manager.get_diversity_report(combinations)
         
         # Generate essays
-        essays = await self.generate_essays(combinations, batch_size)
+        self.pipeline_stats = None
+        essays = await self.generate_essays(combinations, batch_size, pipelined, num_workers,
+                                            run_id, completed_jobs)
         
-        # Add generation statistics to report
+        # Add generation statistics to report; a sampled job is expected to deliver all its drafts
+        total_requested = round(self.llm_manager.pending_job_count(combinations, completed_jobs)
+                                * self.llm_manager.essays_per_job())
         generation_stats = {
-            'total_requested': len(combinations),
+            'total_requested': total_requested,
             'total_generated': len(essays),
-            'success_rate': len(essays) / len(combinations) if combinations else 0,
+            'success_rate': len(essays) / total_requested if total_requested else 0,
             'models_used': list(set(e['model_name'] for e in essays)),
-            'timestamp': datetime.now().isoformat()
+            'timestamp': datetime.now().isoformat(),
+            'usage': self.llm_manager.get_usage_summary(),
+            'retries': self.llm_manager.get_retry_stats(),
+            'timeouts': self.llm_manager.get_timeout_stats()
         }
+        if self.pipeline_stats is not None:
+            generation_stats['pipeline'] = self.pipeline_stats.to_dict()
+        if self.llm_manager.stream_stats:
+            generation_stats['streaming'] = self.llm_manager.get_stream_metrics()
+        if self.llm_manager.circuit_breakers:
+            generation_stats['circuit_breakers'] = self.llm_manager.get_circuit_status()
+        if self.llm_manager.scheduler is not None:
+            generation_stats['routing'] = self.llm_manager.scheduler.get_stats()
+        if self.llm_manager.packing is not None:
+            generation_stats['packing'] = self.llm_manager.packing.get_stats()
+        if self.llm_manager.sampling is not None:
+            generation_stats['sampling'] = self.llm_manager.sampling.get_stats()
+        if self.llm_manager.continuation is not None:
+            generation_stats['continuation'] = self.llm_manager.continuation.get_stats()
+        if self.llm_manager.deadline is not None:
+            generation_stats['deadline'] = {
+                **self.llm_manager.deadline.get_stats(),
+                'dropped': total_requested - len(essays)
+            }
+        if self.llm_manager.header_pacer is not None:
+            generation_stats['header_pacing'] = self.llm_manager.get_header_pacing_stats()
+        if self.llm_manager.credential_pools:
+            generation_stats['credentials'] = self.llm_manager.get_credential_usage()
+        if self.stratification is not None:
+            generation_stats['stratification'] = self.stratification.get_stats()
+        if self.llm_manager.hedging is not None:
+            generation_stats['hedging'] = self.llm_manager.hedging.get_stats()
+        if self.batch_executor is not None:
+            generation_stats['batch_api'] = self.batch_executor.get_stats()
+        if self.llm_manager.response_cache is not None:
+            generation_stats['response_cache'] = self.llm_manager.response_cache.get_stats()
         
         return {
             'essays': essays,
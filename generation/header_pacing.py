@@ -0,0 +1,243 @@
+"""
+Pacing from the rate-limit headers providers return on every response.
+"""
+
+import asyncio
+import re
+import time
+from datetime import datetime, timezone
+from typing import Dict, Mapping, Optional
+
+# OpenAI-style reset durations such as "1s", "6m0s", "20ms" or "1h2m3.5s"
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_UNITS = {'ms': 0.001, 's': 1.0, 'm': 60.0, 'h': 3600.0}
+
+# Header names per quota, first match wins: OpenAI (and litellm's normalized copy), then Anthropic
+QUOTA_HEADERS = {
+    'requests': {
+        'limit': ('x-ratelimit-limit-requests', 'anthropic-ratelimit-requests-limit'),
+        'remaining': ('x-ratelimit-remaining-requests', 'anthropic-ratelimit-requests-remaining'),
+        'reset': ('x-ratelimit-reset-requests', 'anthropic-ratelimit-requests-reset'),
+    },
+    'tokens': {
+        'limit': ('x-ratelimit-limit-tokens', 'anthropic-ratelimit-tokens-limit',
+                  'anthropic-ratelimit-input-tokens-limit'),
+        'remaining': ('x-ratelimit-remaining-tokens', 'anthropic-ratelimit-tokens-remaining',
+                      'anthropic-ratelimit-input-tokens-remaining'),
+        'reset': ('x-ratelimit-reset-tokens', 'anthropic-ratelimit-tokens-reset',
+                  'anthropic-ratelimit-input-tokens-reset'),
+    },
+}
+
+
+def parse_reset(value, now: Optional[datetime] = None) -> Optional[float]:
+    """Seconds until a reset given as seconds, a Go-style duration or an RFC 3339 timestamp."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return max(0.0, float(text))
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(text)
+    if parts and ''.join(n + u for n, u in parts) == text:
+        return sum(float(n) * DURATION_UNITS[u] for n, u in parts)
+    try:
+        reset_at = datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if reset_at.tzinfo is None:
+        reset_at = reset_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (reset_at - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def normalize_headers(headers: Optional[Mapping]) -> Dict[str, str]:
+    """Lower-case header names, dropping litellm's `llm_provider-` prefix."""
+    normalized = {}
+    for key, value in (headers or {}).items():
+        key = str(key).lower()
+        normalized[key[len('llm_provider-'):] if key.startswith('llm_provider-') else key] = value
+    return normalized
+
+
+def response_headers(response) -> Dict[str, str]:
+    """Provider headers of a litellm response, from its `_hidden_params`."""
+    hidden = getattr(response, '_hidden_params', None)
+    if not isinstance(hidden, dict):
+        return {}
+    return normalize_headers(hidden.get('additional_headers') or hidden.get('headers'))
+
+
+def error_headers(error: Exception) -> Dict[str, str]:
+    """Provider headers attached to a litellm exception, if any."""
+    for headers in (getattr(error, 'litellm_response_headers', None),
+                    getattr(getattr(error, 'response', None), 'headers', None),
+                    getattr(error, 'headers', None)):
+        if headers:
+            return normalize_headers(headers)
+    return {}
+
+
+def parse_rate_limit_headers(headers: Mapping) -> Dict[str, Dict[str, float]]:
+    """{'requests'|'tokens': {'limit', 'remaining', 'reset'}} for each quota the headers describe."""
+    quotas = {}
+    for quota, fields in QUOTA_HEADERS.items():
+        parsed = {}
+        for field, names in fields.items():
+            value = next((headers[name] for name in names if name in headers), None)
+            number = parse_reset(value) if field == 'reset' else _as_float(value)
+            if number is not None:
+                parsed[field] = number
+        if 'remaining' in parsed:
+            quotas[quota] = parsed
+    return quotas
+
+
+def retry_after_seconds(headers: Mapping) -> Optional[float]:
+    """Seconds a rate-limited caller should wait, from retry-after(-ms) or the exhausted quota's reset."""
+    if 'retry-after-ms' in headers:
+        ms = _as_float(headers['retry-after-ms'])
+        if ms is not None:
+            return ms / 1000
+    if 'retry-after' in headers:
+        seconds = parse_reset(headers['retry-after'])
+        if seconds is not None:
+            return seconds
+    resets = [q['reset'] for q in parse_rate_limit_headers(headers).values()
+              if q.get('remaining', 1) < 1 and 'reset' in q]
+    return max(resets) if resets else None
+
+
+def _as_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class QuotaState:
+    """Last reported state of one quota, counted down locally between responses."""
+
+    def __init__(self, limit: Optional[float], remaining: float, reset_at: Optional[float]):
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_at = reset_at
+
+    def refresh(self, now: float):
+        # Past the reset the quota is full again until a response says otherwise
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = self.limit if self.limit is not None else float('inf')
+            self.reset_at = None
+
+
+class HeaderPacer:
+    """Pace requests on the remaining quota and reset times providers report.
+
+    Each key (a provider, or a provider credential) keeps the last reported
+    requests and tokens quotas, counted down locally as requests go out.
+    A request waits for the reset when its quota cannot cover it, and once
+    less than `low_water` of a quota is left the remainder is spread evenly
+    until the reset instead of being spent in a burst. After a rate limit,
+    the key pauses until the provider's retry-after or reset time.
+    """
+
+    def __init__(self, low_water: float = 0.1, max_wait_seconds: float = 120.0):
+        self.low_water = low_water
+        self.max_wait_seconds = max_wait_seconds
+
+        self.quotas: Dict[str, Dict[str, QuotaState]] = {}
+        self.paused_until: Dict[str, float] = {}
+        self.last_sent: Dict[str, float] = {}
+        self.paced = 0
+        self.wait_seconds = 0.0
+        self.exact_resets = 0
+
+    def update(self, key: str, headers: Mapping):
+        """Take the quota state reported by a response."""
+        now = time.monotonic()
+        for quota, parsed in parse_rate_limit_headers(headers).items():
+            reset = parsed.get('reset')
+            self.quotas.setdefault(key, {})[quota] = QuotaState(
+                parsed.get('limit'), parsed['remaining'], now + reset if reset is not None else None
+            )
+
+    def record_rate_limit(self, key: str, headers: Mapping) -> Optional[float]:
+        """Pause the key until the reported reset; return the pause, or None if the headers give none."""
+        seconds = retry_after_seconds(headers)
+        if seconds is None:
+            return None
+        seconds = min(seconds, self.max_wait_seconds)
+        self.paused_until[key] = max(self.paused_until.get(key, 0.0), time.monotonic() + seconds)
+        self.exact_resets += 1
+        return seconds
+
+    def is_paused(self, key: str) -> bool:
+        return self.paused_until.get(key, 0.0) > time.monotonic()
+
+    def _delay(self, key: str, tokens: int, now: float) -> float:
+        delay = max(0.0, self.paused_until.get(key, 0.0) - now)
+        for quota, state in self.quotas.get(key, {}).items():
+            state.refresh(now)
+            if state.reset_at is None:
+                continue
+            needed = max(tokens, 1) if quota == 'tokens' else 1
+            until_reset = state.reset_at - now
+            if state.remaining < needed:
+                delay = max(delay, until_reset)
+            elif state.limit and state.remaining < self.low_water * state.limit:
+                # Spread what is left evenly over the time to the reset
+                interval = until_reset / max(state.remaining / needed, 1.0)
+                delay = max(delay, self.last_sent.get(key, 0.0) + interval - now)
+        return min(delay, self.max_wait_seconds)
+
+    async def acquire(self, key: str, tokens: int = 0) -> float:
+        """Wait until the key's reported quota allows a request; return seconds waited."""
+        waited = 0.0
+        while True:
+            now = time.monotonic()
+            delay = self._delay(key, tokens, now)
+            if delay <= 0 or waited >= self.max_wait_seconds:
+                break
+            await asyncio.sleep(delay)
+            waited += delay
+        for quota, state in self.quotas.get(key, {}).items():
+            state.remaining -= tokens if quota == 'tokens' else 1
+        self.last_sent[key] = time.monotonic()
+        if waited:
+            self.paced += 1
+            self.wait_seconds += waited
+        return waited
+
+    def reported_limits(self) -> Dict[str, Dict[str, float]]:
+        """Per-minute limits providers reported in x-ratelimit-limit-* headers, by provider key.
+
+        Per-credential keys are left out: their limits belong to one key, not the provider.
+        """
+        limits = {}
+        for key, quotas in self.quotas.items():
+            if '/' in key:
+                continue
+            reported = {f"{quota}_per_minute": state.limit for quota, state in quotas.items() if state.limit}
+            if reported:
+                limits[key] = reported
+        return limits
+
+    def get_stats(self) -> Dict:
+        return {
+            'paced_requests': self.paced,
+            'wait_seconds': round(self.wait_seconds, 1),
+            'exact_resets': self.exact_resets,
+            'remaining': {
+                key: {quota: max(0, round(state.remaining)) for quota, state in quotas.items()
+                      if state.remaining != float('inf')}
+                for key, quotas in self.quotas.items()
+            }
+        }
+
+
+def build_header_pacer(header_pacing_config: Optional[Dict]) -> Optional[HeaderPacer]:
+    """Create the pacer from the `header_pacing` section of settings.yaml."""
+    if not header_pacing_config or not header_pacing_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in header_pacing_config.items() if k != 'enabled'}
+    return HeaderPacer(**options)
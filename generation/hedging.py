@@ -0,0 +1,103 @@
+"""
+Hedged requests for cutting tail latency.
+"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+from .concurrency import percentile
+
+HEDGE_MODES = ('duplicate', 'fallback')
+
+
+class HedgingPolicy:
+    """Decide when a slow request earns a backup and keep score of the outcome.
+
+    The hedge delay for a model is the `percentile` of its completed-job
+    latencies seen so far in the run. Extra requests are capped at
+    `max_extra_fraction` of all dispatched jobs.
+    """
+
+    def __init__(self, percentile: float = 0.9, min_samples: int = 10, window_size: int = 200,
+                 max_extra_fraction: float = 0.1, mode: str = 'duplicate'):
+        if mode not in HEDGE_MODES:
+            raise ValueError(f"Unknown hedge mode '{mode}', expected one of {HEDGE_MODES}")
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.window_size = window_size
+        self.max_extra_fraction = max_extra_fraction
+        self.mode = mode
+
+        self.latencies: Dict[str, deque] = {}
+        self.dispatched = 0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.primary_wins = 0
+        self.both_failed = 0
+        self.budget_denied = 0
+
+    def record_latency(self, model_name: str, latency: float):
+        self.latencies.setdefault(model_name, deque(maxlen=self.window_size)).append(latency)
+
+    def hedge_delay(self, model_name: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None until enough samples exist."""
+        samples = self.latencies.get(model_name)
+        if not samples or len(samples) < self.min_samples:
+            return None
+        return percentile(samples, self.percentile)
+
+    def median_latency(self, model_name: str) -> Optional[float]:
+        samples = self.latencies.get(model_name)
+        return percentile(samples, 0.5) if samples else None
+
+    def try_reserve_hedge(self) -> bool:
+        """Claim budget for one extra request."""
+        if self.hedges_fired + 1 > self.max_extra_fraction * self.dispatched:
+            self.budget_denied += 1
+            return False
+        self.hedges_fired += 1
+        return True
+
+    def choose_fallback(self, model_config: Dict, models: List[Dict], exclude: Iterable[str] = ()) -> Dict:
+        """Pick the fastest other model, preferring a different provider.
+
+        Models in `exclude` (those already writing the combination) are
+        skipped; with none left the request is hedged on its own model.
+        """
+        excluded = set(exclude) | {model_config['name']}
+        others = [m for m in models if m['name'] not in excluded]
+        if not others:
+            return model_config
+        other_providers = [m for m in others if m.get('provider') != model_config.get('provider')]
+        candidates = other_providers or others
+
+        def speed(m):
+            median = self.median_latency(m['name'])
+            return median if median is not None else float('inf')
+        return min(candidates, key=speed)
+
+    def get_stats(self) -> Dict:
+        decided = self.hedge_wins + self.primary_wins
+        return {
+            'mode': self.mode,
+            'dispatched': self.dispatched,
+            'hedges_fired': self.hedges_fired,
+            'hedge_rate': round(self.hedges_fired / self.dispatched, 3) if self.dispatched else 0.0,
+            'hedge_wins': self.hedge_wins,
+            'primary_wins': self.primary_wins,
+            'hedge_win_rate': round(self.hedge_wins / decided, 3) if decided else 0.0,
+            'both_failed': self.both_failed,
+            'budget_denied': self.budget_denied,
+            'hedge_delays': {
+                name: round(self.hedge_delay(name), 3)
+                for name in self.latencies if self.hedge_delay(name) is not None
+            }
+        }
+
+
+def build_hedging_policy(hedging_config: Optional[Dict]) -> Optional[HedgingPolicy]:
+    """Create the policy from the `hedging` section of settings.yaml."""
+    if not hedging_config or not hedging_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in hedging_config.items() if k != 'enabled'}
+    return HedgingPolicy(**options)
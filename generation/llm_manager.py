@@ -3,34 +3,135 @@ import hashlib
 import time
 import random
 import logging
-from typing import Dict, List, Optional
-from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import litellm
 from litellm import acompletion, RateLimitError
 
-from .token_calculator import get_model_token_config
+from .circuit_breaker import CircuitBreaker, CircuitOpenError
+from .concurrency import AdaptiveConcurrencyController
+from .credentials import NoUsableCredentialError
+from .continuation import build_continuation_messages, build_continuation_policy, stitch, trim_to_boundary
+from .deadline import build_run_deadline
+from .header_pacing import error_headers, response_headers
+from .hedging import build_hedging_policy
+from .packing import build_packed_prompt, build_packing_policy, pack_prompts, parse_packed_essays, split_packed_result
+from .response_cache import ResponseCache, build_response_cache
+from .sampling import build_sampling_policy, response_samples, split_sampled_result
+from .runtime import ProviderRuntime, get_runtime
+from .scheduler import build_scheduler
+from .retry import (
+    FATAL_JOB, FATAL_MODEL, RATE_LIMIT, EmptyResponseError, build_retry_policy, classify_error,
+    is_credential_error
+)
+from .streaming import LengthGovernor, StreamStats
+from .timeouts import build_timeout_policy, mark_request_sent
+from .token_calculator import count_message_tokens, get_model_token_config, estimate_request_tokens
+from .usage import UsageTracker, add_call, call_cost, empty_usage, extract_usage
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Single-flight result when the leading request was cancelled or failed before it got an answer
+_ABANDONED = object()
+
 class LLMManager:
-    def __init__(self, models_config: List[Dict], base_tokens: int = 1500):
+    def __init__(self, models_config: List[Dict], base_tokens: int = 1500,
+                 rate_limits: Optional[Dict] = None, concurrency: Optional[Dict] = None,
+                 response_cache: Optional[Dict] = None, streaming: Optional[Dict] = None,
+                 hedging: Optional[Dict] = None, circuit_breaker: Optional[Dict] = None,
+                 budget: Optional[Dict] = None, prompt_caching: Optional[Dict] = None,
+                 retry: Optional[Dict] = None, runtime: Optional[ProviderRuntime] = None,
+                 token_sizing: Optional[Dict] = None, continuation: Optional[Dict] = None,
+                 packing: Optional[Dict] = None, routing: Optional[Dict] = None,
+                 deadline: Optional[Dict] = None, credential_pools: Optional[Dict] = None,
+                 header_pacing: Optional[Dict] = None, timeouts: Optional[Dict] = None,
+                 sampling: Optional[Dict] = None):
         self.models = models_config
         self.base_tokens = base_tokens
-        self.executor = ThreadPoolExecutor(max_workers=10)
         
-        # Configure litellm
-        litellm.drop_params = True
-        litellm.set_verbose = True
+        # Limiters, backoff, breakers and metrics live in the shared provider runtime;
+        # the rate_limits/concurrency/circuit_breaker settings only apply when it is created
+        self.runtime = runtime or get_runtime(models_config, rate_limits, concurrency, circuit_breaker,
+                                              credential_pools, header_pacing)
         
         # Provider backoff state: {provider: {'backoff_seconds': float, 'last_failure': timestamp}}
-        self.provider_backoff = {}
+        self.provider_backoff = self.runtime.provider_backoff
         self.max_backoff = 300  # 5 minutes max
         self.initial_backoff = 1  # Start with 1 second
         self.backoff_multiplier = 2  # Double on each retry
         
+        # Proactive per-provider RPM/TPM limiters: {provider: ProviderRateLimiter}
+        self.rate_limiters = self.runtime.rate_limiters
+        
+        # Several keys/endpoints per provider, each with its own limiter: {provider: CredentialPool}
+        self.credential_pools = self.runtime.credential_pools
+        
+        # Pacing from the remaining-quota and reset headers of provider responses
+        self.header_pacer = self.runtime.header_pacer
+        
+        # Adaptive in-flight limits per model, created on first use: {model_name: controller}
+        self.concurrency_config = self.runtime.concurrency_config
+        self.concurrency_controllers = self.runtime.concurrency_controllers
+        self.telemetry = self.runtime.telemetry
+        
+        # On-disk response cache and in-progress requests for single-flight dedup
+        self.response_cache = build_response_cache(response_cache)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        
+        # Streaming mode with time-to-first-token metrics and a length governor
+        self.streaming_config = streaming or {}
+        self.length_governor = LengthGovernor(
+            self.streaming_config.get('target_words', 1000),
+            self.streaming_config.get('length_margin', 0.2)
+        )
+        self.stream_stats = self.runtime.stream_stats
+        
+        # Optional hedging of slow requests
+        self.hedging = build_hedging_policy(hedging)
+        
+        # Per-provider circuit breakers; open circuits reroute or park their jobs
+        self.circuit_breakers = self.runtime.circuit_breakers
+        self.reroute_on_open = self.runtime.reroute_on_open
+        self.circuit_stats = self.runtime.circuit_stats
+        
+        # Token and cost accounting for every API call, with an optional run budget
+        budget = budget or {}
+        self.usage = UsageTracker(budget.get('max_tokens'), budget.get('max_cost_usd'))
+        
+        # Mark the shared seed-context prefix as cacheable where the provider needs it
+        self.prompt_caching = (prompt_caching or {}).get('enabled', False)
+        
+        # Retry classification and run-wide retry budget; models hit by a fatal
+        # error (bad key, unknown model) are aborted: {model_name: reason}
+        self.retry_policy = build_retry_policy(retry)
+        self.aborted_models: Dict[str, str] = {}
+        
+        # Count prompt tokens offline and size max_tokens per request
+        self.token_sizing = token_sizing or {}
+        
+        # Continue essays cut off at max_tokens instead of keeping the fragment
+        self.continuation = build_continuation_policy(continuation)
+        
+        # Several same-seed essays per request for models with a pack_size
+        self.packing = build_packing_policy(packing)
+        
+        # Several drafts of each prompt per request (`n`), optionally at several temperatures
+        self.sampling = build_sampling_policy(sampling)
+        
+        # Route each combination to its best model(s) instead of every model
+        self.scheduler = build_scheduler(routing, self)
+        # Models writing (or done with) each combination, which hedges and reroutes
+        # must not pick again: {combination_id: {model_name}}
+        self.combination_models: Dict[str, Set[str]] = {}
+        
+        # Optional run time budget; jobs that cannot finish in time are not started
+        self.deadline = build_run_deadline(deadline)
+        
+        # Connect/read timeouts per request and a deadline per job, with the timed-out jobs
+        self.timeouts = build_timeout_policy(timeouts)
+        
         logger.info(f"Initialized LLMManager with {len(models_config)} models")
     
     def _get_provider_backoff_time(self, provider: str) -> float:
@@ -66,18 +167,523 @@ class LLMManager:
                 'last_failure': time.time()
             }
     
+    def _get_concurrency_controller(self, model_config: Dict) -> Optional[AdaptiveConcurrencyController]:
+        """Return the model's adaptive concurrency controller, if enabled."""
+        if not self.concurrency_config.get('adaptive', False):
+            return None
+        
+        name = model_config['name']
+        if name not in self.concurrency_controllers:
+            options = {k: v for k, v in self.concurrency_config.items() if k != 'adaptive'}
+            if name in self.runtime.initial_concurrency:
+                options['initial_limit'] = self.runtime.initial_concurrency[name]
+            self.concurrency_controllers[name] = AdaptiveConcurrencyController(
+                provider=model_config.get('provider', 'unknown'), **options
+            )
+        return self.concurrency_controllers[name]
+    
+    def _use_streaming(self, model_config: Dict) -> bool:
+        """Per-model `stream` setting, falling back to the global streaming config."""
+        return model_config.get('stream', self.streaming_config.get('enabled', False))
+    
+    async def _stream_completion(self, kwargs: Dict, model_config: Dict):
+        """Stream a completion, recording TTFT and cutting it off once the essay runs long."""
+        name = model_config['name']
+        stats = self.stream_stats.setdefault(name, StreamStats())
+        
+        start = time.monotonic()
+        first_token_time = None
+        chunks = []
+        text = ''
+        approx_words = 0
+        governed = False
+        
+        stream = await acompletion(**kwargs)
+        finished = False
+        try:
+            async for chunk in stream:
+                chunks.append(chunk)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if first_token_time is None:
+                    first_token_time = time.monotonic()
+                text += delta
+                approx_words += len(delta.split())
+                # Chunk-level counts overshoot slightly, so confirm with an exact count
+                if approx_words > self.length_governor.max_words and self.length_governor.exceeded(text):
+                    governed = True
+                    break
+            finished = not governed
+        finally:
+            if not finished:
+                # Close the connection when the governor stops the stream or the job is cancelled
+                await stream.aclose()
+        
+        end = time.monotonic()
+        response = litellm.stream_chunk_builder(chunks, messages=kwargs['messages'])
+        
+        completion_tokens = response.usage.completion_tokens if getattr(response, 'usage', None) else 0
+        ttft = first_token_time - start if first_token_time is not None else None
+        stats.record(ttft, completion_tokens, end - (first_token_time or start))
+        
+        if governed:
+            trimmed = self.length_governor.trim(text)
+            stats.record_governed(len(text.split()) - len(trimmed.split()))
+            logger.info(f"Length governor stopped {name} at ~{len(text.split())} words, "
+                        f"trimmed to {len(trimmed.split())}")
+            response.choices[0].message.content = trimmed
+            response.choices[0].finish_reason = 'stop'
+        
+        return response
+    
+    async def _send(self, kwargs: Dict, model_config: Dict):
+        if kwargs.get('stream'):
+            return await self._stream_completion(kwargs, model_config)
+        return await acompletion(**kwargs)
+    
+    async def _send_request(self, kwargs: Dict, model_config: Dict, tokens: int):
+        """Wait for rate-limit capacity, then send the request.
+        
+        Providers with a credential pool are paced by the least-loaded
+        credential's own limiter and the request goes out with its key and
+        base URL; the outcome is recorded against that credential. With
+        header pacing, the quota the provider last reported for the provider
+        (or credential) is waited on too, and a rate limit pauses it until
+        the reported reset.
+        """
+        provider = model_config.get('provider', 'unknown')
+        pool = self.credential_pools.get(provider)
+        credential = None
+        if pool is None:
+            limiter = self.rate_limiters.get(provider)
+            if limiter:
+                waited = await limiter.acquire(tokens)
+                if waited > 0.5:
+                    logger.debug(f"Rate limiter held {model_config['name']} for {waited:.2f} seconds")
+        else:
+            credential = await pool.acquire(tokens)
+            if credential is None:
+                raise NoUsableCredentialError(provider)
+            kwargs = {**kwargs, **credential.request_kwargs()}
+        
+        pacer = self.header_pacer
+        key = provider if credential is None else f"{provider}/{credential.name}"
+        try:
+            if pacer is not None:
+                waited = await pacer.acquire(key, tokens)
+                if waited > 0.5:
+                    logger.debug(f"Reported quota of {key} held {model_config['name']} for {waited:.2f} seconds")
+            response = await self._call_model(kwargs, model_config)
+        except BaseException as e:
+            retry_after = None
+            if pacer is not None and isinstance(e, RateLimitError):
+                retry_after = pacer.record_rate_limit(key, error_headers(e))
+            if credential is not None:
+                pool.release(credential, error=e, retry_after=retry_after)
+            raise
+        
+        if pacer is not None:
+            pacer.update(key, response_headers(response))
+        if credential is not None:
+            call_usage = extract_usage(response)
+            pool.release(credential, call_usage, call_cost(model_config, call_usage['prompt_tokens'],
+                                                           call_usage['completion_tokens'], call_usage['cached_tokens']))
+        return response
+    
+    async def _call_model(self, kwargs: Dict, model_config: Dict):
+        """Send one completion request, holding a concurrency slot for its duration."""
+        provider = model_config.get('provider', 'unknown')
+        controller = self._get_concurrency_controller(model_config)
+        breaker = self.circuit_breakers.get(provider)
+        
+        if controller:
+            await controller.acquire()
+        if breaker and not breaker.allow_request():
+            if controller:
+                await controller.release()
+            raise CircuitOpenError(provider)
+        # Waiting for the slot, limiters and circuit does not count against the job deadline
+        mark_request_sent()
+        
+        start = time.monotonic()
+        try:
+            response = await self._send(kwargs, model_config)
+        except RateLimitError:
+            self._record_call_failure(controller, breaker, 'rate_limit')
+            self.telemetry.record_rate_limit(provider)
+            raise
+        except litellm.Timeout as e:
+            self._record_call_failure(controller, breaker, 'timeout')
+            self.timeouts.record_attempt_timeout(model_config['name'], e)
+            raise
+        except asyncio.CancelledError:
+            if breaker:
+                breaker.release_probe()
+            raise
+        except Exception as e:
+            if classify_error(e) == FATAL_JOB:
+                # An invalid request says nothing about provider health or load
+                if breaker:
+                    breaker.release_probe()
+            else:
+                self._record_call_failure(controller, breaker, 'error')
+            raise
+        finally:
+            if controller:
+                await controller.release()
+        
+        latency = time.monotonic() - start
+        call_usage = extract_usage(response)
+        self.telemetry.record_success(provider, latency,
+                                      call_usage['prompt_tokens'] + call_usage['completion_tokens'])
+        if controller:
+            controller.record_success(latency)
+        if breaker:
+            breaker.record_success(latency)
+        return response
+    
+    def _record_call_failure(self, controller: Optional[AdaptiveConcurrencyController],
+                             breaker: Optional[CircuitBreaker], kind: str):
+        if controller:
+            controller.record_failure(kind)
+        if breaker:
+            # Rate limits are handled by backoff and say nothing about an outage
+            if kind == 'rate_limit':
+                breaker.release_probe()
+            else:
+                breaker.record_failure()
+    
+    def _build_messages(self, prompt_data: Dict, model_config: Dict) -> List[Dict]:
+        """Chat messages for an essay prompt, shared by live and batch requests."""
+        prompt = prompt_data['prompt']
+        content = prompt
+        
+        # The base prompt holds the seed's research context and already comes first,
+        # so OpenAI and Gemini cache the prefix automatically. Anthropic only caches
+        # up to an explicit cache_control breakpoint.
+        base_prompt = prompt_data.get('base_prompt')
+        if (self.prompt_caching and model_config['model'].startswith('anthropic/')
+                and base_prompt and prompt.startswith(base_prompt) and len(prompt) > len(base_prompt)):
+            content = [
+                {"type": "text", "text": base_prompt, "cache_control": {"type": "ephemeral"}},
+                {"type": "text", "text": prompt[len(base_prompt):]}
+            ]
+        
+        return [
+            {
+                "role": "system",
+                "content": "You are an experienced student writer. Follow the instructions precisely to create an authentic academic essay."
+            },
+            {
+                "role": "user",
+                "content": content
+            }
+        ]
+    
+    def _record_attempt(self, job_usage: Dict, model_config: Dict,
+                        call_usage: Optional[Dict], success: bool):
+        """Count one API attempt against both the job and the run totals."""
+        add_call(job_usage, model_config, call_usage, success)
+        self.usage.record_call(model_config, call_usage, success)
+    
+    def _build_result(self, content: str, prompt_data: Dict, model_config: Dict,
+                      prompt_hash: str, cached: bool = False, usage: Optional[Dict] = None,
+                      samples: Optional[List[Dict]] = None) -> Dict:
+        """Assemble the essay dict returned to callers.
+        
+        A sampled request carries all its completions in `samples`, split into
+        essays by generate_sampled.
+        """
+        result = {
+            'content': content,
+            'model_name': model_config['name'],
+            'model_id': model_config['model'],
+            'temperature': model_config.get('temperature', 0.8),
+            'word_count': len(content.split()),
+            'prompt_hash': prompt_hash,
+            'metadata': prompt_data['metadata'],
+            'base_prompt': prompt_data.get('base_prompt', ''),
+            'modulated_prompt': prompt_data['prompt'],
+            'prompt_metadata': prompt_data.get('prompt_metadata', {}),
+            'cached': cached,
+            # Cache hits cost nothing in this run
+            'usage': usage or empty_usage()
+        }
+        if samples is not None:
+            result['samples'] = samples
+        return result
+    
+    def _cache_key(self, prompt_data: Dict, model_config: Dict) -> str:
+        """Cache key for a request, on the max_tokens actually planned for it."""
+        prompt_hash = hashlib.sha256(prompt_data['prompt'].encode()).hexdigest()
+        token_config = self._token_config(prompt_data, model_config)
+        return ResponseCache.make_key(
+            prompt_hash, model_config['model'],
+            model_config.get('temperature', 0.8), token_config['max_tokens'],
+            model_config.get('sample_count', 1)
+        )
+    
+    @staticmethod
+    def _cache_payload(result: Dict) -> Dict:
+        payload = {'content': result['content']}
+        if 'samples' in result:
+            payload['samples'] = result['samples']
+        return payload
+    
+    def _token_config(self, prompt_data: Dict, model_config: Dict) -> Dict:
+        """Token limits for one request, planned from its counted prompt when token sizing is on."""
+        if not self.token_sizing.get('enabled', False):
+            return get_model_token_config(model_config, self.base_tokens)
+        return get_model_token_config(model_config, self.base_tokens, self._count_prompt_tokens(prompt_data, model_config),
+                                      self.token_sizing)
+    
+    def _count_prompt_tokens(self, prompt_data: Dict, model_config: Dict) -> int:
+        """Prompt tokens of a request, counting the seed's shared base prompt as its own memoized block."""
+        messages = self._build_messages(prompt_data, model_config)
+        prompt = prompt_data['prompt']
+        base_prompt = prompt_data.get('base_prompt')
+        if base_prompt and prompt.startswith(base_prompt) and isinstance(messages[-1]['content'], str):
+            messages[-1] = {**messages[-1], 'content': [{'type': 'text', 'text': base_prompt},
+                                                        {'type': 'text', 'text': prompt[len(base_prompt):]}]}
+        return count_message_tokens(messages, model_config)
+    
+    def _worst_case_cost(self, prompt_data: Dict, model_config: Dict):
+        """Tokens and USD a job could spend if it uses its whole max_tokens."""
+        token_config = self._token_config(prompt_data, model_config)
+        prompt_tokens = estimate_request_tokens(prompt_data['prompt'], token_config) - token_config['max_tokens']
+        # Each of a sampled request's completions can use the whole max_tokens
+        completion_tokens = token_config['max_tokens'] * model_config.get('sample_count', 1)
+        return prompt_tokens + completion_tokens, call_cost(model_config, prompt_tokens, completion_tokens)
+    
+    async def dispatch(self, prompt_data: Dict, model_config: Dict) -> Optional[Dict]:
+        """Run one (prompt, model) job, routing around open circuits and hedging slow calls."""
+        if model_config['name'] in self.aborted_models:
+            return None
+        deadline = self.deadline
+        if deadline is not None and not deadline.admit(model_config['name']):
+            logger.info(f"Not enough time left for a {model_config['name']} job, dropping it")
+            return None
+        tokens, cost = self._worst_case_cost(prompt_data, model_config)
+        if not self.usage.reserve(tokens, cost):
+            logger.warning(f"Run budget reached, not dispatching job for {model_config['name']}")
+            if deadline is not None:
+                deadline.finish(model_config['name'], None)
+            return None
+        
+        start = time.monotonic()
+        result = None
+        try:
+            # Past the job deadline the job is cancelled, down to its in-flight request
+            result = await self.timeouts.run_job(self._route_and_dispatch(prompt_data, model_config), model_config)
+            return result
+        except asyncio.TimeoutError:
+            logger.warning(f"{model_config['name']} job timed out after "
+                           f"{self.timeouts.job_timeout(model_config):.0f}s, dropping it")
+            return None
+        finally:
+            self.usage.release(tokens, cost)
+            if deadline is not None:
+                # Only completed live calls tell how long a job takes
+                live = result is not None and not result.get('cached')
+                deadline.finish(model_config['name'], time.monotonic() - start if live else None)
+    
+    async def _route_and_dispatch(self, prompt_data: Dict, model_config: Dict) -> Optional[Dict]:
+        for _ in range(len(self.models) + 1):
+            routed_model = await self._route_to_healthy(prompt_data, model_config)
+            try:
+                return await self._dispatch_hedged(prompt_data, routed_model)
+            except CircuitOpenError as e:
+                logger.warning(f"{routed_model['name']} refused job: {e}")
+        return None
+    
+    def _provider_available(self, model_config: Dict) -> bool:
+        breaker = self.circuit_breakers.get(model_config.get('provider', 'unknown'))
+        return breaker is None or breaker.is_available()
+    
+    async def _route_to_healthy(self, prompt_data: Dict, model_config: Dict) -> Dict:
+        """Return the model itself, a healthy substitute, or wait for a half-open probe.
+        
+        A substitute is never a model already writing the prompt's combination;
+        with routing it is the scheduler's pick among the healthy models.
+        """
+        if self._provider_available(model_config):
+            return model_config
+        breaker = self.circuit_breakers[model_config.get('provider', 'unknown')]
+        
+        if self.reroute_on_open:
+            claimed = self._claimed_models(prompt_data) | {model_config['name']}
+            healthy = [
+                m for m in self.models
+                if m['name'] not in claimed and self._provider_available(m)
+            ]
+            if self.scheduler is not None:
+                healthy = self.scheduler.assign(prompt_data, healthy, count=1, track=False)
+            if healthy:
+                substitute = random.choice(healthy)
+                self._claim(prompt_data, [substitute['name']])
+                if 'pack_size' in model_config:
+                    substitute = {**substitute, 'pack_size': model_config['pack_size']}
+                self.circuit_stats['rerouted'] += 1
+                logger.info(f"Circuit open for {breaker.provider}, rerouting job to {substitute['name']}")
+                return substitute
+        
+        self.circuit_stats['parked'] += 1
+        logger.info(f"Circuit open for {breaker.provider}, parking job until a probe succeeds")
+        await breaker.wait_until_available()
+        return model_config
+    
+    async def _dispatch_hedged(self, prompt_data: Dict, model_config: Dict) -> Optional[Dict]:
+        """Run one job, hedging it if it runs unusually long."""
+        # Hedges are live calls, which a replay run never makes
+        replay = self.response_cache is not None and self.response_cache.read_only
+        if self.hedging is None or replay:
+            return await self.generate_essay(prompt_data, model_config)
+        
+        policy = self.hedging
+        policy.dispatched += 1
+        name = model_config['name']
+        start = time.monotonic()
+        primary = asyncio.create_task(self.generate_essay(prompt_data, model_config))
+        
+        delay = policy.hedge_delay(name)
+        if delay is not None:
+            try:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+            except asyncio.CancelledError:
+                await self._cancel_tasks({primary})
+                raise
+            if not done:
+                hedge_model = self._hedge_model(prompt_data, model_config)
+                # The hedge is a second call the job's reservation did not cover
+                hedge_cost = self._worst_case_cost(prompt_data, hedge_model)
+                if self.usage.reserve(*hedge_cost):
+                    try:
+                        if policy.try_reserve_hedge():
+                            return await self._race_hedge(primary, prompt_data, model_config, hedge_model, start)
+                    finally:
+                        self.usage.release(*hedge_cost)
+                else:
+                    logger.info(f"Run budget reached, not hedging slow {name} request")
+        
+        result = await primary
+        if result is not None and not result.get('cached'):
+            policy.record_latency(name, time.monotonic() - start)
+        return result
+    
+    def _hedge_model(self, prompt_data: Dict, model_config: Dict) -> Dict:
+        """The model a slow request is hedged with, never one already writing its combination."""
+        if self.hedging.mode == 'fallback':
+            return self.hedging.choose_fallback(model_config, self.models, exclude=self._claimed_models(prompt_data))
+        return model_config
+    
+    async def _race_hedge(self, primary: asyncio.Task, prompt_data: Dict, model_config: Dict,
+                          hedge_model: Dict, start: float) -> Optional[Dict]:
+        """Race a backup request against a slow primary and cancel the loser."""
+        policy = self.hedging
+        hedge_start = time.monotonic()
+        fallback = hedge_model['name'] != model_config['name']
+        if fallback:
+            self._claim(prompt_data, [hedge_model['name']])
+        # Bypass the cache and single-flight so the hedge is a genuinely separate call,
+        # not an essay the fallback model already wrote for another job
+        hedge = asyncio.create_task(self._generate_essay_uncached(prompt_data, hedge_model))
+        logger.info(f"Hedging slow {model_config['name']} request with {hedge_model['name']} "
+                    f"after {time.monotonic() - start:.1f}s")
+        
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None or task.result() is None:
+                        continue
+                    result = task.result()
+                    if task is hedge:
+                        policy.hedge_wins += 1
+                        if not fallback and self.response_cache is not None and not self.response_cache.read_only:
+                            self.response_cache.put(self._cache_key(prompt_data, model_config),
+                                                    self._cache_payload(result))
+                        # A win says how long the hedge model took, not the primary
+                        policy.record_latency(hedge_model['name'], time.monotonic() - hedge_start)
+                    else:
+                        policy.primary_wins += 1
+                        policy.record_latency(model_config['name'], time.monotonic() - start)
+                    return result
+        finally:
+            await self._cancel_tasks(pending)
+        
+        policy.both_failed += 1
+        return None
+    
+    @staticmethod
+    async def _cancel_tasks(tasks: Set[asyncio.Task]):
+        """Cancel tasks and wait until their requests are torn down."""
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    
     async def generate_essay(self, prompt_data: Dict, model_config: Dict) -> Optional[Dict]:
+        """Generate a single essay, serving it from the response cache when possible."""
+        if self.response_cache is None:
+            return await self._generate_essay_uncached(prompt_data, model_config)
+        
+        prompt_hash = hashlib.sha256(prompt_data['prompt'].encode()).hexdigest()
+        key = self._cache_key(prompt_data, model_config)
+        
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            logger.debug(f"Cache hit for {model_config['name']} ({prompt_hash[:12]})")
+            return self._build_result(cached['content'], prompt_data, model_config, prompt_hash, cached=True,
+                                      samples=cached.get('samples'))
+        
+        if self.response_cache.read_only:
+            logger.warning(f"Replay mode: no cached response for {model_config['name']} ({prompt_hash[:12]}), skipping")
+            return None
+        
+        # Single-flight: identical requests already in progress share one API call
+        if key in self._inflight:
+            result = await asyncio.shield(self._inflight[key])
+            if result is _ABANDONED:
+                # The leader was cancelled (a losing hedge, a job deadline); send the request ourselves
+                return await self.generate_essay(prompt_data, model_config)
+            if result is None:
+                return None
+            return self._build_result(result['content'], prompt_data, model_config, prompt_hash, cached=True,
+                                      samples=result.get('samples'))
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        result = _ABANDONED
+        try:
+            result = await self._generate_essay_uncached(prompt_data, model_config)
+            if result is not None:
+                self.response_cache.put(key, self._cache_payload(result))
+        finally:
+            del self._inflight[key]
+            future.set_result(result)
+        return result
+    
+    async def _generate_essay_uncached(self, prompt_data: Dict, model_config: Dict) -> Optional[Dict]:
         """Generate a single essay using specified model with rate limit handling."""
         provider = model_config.get('provider', 'unknown')
-        max_retries = 5
+        policy = self.retry_policy
+        max_retries = policy.max_attempts
+        job_usage = empty_usage()
+        policy.record_job()
         
-        # Extract prompt and metadata
+        # Extract prompt
         prompt = prompt_data['prompt']
-        metadata = prompt_data['metadata']
-        base_prompt = prompt_data.get('base_prompt', '')
-        prompt_metadata = prompt_data.get('prompt_metadata', {})
         
         for attempt in range(max_retries):
+            if model_config['name'] in self.aborted_models:
+                return None
+            # The job's reservation covers its first call; every retry has to fit the budget again
+            retry_cost = self._worst_case_cost(prompt_data, model_config) if attempt > 0 else None
+            if retry_cost is not None and not self.usage.reserve(*retry_cost):
+                logger.warning(f"Run budget reached, not retrying job for {model_config['name']}")
+                return None
             try:
                 # Check if we need to wait due to backoff
                 backoff_time = self._get_provider_backoff_time(provider)
@@ -86,115 +692,385 @@ class LLMManager:
                     await asyncio.sleep(backoff_time)
                 
                 # Prepare messages
-                messages = [
-                    {
-                        "role": "system",
-                        "content": "You are an experienced student writer. Follow the instructions precisely to create an authentic academic essay."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
+                messages = self._build_messages(prompt_data, model_config)
                 
                 # Calculate model-specific token configuration
-                token_config = get_model_token_config(model_config, self.base_tokens)
+                token_config = self._token_config(prompt_data, model_config)
                 
                 # Log token configuration for debugging
                 if attempt == 0:  # Only log on first attempt
                     logger.debug(f"Token config for {model_config['name']}: max_tokens={token_config['max_tokens']}, "
                                 f"estimated_words={token_config['estimated_words']}, provider={token_config['provider']}")
                 
-                # Model-specific adjustments
-                kwargs = {
-                    "model": model_config["model"],
-                    "messages": messages,
-                    "temperature": model_config.get("temperature", 0.8),
-                    "max_tokens": token_config["max_tokens"]
-                }
-                
-                # Add provider-specific parameters
-                if model_config["provider"] == "anthropic" and "claude-3-7" in model_config["model"]:
-                    # Enable Claude's thinking mode if available
-                    if "temperature" in kwargs and kwargs["temperature"] == 1.0:
-                        kwargs["reasoning_effort"] = "low"
-                elif model_config["provider"] == "gemini":
-                    kwargs["reasoning_effort"] = "low"
+                kwargs = self._request_kwargs(messages, model_config, token_config)
                 
-                # Make the API call
-                response = await acompletion(**kwargs)
+                # Make the API call once the provider (or a pooled credential) has capacity
+                response = await self._send_request(kwargs, model_config,
+                                                    estimate_request_tokens(prompt, token_config))
                 
                 content = response.choices[0].message.content
+                call_usage = extract_usage(response)
+                self._record_attempt(job_usage, model_config, call_usage, content is not None)
     
                 if content is None:
-                    logger.error(f"LLM {model_config['name']} returned None content for prompt")
                     logger.debug(f"Failing prompt: {prompt[:200]}...")
-                    return None
+                    raise EmptyResponseError(model_config['name'])
+                
+                # A cut-off JSON array cannot be continued; packing falls back to single requests instead.
+                # Sampled drafts are kept as they are rather than continued one by one
+                sample_count = model_config.get('sample_count', 1)
+                if (call_usage['finish_reason'] == 'length' and self.continuation is not None
+                        and model_config.get('pack_size', 1) == 1 and sample_count == 1):
+                    content = await self.continue_truncated(content, kwargs, model_config, job_usage)
                 
                 # Calculate prompt hash for tracking
                 prompt_hash = hashlib.sha256(prompt.encode()).hexdigest()
                 
-                return {
-                    'content': content,
-                    'model_name': model_config['name'],
-                    'model_id': model_config['model'],
-                    'temperature': model_config.get('temperature', 0.8),
-                    'word_count': len(content.split()),
-                    'prompt_hash': prompt_hash,
-                    'metadata': metadata,
-                    'base_prompt': base_prompt,
-                    'modulated_prompt': prompt,
-                    'prompt_metadata': prompt_metadata
-                }
+                return self._build_result(content, prompt_data, model_config, prompt_hash, usage=job_usage,
+                                          samples=response_samples(response) if sample_count > 1 else None)
                 
-            except RateLimitError as e:
-                logger.warning(f"Rate limit error for {model_config['name']} (provider: {provider}): {e}")
-                self._update_provider_backoff(provider)
+            except CircuitOpenError:
+                # Stop retrying against a provider that is down; dispatch reroutes the job
+                raise
+                    
+            except Exception as e:
+                kind = classify_error(e)
+                if isinstance(e, EmptyResponseError):
+                    # Already counted with the response's usage
+                    policy.empty_responses += 1
+                else:
+                    self._record_attempt(job_usage, model_config, None, False)
                 
-                if attempt < max_retries - 1:
-                    backoff_time = self._get_provider_backoff_time(provider)
-                    logger.info(f"Retrying after {backoff_time:.2f} seconds (attempt {attempt + 1}/{max_retries})")
+                pool = self.credential_pools.get(provider)
+                if kind == FATAL_MODEL and pool is not None and is_credential_error(e) and pool.usable:
+                    # Only the credential is bad; the next attempt uses another one
+                    logger.warning(f"Credential error for {model_config['name']}, retrying with another key: {e}")
+                    continue
+                if kind == FATAL_MODEL:
+                    self._abort_model(model_config, e)
+                    return None
+                if kind == FATAL_JOB:
+                    policy.fatal[FATAL_JOB] += 1
+                    logger.error(f"Non-retryable error from {model_config['name']}, dropping job: {e}")
+                    return None
+                
+                if kind == RATE_LIMIT:
+                    logger.warning(f"Rate limit error for {model_config['name']} (provider: {provider}): {e}")
+                    # With a credential pool only the limited key cools down; with a
+                    # reported reset the header pacer already waits exactly that long
+                    if pool is None and not (self.header_pacer and self.header_pacer.is_paused(provider)):
+                        self._update_provider_backoff(provider)
                 else:
+                    logger.error(f"Error generating essay with {model_config['name']}: {e}",
+                                 exc_info=not isinstance(e, EmptyResponseError))
+                
+                if attempt == max_retries - 1:
                     logger.error(f"Max retries exceeded for {model_config['name']} after {max_retries} attempts")
                     return None
-                    
-            except Exception as e:
-                logger.error(f"Error generating essay with {model_config['name']}: {e}", exc_info=True)
-                if attempt < max_retries - 1:
-                    logger.info(f"Retrying after error (attempt {attempt + 1}/{max_retries})")
-                    await asyncio.sleep(1)  # Brief pause before retry
-                else:
+                
+                if kind == RATE_LIMIT:
+                    # The provider backoff is applied at the top of the next attempt
+                    backoff_time = self._get_provider_backoff_time(provider)
+                    logger.info(f"Retrying after {backoff_time:.2f} seconds (attempt {attempt + 1}/{max_retries})")
+                    continue
+                
+                if not policy.try_acquire_retry():
+                    logger.warning(f"Run retry budget exhausted, dropping job for {model_config['name']}")
                     return None
+                delay = policy.delay(attempt)
+                logger.info(f"Retrying after {delay:.2f} seconds (attempt {attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
+            
+            finally:
+                if retry_cost is not None:
+                    self.usage.release(*retry_cost)
     
-    async def generate_batch(self, prompts: List[Dict], models: Optional[List[Dict]] = None) -> List[Dict]:
-        """Generate essays for multiple prompts across multiple models."""
-        if models is None:
-            models = self.models
+    def _request_kwargs(self, messages: List[Dict], model_config: Dict, token_config: Dict) -> Dict:
+        """Build the litellm completion arguments for one request."""
+        # Model-specific adjustments
+        kwargs = {
+            "model": model_config["model"],
+            "messages": messages,
+            "temperature": model_config.get("temperature", 0.8),
+            "max_tokens": token_config["max_tokens"]
+        }
+        
+        # The length governor follows a single completion, so sampled requests are not streamed
+        sample_count = model_config.get("sample_count", 1)
+        if sample_count > 1:
+            kwargs["n"] = sample_count
+        elif self._use_streaming(model_config):
+            kwargs["stream"] = True
+            kwargs["stream_options"] = {"include_usage": True}
+        
+        # Self-hosted or proxied endpoints, e.g. the local fake provider
+        if model_config.get("api_base"):
+            kwargs["api_base"] = model_config["api_base"]
+        if model_config.get("api_key"):
+            kwargs["api_key"] = model_config["api_key"]
+        
+        timeout = self.timeouts.request_timeout(model_config)
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        
+        # Add provider-specific parameters
+        if model_config["provider"] == "anthropic" and "claude-3-7" in model_config["model"]:
+            # Enable Claude's thinking mode if available
+            if "temperature" in kwargs and kwargs["temperature"] == 1.0:
+                kwargs["reasoning_effort"] = "low"
+        elif model_config["provider"] == "gemini":
+            kwargs["reasoning_effort"] = "low"
+        
+        return kwargs
+    
+    async def continue_truncated(self, content: str, kwargs: Dict, model_config: Dict, job_usage: Dict) -> str:
+        """Extend an essay cut off at max_tokens and stitch the pieces together.
         
+        Each continuation resends the original request with the partial essay
+        as an assistant turn. On failure the essay is kept as far as it got.
+        """
+        policy = self.continuation
+        policy.truncated += 1
+        for _ in range(policy.max_continuations):
+            partial = trim_to_boundary(content, policy.max_trim_chars)
+            request = {**kwargs, "messages": build_continuation_messages(kwargs["messages"], partial)}
+            # The resent request carries the partial essay too, so count it for the limiter
+            prompt_tokens = count_message_tokens(request["messages"], model_config)
+            tokens = prompt_tokens + request["max_tokens"]
+            # Each continuation is a further call the job's reservation did not cover
+            reserved = (tokens, call_cost(model_config, prompt_tokens, request["max_tokens"]))
+            if not self.usage.reserve(*reserved):
+                logger.warning(f"Run budget reached, keeping truncated {model_config['name']} essay")
+                return content
+            try:
+                response = await self._send_request(request, model_config, tokens)
+            except Exception as e:
+                self._record_attempt(job_usage, model_config, None, False)
+                policy.failed += 1
+                logger.warning(f"Continuation for {model_config['name']} failed, keeping truncated essay: {e}")
+                return content
+            finally:
+                self.usage.release(*reserved)
+            
+            piece = response.choices[0].message.content
+            call_usage = extract_usage(response)
+            self._record_attempt(job_usage, model_config, call_usage, bool(piece))
+            if not piece:
+                policy.failed += 1
+                return content
+            
+            policy.continuations += 1
+            content = stitch(partial, piece)
+            if call_usage['finish_reason'] != 'length':
+                policy.completed += 1
+                return content
+        
+        logger.warning(f"{model_config['name']} essay still truncated after {policy.max_continuations} continuations")
+        return content
+    
+    def _abort_model(self, model_config: Dict, error: Exception):
+        """Stop dispatching to a model after an error no retry can fix."""
+        self.retry_policy.fatal[FATAL_MODEL] += 1
+        name = model_config['name']
+        if name not in self.aborted_models:
+            self.aborted_models[name] = f"{type(error).__name__}: {error}"
+            logger.error(f"Fatal error from {name}, aborting its remaining jobs: {error}")
+    
+    async def generate_batch(self, prompts: List[Dict], models: Optional[List[Dict]] = None,
+                             skip: Optional[Set[Tuple[str, str]]] = None) -> List[Dict]:
+        """Generate essays for multiple prompts across multiple models.
+        
+        (combination_id, model_name) pairs in `skip` are not dispatched.
+        """
         tasks = []
+        task_models = []
+        attempted = 0
         
-        for prompt_data in prompts:
-            for model_config in models:
-                task = self.generate_essay(prompt_data, model_config)
-                tasks.append(task)
+        for model_config, pending in self.plan_jobs(prompts, models, skip):
+            attempted += len(pending)
+            for pack in self.pack_jobs(pending, model_config):
+                tasks.append(self.generate_assigned(pack, model_config))
+                task_models.append(model_config)
         
         # Run all tasks concurrently
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
-        # Filter out exceptions and None results
+        # Filter out exceptions and failed jobs; a cancelled task comes back as CancelledError
         essays = []
-        for i, result in enumerate(results):
-            if isinstance(result, Exception):
-                prompt_index = i % len(prompts)
-                model_index = i // len(prompts)
-                logger.error(f"Task exception for prompt {prompt_index}, model {models[model_index]['name']}: {result}")
+        for model_config, result in zip(task_models, results):
+            if isinstance(result, BaseException):
+                logger.error(f"Task exception for model {model_config['name']}: {result}")
                 continue
-            if result is not None:
-                essays.append(result)
+            essays.extend(result)
         
-        logger.info(f"Generated {len(essays)} essays out of {len(tasks)} attempted")
+        logger.info(f"Generated {len(essays)} essays out of {attempted} attempted")
         return essays
     
+    def essays_per_combination(self) -> int:
+        """Essays each combination yields: one per routed model, or one per configured model."""
+        if self.scheduler is not None:
+            return min(self.scheduler.models_per_combination, len(self.models))
+        return len(self.models)
+    
+    def pending_job_count(self, combinations: List[Dict], skip: Optional[Set[Tuple[str, str]]] = None) -> int:
+        """Number of essays still to generate for these combinations."""
+        done = self._done_models(skip)
+        if self.scheduler is None:
+            return sum(1 for combo in combinations for m in self.models
+                       if m['name'] not in done.get(combo.get('combination_id'), set()))
+        return sum(max(0, self.essays_per_combination() - len(done.get(combo.get('combination_id'), set())))
+                   for combo in combinations)
+    
+    @staticmethod
+    def _done_models(skip: Optional[Set[Tuple[str, str]]]) -> Dict[str, Set[str]]:
+        done: Dict[str, Set[str]] = {}
+        for combination_id, model_name in skip or set():
+            done.setdefault(combination_id, set()).add(model_name)
+        return done
+    
+    def plan_jobs(self, prompts: List[Dict], models: Optional[List[Dict]] = None,
+                  skip: Optional[Set[Tuple[str, str]]] = None) -> List[Tuple[Dict, List[Dict]]]:
+        """Decide which model writes which prompt, as (model, prompts) pairs.
+        
+        Without routing every prompt goes to every model. With routing the
+        scheduler picks each prompt's models. (combination_id, model_name)
+        pairs in `skip` are already done and count towards the prompt's essays.
+        """
+        if models is None:
+            models = self.models
+        done = self._done_models(skip)
+        by_model: Dict[str, List[Dict]] = {m['name']: [] for m in models}
+        for prompt_data in prompts:
+            finished = done.get(prompt_data['metadata'].get('combination_id'), set())
+            if self.scheduler is None:
+                chosen = [m for m in models if m['name'] not in finished]
+            else:
+                count = self.essays_per_combination() - len(finished)
+                chosen = self.scheduler.assign(prompt_data, models, exclude=finished, count=count)
+            self._claim(prompt_data, finished)
+            self._claim(prompt_data, [m['name'] for m in chosen])
+            for model_config in chosen:
+                by_model[model_config['name']].append(prompt_data)
+        return [(m, by_model[m['name']]) for m in models if by_model[m['name']]]
+    
+    @staticmethod
+    def _combination_ids(prompt_data: Dict) -> List[str]:
+        metadata = prompt_data.get('metadata', {})
+        if 'combination_ids' in metadata:
+            return [cid for cid in metadata['combination_ids'] if cid is not None]
+        return [metadata['combination_id']] if metadata.get('combination_id') is not None else []
+    
+    def _claim(self, prompt_data: Dict, model_names: Iterable[str]):
+        """Record models as writing the prompt's combination(s)."""
+        for combination_id in self._combination_ids(prompt_data):
+            self.combination_models.setdefault(combination_id, set()).update(model_names)
+    
+    def _claimed_models(self, prompt_data: Dict) -> Set[str]:
+        """Models already writing (or done with) any of the prompt's combinations."""
+        claimed = set()
+        for combination_id in self._combination_ids(prompt_data):
+            claimed |= self.combination_models.get(combination_id, set())
+        return claimed
+    
+    async def generate_assigned(self, prompts: List[Dict], model_config: Dict,
+                                tried: Tuple[str, ...] = ()) -> List[Dict]:
+        """Generate a pack of prompts on their assigned model.
+        
+        With routing, the outcome feeds the scheduler, and prompts the model
+        failed on are reassigned to another model up to max_reassignments times.
+        """
+        start = time.monotonic()
+        essays = await self.generate_packed(prompts, model_config)
+        scheduler = self.scheduler
+        if scheduler is None:
+            return essays
+        
+        # Counted per prompt: a sampled job delivers several drafts of one combination.
+        # A hedge or reroute may have written it on another model, which gets the credit
+        delivered = {essay['metadata'].get('combination_id'): essay['model_name'] for essay in essays}
+        missing = [p for p in prompts if p['metadata'].get('combination_id') not in delivered]
+        substitutes: Dict[str, int] = {}
+        for name in delivered.values():
+            substitutes[name] = substitutes.get(name, 0) + 1
+        own = substitutes.pop(model_config['name'], 0)
+        scheduler.record(model_config['name'], own, len(missing), time.monotonic() - start, substitutes)
+        tried = tried + (model_config['name'],)
+        if not missing or len(tried) > scheduler.max_reassignments:
+            return essays
+        
+        retries = []
+        for prompt_data in missing:
+            exclude = set(tried) | self._claimed_models(prompt_data)
+            for alternative in scheduler.assign(prompt_data, self.models, exclude=exclude, count=1):
+                self._claim(prompt_data, [alternative['name']])
+                scheduler.reassigned += 1
+                logger.info(f"Reassigning failed job from {model_config['name']} to {alternative['name']}")
+                retries.append(self.generate_assigned([prompt_data], alternative, tried))
+        for result in await asyncio.gather(*retries):
+            essays.extend(result)
+        return essays
+    
+    def pack_jobs(self, prompts: List[Dict], model_config: Dict) -> List[List[Dict]]:
+        """Group a model's prompts into the requests they will be sent in."""
+        pack_size = model_config.get('pack_size', 1) if self.packing is not None else 1
+        return pack_prompts(prompts, pack_size)
+    
+    async def generate_packed(self, prompts: List[Dict], model_config: Dict) -> List[Dict]:
+        """Generate essays for prompts sharing a seed in one request.
+        
+        Briefs whose essay is missing or unparseable in the response are
+        retried as single requests.
+        """
+        if len(prompts) == 1:
+            if self.sampling is not None:
+                return await self.generate_sampled(prompts[0], model_config)
+            result = await self.dispatch(prompts[0], model_config)
+            return [result] if result is not None else []
+        
+        policy = self.packing
+        policy.packed_requests += 1
+        result = await self.dispatch(build_packed_prompt(prompts), {**model_config, 'pack_size': len(prompts)})
+        parsed = parse_packed_essays(result['content'], len(prompts), policy.min_words) if result else {}
+        essays = split_packed_result(result, prompts, parsed) if parsed else []
+        policy.packed_essays += len(essays)
+        
+        missing = [prompt_data for i, prompt_data in enumerate(prompts) if i not in parsed]
+        if missing:
+            policy.fallback_essays += len(missing)
+            logger.warning(f"Packed request to {model_config['name']} returned {len(parsed)}/{len(prompts)} "
+                           f"usable essays, sending {len(missing)} as single requests")
+            singles = await asyncio.gather(*(self.dispatch(prompt_data, model_config) for prompt_data in missing))
+            essays.extend(result for result in singles if result is not None)
+        return essays
+    
+    async def generate_sampled(self, prompt_data: Dict, model_config: Dict) -> List[Dict]:
+        """Generate several drafts of one prompt, one request per sampling temperature.
+        
+        Each completion becomes its own essay; all share the prompt (and so
+        its prompt_id) and are numbered by `sample_index`.
+        """
+        policy = self.sampling
+        calls = policy.plan(model_config)
+        results = await asyncio.gather(*(self.dispatch(prompt_data, call_config) for call_config, _ in calls))
+        
+        essays = []
+        for (_, samples), result in zip(calls, results):
+            if result is None:
+                continue
+            if samples > 1:
+                policy.sampled_requests += 1
+            essays.extend(split_sampled_result(result))
+        for index, essay in enumerate(essays):
+            essay['sample_index'] = index
+        policy.sampled_essays += len(essays)
+        return essays
+    
+    def essays_per_job(self) -> float:
+        """Average essays one (prompt, model) job yields: its drafts when sampling, else one."""
+        if self.sampling is None or not self.models:
+            return 1
+        return sum(self.sampling.essays_per_job(m) for m in self.models) / len(self.models)
+    
     def validate_api_keys(self) -> Dict[str, bool]:
         """Check which API keys are configured."""
         import os
@@ -206,6 +1082,10 @@ class LLMManager:
             'perplexity': bool(os.getenv('PERPLEXITY_API_KEY'))
         }
         
+        # Pooled providers need a key (or their own endpoint) on at least one credential
+        for provider, pool in self.credential_pools.items():
+            key_status[provider] = any(c.api_key or c.api_base for c in pool.credentials)
+        
         return key_status
     
     def get_backoff_status(self) -> Dict[str, Dict]:
@@ -222,4 +1102,49 @@ class LLMManager:
                 'is_backed_off': remaining_backoff > 0
             }
         
-        return status
\ No newline at end of file
+        # Current adaptive concurrency limits, grouped under their provider
+        for model_name, controller in self.concurrency_controllers.items():
+            entry = status.setdefault(controller.provider, {
+                'backoff_seconds': 0,
+                'time_since_failure': None,
+                'remaining_backoff': 0,
+                'is_backed_off': False
+            })
+            entry.setdefault('concurrency', {})[model_name] = controller.get_status()
+        
+        return status
+    
+    def get_circuit_status(self) -> Dict:
+        """Get breaker state and health score per provider, plus rerouting counts."""
+        return {
+            'providers': {provider: breaker.get_status() for provider, breaker in self.circuit_breakers.items()},
+            **self.circuit_stats
+        }
+    
+    def get_stream_metrics(self) -> Dict[str, Dict]:
+        """Get time-to-first-token, tokens/sec and governor counts per model."""
+        return {name: stats.to_dict() for name, stats in self.stream_stats.items()}
+    
+    def get_header_pacing_stats(self) -> Dict:
+        """Get requests held by reported quotas, exact resets applied and the last known quota per key."""
+        return self.header_pacer.get_stats()
+    
+    def get_timeout_stats(self) -> Dict:
+        """Get the configured timeouts, attempt timeouts per model and the jobs dropped at their deadline."""
+        return self.timeouts.get_stats()
+    
+    def get_credential_usage(self) -> Dict[str, Dict]:
+        """Get requests, tokens, cost and errors per pooled credential, by provider."""
+        return {provider: pool.get_stats() for provider, pool in self.credential_pools.items()}
+    
+    def get_retry_stats(self) -> Dict:
+        """Get retry counts, the retry budget and models aborted on fatal errors."""
+        return {**self.retry_policy.get_stats(), 'aborted_models': dict(self.aborted_models)}
+    
+    def get_usage_summary(self) -> Dict:
+        """Get run-wide and per-model token usage, cost and budget state."""
+        return self.usage.summary()
+    
+    def get_rate_limit_status(self) -> Dict[str, Dict]:
+        """Get current bucket levels for all rate-limited providers."""
+        return {provider: limiter.get_status() for provider, limiter in self.rate_limiters.items()}
\ No newline at end of file
@@ -0,0 +1,151 @@
+"""
+Packing several essays that share a research seed into one request.
+"""
+
+import hashlib
+import json
+import re
+from typing import Dict, List, Optional
+
+from .usage import empty_usage
+
+JSON_FENCE = re.compile(r'^```(?:json)?\s*|\s*```$')
+
+
+def pack_prompts(prompts: List[Dict], pack_size: int) -> List[List[Dict]]:
+    """Split prompts into packs of up to `pack_size` that share a base prompt.
+
+    Only prompts built from the same seed share the research context, so
+    packs never mix seeds. Prompts without a base/diversity split go alone.
+    """
+    if pack_size <= 1:
+        return [[prompt_data] for prompt_data in prompts]
+
+    packs: List[List[Dict]] = []
+    open_packs: Dict[str, List[Dict]] = {}
+    for prompt_data in prompts:
+        base_prompt = prompt_data.get('base_prompt')
+        if not base_prompt or not prompt_data.get('diversity_prompt'):
+            packs.append([prompt_data])
+            continue
+        pack = open_packs.get(base_prompt)
+        if pack is None or len(pack) >= pack_size:
+            pack = []
+            open_packs[base_prompt] = pack
+            packs.append(pack)
+        pack.append(prompt_data)
+    return packs
+
+
+def build_packed_prompt(prompts: List[Dict]) -> Dict:
+    """One prompt asking for an essay per brief, answered as a JSON array."""
+    count = len(prompts)
+    briefs = '\n\n'.join(
+        f"ESSAY {i}:\n{prompt_data['diversity_prompt']}" for i, prompt_data in enumerate(prompts, 1)
+    )
+    prompt = f"""{prompts[0]['base_prompt']}
+
+Write {count} separate essays on this research context, one for each brief below. Each essay follows the essay requirements above and only its own brief, and must not refer to the other essays.
+
+{briefs}
+
+Respond with ONLY a JSON array of {count} objects, one per brief, each of the form {{"essay": <brief number>, "text": "<the full essay>"}}."""
+    return {
+        'prompt': prompt,
+        'base_prompt': prompts[0]['base_prompt'],
+        'prompt_metadata': {},
+        'metadata': {'packed': count,
+                     'combination_ids': [prompt_data['metadata'].get('combination_id') for prompt_data in prompts]}
+    }
+
+
+def parse_packed_essays(content: str, count: int, min_words: int = 0) -> Dict[int, str]:
+    """Map brief index (0-based) to essay text for every usable essay in a packed response.
+
+    Entries that are missing, malformed or shorter than `min_words` are left
+    out so their briefs can be retried as single requests.
+    """
+    text = JSON_FENCE.sub('', content.strip())
+    start, end = text.find('['), text.rfind(']')
+    if start < 0 or end < start:
+        return {}
+    try:
+        items = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    if not isinstance(items, list):
+        return {}
+
+    essays: Dict[int, str] = {}
+    for position, item in enumerate(items):
+        if isinstance(item, str):
+            index, essay = position, item
+        elif isinstance(item, dict) and isinstance(item.get('text'), str):
+            number = item.get('essay')
+            index = number - 1 if isinstance(number, int) else position
+            essay = item['text']
+        else:
+            continue
+        if 0 <= index < count and index not in essays and len(essay.split()) >= max(min_words, 1):
+            essays[index] = essay.strip()
+    return essays
+
+
+def share_usage(usage: Dict, count: int, index: int) -> Dict:
+    """The part of a packed request's usage charged to one of its essays."""
+    share = empty_usage()
+    for field in ('prompt_tokens', 'completion_tokens', 'reasoning_tokens', 'cached_tokens'):
+        total = usage.get(field, 0)
+        # Spread the remainder over the first essays so the shares add up
+        share[field] = total // count + (1 if index < total % count else 0)
+    share['cost_usd'] = usage.get('cost_usd', 0.0) / count
+    share['attempts'] = usage.get('attempts', 0)
+    share['failed_attempts'] = usage.get('failed_attempts', 0)
+    share['finish_reason'] = usage.get('finish_reason')
+    return share
+
+
+def split_packed_result(result: Dict, prompts: List[Dict], essays: Dict[int, str]) -> List[Dict]:
+    """One essay dict per parsed essay, with its own prompt, metadata and hash."""
+    usage = result.get('usage') or empty_usage()
+    split = []
+    for index, content in sorted(essays.items()):
+        prompt_data = prompts[index]
+        split.append({
+            **result,
+            'content': content,
+            'word_count': len(content.split()),
+            'prompt_hash': hashlib.sha256(prompt_data['prompt'].encode()).hexdigest(),
+            'metadata': prompt_data['metadata'],
+            'base_prompt': prompt_data.get('base_prompt', ''),
+            'modulated_prompt': prompt_data['prompt'],
+            'prompt_metadata': prompt_data.get('prompt_metadata', {}),
+            'usage': share_usage(usage, len(prompts), index)
+        })
+    return split
+
+
+class PackingPolicy:
+    """Minimum essay length accepted from a packed response, plus counts."""
+
+    def __init__(self, min_words: int = 300):
+        self.min_words = min_words
+
+        self.packed_requests = 0
+        self.packed_essays = 0
+        self.fallback_essays = 0
+
+    def get_stats(self) -> Dict:
+        return {
+            'packed_requests': self.packed_requests,
+            'packed_essays': self.packed_essays,
+            'fallback_essays': self.fallback_essays
+        }
+
+
+def build_packing_policy(packing_config: Optional[Dict]) -> Optional[PackingPolicy]:
+    """Create the policy from the `packing` section of settings.yaml."""
+    if not packing_config or not packing_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in packing_config.items() if k != 'enabled'}
+    return PackingPolicy(**options)
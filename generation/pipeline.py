@@ -0,0 +1,102 @@
+"""
+Throughput tracking for the pipelined essay generation mode.
+"""
+
+import time
+from typing import Dict, Optional
+
+
+class PipelineStats:
+    """Track in-flight concurrency and completion rate for a pipelined run."""
+
+    def __init__(self, num_workers: int):
+        self.num_workers = num_workers
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        # A sampled job saves several essays, a failed one none
+        self.essays_delivered = 0
+
+        self._start_time: Optional[float] = None
+        self._end_time: Optional[float] = None
+        self._last_change: Optional[float] = None
+        # Integral of in-flight count over time, used for the time-weighted average
+        self._in_flight_area = 0.0
+
+    def start_run(self):
+        """Mark the beginning of the run."""
+        now = time.monotonic()
+        self._start_time = now
+        self._last_change = now
+
+    def end_run(self):
+        """Mark the end of the run."""
+        self._advance(time.monotonic())
+        self._end_time = self._last_change
+
+    def job_started(self):
+        """Record that a worker picked up a job."""
+        self._advance(time.monotonic())
+        self.in_flight += 1
+        self.started += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def job_finished(self, success: bool):
+        """Record that a worker finished a job."""
+        self._advance(time.monotonic())
+        self.in_flight -= 1
+        if success:
+            self.completed += 1
+        else:
+            self.failed += 1
+
+    def essays_saved(self, count: int):
+        """Record essays a job delivered to the database."""
+        self.essays_delivered += count
+
+    def _advance(self, now: float):
+        if self._last_change is None:
+            self._start_time = now
+            self._last_change = now
+            return
+        self._in_flight_area += self.in_flight * (now - self._last_change)
+        self._last_change = now
+
+    @property
+    def elapsed_seconds(self) -> float:
+        if self._start_time is None:
+            return 0.0
+        end = self._end_time if self._end_time is not None else time.monotonic()
+        return max(0.0, end - self._start_time)
+
+    @property
+    def average_in_flight(self) -> float:
+        """Time-weighted mean number of jobs in flight."""
+        elapsed = self.elapsed_seconds
+        if elapsed == 0:
+            return 0.0
+        return self._in_flight_area / elapsed
+
+    @property
+    def essays_per_minute(self) -> float:
+        elapsed = self.elapsed_seconds
+        if elapsed == 0:
+            return 0.0
+        return self.essays_delivered / elapsed * 60
+
+    def to_dict(self) -> Dict:
+        """Summarize the run for generation statistics."""
+        return {
+            'num_workers': self.num_workers,
+            'jobs_started': self.started,
+            'jobs_completed': self.completed,
+            'jobs_failed': self.failed,
+            'essays_delivered': self.essays_delivered,
+            'peak_in_flight': self.peak_in_flight,
+            'average_in_flight': round(self.average_in_flight, 2),
+            'worker_utilization': round(self.average_in_flight / self.num_workers, 3) if self.num_workers else 0.0,
+            'elapsed_seconds': round(self.elapsed_seconds, 2),
+            'essays_per_minute': round(self.essays_per_minute, 2)
+        }
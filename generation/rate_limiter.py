@@ -0,0 +1,127 @@
+"""
+Proactive per-provider rate limiting with request and token buckets.
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+
+
+class TokenBucket:
+    """Continuously refilling bucket measured in units per minute."""
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60.0
+        # Allow at most one minute worth of burst by default
+        self.capacity = capacity if capacity is not None else per_minute
+        self.available = self.capacity
+        self.last_refill = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def time_until_available(self, amount: float) -> float:
+        """Seconds until `amount` units can be consumed."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.available -= min(amount, self.capacity)
+
+
+class ProviderRateLimiter:
+    """Requests/min and tokens/min limiter for a single provider.
+
+    Callers queue on an asyncio.Lock, which hands ownership over in FIFO
+    order, so only the head of the queue sleeps while capacity refills and
+    waiters are released one at a time instead of all at once.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None):
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._lock = asyncio.Lock()
+        self.total_wait_seconds = 0.0
+        self.waiting = 0
+
+    def limits(self) -> Tuple[Optional[float], Optional[float]]:
+        """Current (requests per minute, tokens per minute); None where unlimited."""
+        return (self.request_bucket.per_minute if self.request_bucket else None,
+                self.token_bucket.per_minute if self.token_bucket else None)
+
+    def set_limits(self, requests_per_minute: Optional[float], tokens_per_minute: Optional[float]):
+        """Replace the limits, starting each bucket full."""
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def _time_until_available(self, tokens: int) -> float:
+        wait = 0.0
+        if self.request_bucket:
+            wait = max(wait, self.request_bucket.time_until_available(1))
+        if self.token_bucket:
+            wait = max(wait, self.token_bucket.time_until_available(tokens))
+        return wait
+
+    async def acquire(self, tokens: int = 0) -> float:
+        """Wait until one request costing `tokens` fits; return seconds waited."""
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = self._time_until_available(tokens)
+                    if wait <= 0:
+                        break
+                    await asyncio.sleep(wait)
+                if self.request_bucket:
+                    self.request_bucket.consume(1)
+                if self.token_bucket:
+                    self.token_bucket.consume(tokens)
+        finally:
+            self.waiting -= 1
+        waited = time.monotonic() - start
+        self.total_wait_seconds += waited
+        return waited
+
+    def headroom(self) -> float:
+        """Fraction of capacity free right now, 0.0 while requests are queued."""
+        if self.waiting:
+            return 0.0
+        fractions = []
+        for bucket in (self.request_bucket, self.token_bucket):
+            if bucket:
+                bucket._refill()
+                fractions.append(bucket.available / bucket.capacity)
+        return min(fractions) if fractions else 1.0
+
+    def get_status(self) -> Dict:
+        status = {'waiting': self.waiting, 'total_wait_seconds': round(self.total_wait_seconds, 2)}
+        if self.request_bucket:
+            self.request_bucket._refill()
+            status['requests_per_minute'] = self.request_bucket.per_minute
+            status['requests_available'] = round(self.request_bucket.available, 1)
+        if self.token_bucket:
+            self.token_bucket._refill()
+            status['tokens_per_minute'] = self.token_bucket.per_minute
+            status['tokens_available'] = round(self.token_bucket.available)
+        return status
+
+
+def build_rate_limiters(rate_limits: Optional[Dict]) -> Dict[str, ProviderRateLimiter]:
+    """Create limiters from the `rate_limits` section of settings.yaml."""
+    limiters = {}
+    for provider, limits in (rate_limits or {}).items():
+        limits = limits or {}
+        rpm = limits.get('requests_per_minute')
+        tpm = limits.get('tokens_per_minute')
+        if rpm or tpm:
+            limiters[provider] = ProviderRateLimiter(rpm, tpm)
+    return limiters
@@ -0,0 +1,145 @@
+"""
+Persistent, content-addressed cache of LLM responses.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_MODES = ('read_write', 'replay')
+
+
+class ResponseCache:
+    """SQLite-backed LRU cache keyed on (prompt_hash, model id, temperature, max_tokens).
+
+    In 'replay' mode the cache is read-only: hits are served, nothing is
+    written, and callers are expected to skip the API call on a miss.
+    """
+
+    def __init__(self, path: str = "llm_cache.db", max_entries: int = 20000,
+                 max_size_mb: Optional[float] = None, mode: str = 'read_write'):
+        if mode not in CACHE_MODES:
+            raise ValueError(f"Unknown cache mode '{mode}', expected one of {CACHE_MODES}")
+
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = int(max_size_mb * 1024 * 1024) if max_size_mb else None
+        self.mode = mode
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_accessed REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_accessed ON responses(last_accessed)")
+
+        count, total_size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self.entry_count = count
+        self.total_bytes = total_size
+
+    @property
+    def read_only(self) -> bool:
+        return self.mode == 'replay'
+
+    @staticmethod
+    def make_key(prompt_hash: str, model_id: str, temperature: float, max_tokens: int, samples: int = 1) -> str:
+        """Content address for a request; `samples` is the number of completions asked for."""
+        parts = [prompt_hash, model_id, float(temperature), int(max_tokens)]
+        # Single-completion keys stay as they were so existing caches keep hitting
+        if samples > 1:
+            parts.append(int(samples))
+        raw = json.dumps(parts)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self.conn.execute("SELECT payload FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        if not self.read_only:
+            self.conn.execute("UPDATE responses SET last_accessed = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key: str, payload: Dict):
+        if self.read_only:
+            return
+
+        data = json.dumps(payload)
+        size = len(data.encode())
+        now = time.time()
+
+        existing = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+        if existing:
+            self.entry_count -= 1
+            self.total_bytes -= existing[0]
+
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses (key, payload, size, created_at, last_accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, data, size, now, now)
+        )
+        self.entry_count += 1
+        self.total_bytes += size
+        self.writes += 1
+        self._evict()
+
+    def _evict(self):
+        """Drop least recently used entries until within bounds."""
+        while self.entry_count > self.max_entries or (self.max_bytes and self.total_bytes > self.max_bytes):
+            if self.entry_count <= 1:
+                break
+            overflow = max(1, self.entry_count - self.max_entries)
+            rows = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_accessed ASC LIMIT ?", (overflow,)
+            ).fetchall()
+            if not rows:
+                break
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", [(k,) for k, _ in rows])
+            self.entry_count -= len(rows)
+            self.total_bytes -= sum(size for _, size in rows)
+            self.evictions += len(rows)
+
+    def get_stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'mode': self.mode,
+            'entries': self.entry_count,
+            'size_mb': round(self.total_bytes / (1024 * 1024), 2),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'writes': self.writes,
+            'evictions': self.evictions
+        }
+
+    def close(self):
+        self.conn.close()
+
+
+def build_response_cache(cache_config: Optional[Dict]) -> Optional[ResponseCache]:
+    """Create the cache from the `response_cache` section of settings.yaml."""
+    if not cache_config or not cache_config.get('enabled', False):
+        return None
+    return ResponseCache(
+        path=cache_config.get('path', 'llm_cache.db'),
+        max_entries=cache_config.get('max_entries', 20000),
+        max_size_mb=cache_config.get('max_size_mb'),
+        mode=cache_config.get('mode', 'read_write')
+    )
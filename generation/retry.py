@@ -0,0 +1,122 @@
+"""
+Retry classification, jittered exponential delays and a run-wide retry budget.
+"""
+
+import random
+from typing import Dict, Optional
+
+import litellm
+
+RATE_LIMIT = 'rate_limit'
+RETRYABLE = 'retryable'
+FATAL_JOB = 'fatal_job'      # this request can never succeed, e.g. prompt too long
+FATAL_MODEL = 'fatal_model'  # no request to this model can succeed, e.g. bad API key
+
+# Errors that condemn every request to the model, not just this one
+MODEL_FATAL_ERRORS = (
+    litellm.AuthenticationError,
+    litellm.PermissionDeniedError,
+    litellm.NotFoundError,
+)
+# The subset that blames the API key rather than the model: another key may work
+CREDENTIAL_ERRORS = (
+    litellm.AuthenticationError,
+    litellm.PermissionDeniedError,
+)
+# Errors tied to the request itself: context length, content policy, bad params
+JOB_FATAL_ERRORS = (
+    litellm.BadRequestError,
+    litellm.UnprocessableEntityError,
+)
+# Client-side status codes that are still worth retrying
+RETRYABLE_CLIENT_STATUS_CODES = (408, 409, 425)
+
+
+class EmptyResponseError(Exception):
+    """Raised when a model answers without any content."""
+
+    def __init__(self, model_name: str):
+        super().__init__(f"{model_name} returned no content")
+        self.model_name = model_name
+
+
+def classify_error(error: Exception) -> str:
+    """Sort an exception from a completion call into a retry category.
+
+    Anything unrecognised (timeouts, connection resets, 5xx, empty responses)
+    is treated as transient.
+    """
+    if isinstance(error, litellm.RateLimitError):
+        return RATE_LIMIT
+    if isinstance(error, MODEL_FATAL_ERRORS):
+        return FATAL_MODEL
+    if isinstance(error, JOB_FATAL_ERRORS):
+        return FATAL_JOB
+    status = getattr(error, 'status_code', None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in RETRYABLE_CLIENT_STATUS_CODES:
+        return FATAL_MODEL if status in (401, 403, 404) else FATAL_JOB
+    return RETRYABLE
+
+
+def is_credential_error(error: Exception) -> bool:
+    """Whether a model-fatal error is the key's fault (401/403) rather than the model's, e.g. 404."""
+    if isinstance(error, CREDENTIAL_ERRORS):
+        return True
+    return not isinstance(error, MODEL_FATAL_ERRORS) and getattr(error, 'status_code', None) in (401, 403)
+
+
+class RetryPolicy:
+    """Retry delays plus a run-wide cap on how many retries may be spent.
+
+    Delays use full jitter: a uniform draw from zero up to
+    `base_delay * 2 ** attempt`, capped at `max_delay`. The budget allows
+    `min_budget` retries plus `budget_ratio` retries per job started, so a
+    provider outage cannot multiply the run's traffic. Rate-limit retries
+    are paced by the provider backoff instead and do not spend the budget.
+    """
+
+    def __init__(self, max_attempts: int = 5, base_delay: float = 1.0, max_delay: float = 60.0,
+                 budget_ratio: float = 0.2, min_budget: int = 10):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget_ratio = budget_ratio
+        self.min_budget = min_budget
+
+        self.jobs = 0
+        self.retries = 0
+        self.budget_denied = 0
+        self.fatal = {FATAL_JOB: 0, FATAL_MODEL: 0}
+        self.empty_responses = 0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def record_job(self):
+        self.jobs += 1
+
+    def budget(self) -> int:
+        return self.min_budget + int(self.budget_ratio * self.jobs)
+
+    def try_acquire_retry(self) -> bool:
+        if self.retries >= self.budget():
+            self.budget_denied += 1
+            return False
+        self.retries += 1
+        return True
+
+    def get_stats(self) -> Dict:
+        return {
+            'jobs': self.jobs,
+            'retries': self.retries,
+            'retry_budget': self.budget(),
+            'budget_denied': self.budget_denied,
+            'empty_responses': self.empty_responses,
+            'fatal_job_errors': self.fatal[FATAL_JOB],
+            'fatal_model_errors': self.fatal[FATAL_MODEL]
+        }
+
+
+def build_retry_policy(retry_config: Optional[Dict]) -> RetryPolicy:
+    """Create the policy from the `retry` section of settings.yaml."""
+    return RetryPolicy(**(retry_config or {}))
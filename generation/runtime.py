@@ -0,0 +1,113 @@
+"""
+Process-wide provider runtime shared by every component that calls a model.
+"""
+
+import logging
+from typing import Dict, List, Optional
+
+import litellm
+
+from .circuit_breaker import CircuitBreaker, build_circuit_breakers
+from .concurrency import AdaptiveConcurrencyController
+from .credentials import CredentialPool, build_credential_pools
+from .header_pacing import build_header_pacer
+from .rate_limiter import ProviderRateLimiter, build_rate_limiters
+from .streaming import StreamStats
+from .telemetry import ProviderTelemetry
+
+logger = logging.getLogger(__name__)
+
+_runtime: Optional['ProviderRuntime'] = None
+
+
+def configure_litellm():
+    """Set litellm's module-level options once per process."""
+    litellm.drop_params = True
+    litellm.set_verbose = True
+
+
+class ProviderRuntime:
+    """Provider-facing state that must not be duplicated within a process.
+
+    Holds the RPM/TPM limiters, credential pools, header pacing,
+    rate-limit backoff, adaptive concurrency controllers, circuit breakers,
+    streaming metrics and provider telemetry. Every LLMManager built
+    without an explicit runtime shares the process runtime, so backoff
+    learned by one component paces all of them. HTTP connections are pooled by litellm's
+    own process-wide client cache.
+    """
+
+    def __init__(self, models_config: Optional[List[Dict]] = None, rate_limits: Optional[Dict] = None,
+                 concurrency: Optional[Dict] = None, circuit_breaker: Optional[Dict] = None,
+                 credential_pools: Optional[Dict] = None, header_pacing: Optional[Dict] = None):
+        configure_litellm()
+
+        # Provider backoff state: {provider: {'backoff_seconds': float, 'last_failure': timestamp}}
+        self.provider_backoff: Dict[str, Dict] = {}
+
+        # Proactive per-provider RPM/TPM limiters: {provider: ProviderRateLimiter}
+        self.rate_limiters = build_rate_limiters(rate_limits)
+
+        # Providers with several keys/endpoints, each with its own limiter: {provider: CredentialPool}
+        self.credential_pools: Dict[str, CredentialPool] = build_credential_pools(credential_pools, rate_limits)
+
+        # Quotas reported in provider response headers, per provider or credential
+        self.header_pacer = build_header_pacer(header_pacing)
+
+        # Adaptive in-flight limits per model, created on first use: {model_name: controller}
+        self.concurrency_config = concurrency or {}
+        self.concurrency_controllers: Dict[str, AdaptiveConcurrencyController] = {}
+        # Initial limits learned by earlier runs: {model_name: limit}
+        self.initial_concurrency: Dict[str, int] = {}
+
+        # Per-provider circuit breakers; open circuits reroute or park their jobs
+        self.circuit_breaker_config = circuit_breaker or {}
+        self.circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self.reroute_on_open = self.circuit_breaker_config.get('reroute', True)
+        self.circuit_stats = {'rerouted': 0, 'parked': 0}
+        self.register_models(models_config or [])
+
+        # Time-to-first-token and throughput per model: {model_name: StreamStats}
+        self.stream_stats: Dict[str, StreamStats] = {}
+
+        # Throughput and latency per provider, persisted for the next run's warm start
+        self.telemetry = ProviderTelemetry()
+
+    def set_rate_limits(self, provider: str, requests_per_minute: Optional[float],
+                        tokens_per_minute: Optional[float]):
+        """Set a provider's RPM/TPM limits, adding a limiter if it had none."""
+        limiter = self.rate_limiters.get(provider)
+        if limiter is None:
+            if requests_per_minute or tokens_per_minute:
+                self.rate_limiters[provider] = ProviderRateLimiter(requests_per_minute, tokens_per_minute)
+            return
+        limiter.set_limits(requests_per_minute, tokens_per_minute)
+
+    def register_models(self, models_config: List[Dict]):
+        """Add breakers for providers first seen in `models_config`."""
+        for provider, breaker in build_circuit_breakers(self.circuit_breaker_config, models_config).items():
+            self.circuit_breakers.setdefault(provider, breaker)
+
+
+def get_runtime(models_config: Optional[List[Dict]] = None, rate_limits: Optional[Dict] = None,
+                concurrency: Optional[Dict] = None, circuit_breaker: Optional[Dict] = None,
+                credential_pools: Optional[Dict] = None, header_pacing: Optional[Dict] = None) -> ProviderRuntime:
+    """Return the process runtime, creating it from these settings on first use.
+
+    Later callers share the existing runtime; their models are registered
+    but their limiter and breaker settings are not applied again.
+    """
+    global _runtime
+    if _runtime is None:
+        _runtime = ProviderRuntime(models_config, rate_limits, concurrency, circuit_breaker,
+                                   credential_pools, header_pacing)
+        logger.info("Initialized shared provider runtime")
+    elif models_config:
+        _runtime.register_models(models_config)
+    return _runtime
+
+
+def reset_runtime():
+    """Drop the process runtime so the next caller starts from fresh state."""
+    global _runtime
+    _runtime = None
@@ -0,0 +1,110 @@
+"""
+Several drafts of one prompt per request (`n` completions), optionally at several temperatures.
+"""
+
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import litellm
+
+from .packing import share_usage
+from .usage import empty_usage
+
+logger = logging.getLogger(__name__)
+
+
+def supports_native_samples(model_config: Dict) -> bool:
+    """Whether the model's provider accepts `n`; `native_samples` on the model overrides the lookup."""
+    if 'native_samples' in model_config:
+        return bool(model_config['native_samples'])
+    model = model_config['model']
+    provider = model_config.get('provider')
+    if provider and model.startswith(f"{provider}/"):
+        model = model[len(provider) + 1:]
+    try:
+        params = litellm.get_supported_openai_params(model=model, custom_llm_provider=provider)
+    except Exception:
+        return False
+    return 'n' in (params or [])
+
+
+def response_samples(response) -> List[Dict]:
+    """Content and finish_reason of every non-empty choice in a completion."""
+    samples = []
+    for choice in getattr(response, 'choices', None) or []:
+        content = choice.message.content
+        if content:
+            finish_reason = getattr(choice, 'finish_reason', None)
+            samples.append({'content': content,
+                            'finish_reason': finish_reason if isinstance(finish_reason, str) else None})
+    return samples
+
+
+def split_sampled_result(result: Dict) -> List[Dict]:
+    """One essay dict per completion of a sampled request, sharing its prompt and usage."""
+    samples = result.get('samples')
+    if not samples:
+        return [result]
+    usage = result.get('usage') or empty_usage()
+    split = []
+    for index, sample in enumerate(samples):
+        share = share_usage(usage, len(samples), index)
+        share['finish_reason'] = sample['finish_reason'] or share['finish_reason']
+        essay = {**result, 'content': sample['content'], 'word_count': len(sample['content'].split()),
+                 'usage': share}
+        del essay['samples']
+        split.append(essay)
+    return split
+
+
+class SamplingPolicy:
+    """How many drafts each job asks for, and at which temperatures.
+
+    Each temperature (the model's own when `temperatures` is empty) is one
+    request for `samples` completions, so the prompt's input tokens are paid
+    once per temperature. Models whose provider does not accept `n` write one
+    draft per temperature. Models override `samples` with their own setting.
+    """
+
+    def __init__(self, samples: int = 3, temperatures: Optional[List[float]] = None):
+        self.samples = samples
+        self.temperatures = list(temperatures or [])
+
+        self.native: Dict[str, bool] = {}
+        self.sampled_requests = 0
+        self.sampled_essays = 0
+
+    def is_native(self, model_config: Dict) -> bool:
+        name = model_config['name']
+        if name not in self.native:
+            self.native[name] = supports_native_samples(model_config)
+            if not self.native[name]:
+                logger.info(f"{name} does not accept n, writing one draft per temperature")
+        return self.native[name]
+
+    def plan(self, model_config: Dict) -> List[Tuple[Dict, int]]:
+        """The requests for one job, as (model config, completions) pairs."""
+        samples = model_config.get('samples', self.samples)
+        if not self.is_native(model_config):
+            samples = 1
+        temperatures = self.temperatures or [model_config.get('temperature', 0.8)]
+        return [({**model_config, 'temperature': temperature, 'sample_count': samples}, samples)
+                for temperature in temperatures]
+
+    def essays_per_job(self, model_config: Dict) -> int:
+        return sum(samples for _, samples in self.plan(model_config))
+
+    def get_stats(self) -> Dict:
+        return {
+            'sampled_requests': self.sampled_requests,
+            'sampled_essays': self.sampled_essays,
+            'native_models': sorted(name for name, native in self.native.items() if native)
+        }
+
+
+def build_sampling_policy(sampling_config: Optional[Dict]) -> Optional[SamplingPolicy]:
+    """Create the policy from the `sampling` section of settings.yaml."""
+    if not sampling_config or not sampling_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in sampling_config.items() if k != 'enabled'}
+    return SamplingPolicy(**options)
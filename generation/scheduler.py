@@ -0,0 +1,163 @@
+"""
+Routing of combinations to models by throughput, rate-limit headroom, cost and target mix.
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+
+class ModelScheduler:
+    """Choose which model(s) write each combination.
+
+    Every eligible model is scored as
+
+        mix_weight        * (target share - share assigned so far)
+      + throughput_weight * relative speed (observed seconds per essay, slowed by its backlog)
+      + headroom_weight   * free rate-limit capacity of its provider
+      - cost_weight       * relative worst-case cost of the essay
+
+    and the best `models_per_combination` distinct models get the job.
+    Models aborted on fatal errors are never chosen; models behind an open
+    circuit only when nothing else is left. Models without latency samples
+    yet count as fast, so each one is tried early.
+    """
+
+    def __init__(self, llm_manager, models_per_combination: int = 1, target_mix: Optional[Dict[str, float]] = None,
+                 mix_weight: float = 2.0, throughput_weight: float = 1.0, headroom_weight: float = 0.5,
+                 cost_weight: float = 0.5, max_reassignments: int = 1, latency_alpha: float = 0.2):
+        self.llm_manager = llm_manager
+        self.models_per_combination = models_per_combination
+        self.target_mix = target_mix or {}
+        self.mix_weight = mix_weight
+        self.throughput_weight = throughput_weight
+        self.headroom_weight = headroom_weight
+        self.cost_weight = cost_weight
+        self.max_reassignments = max_reassignments
+        self.latency_alpha = latency_alpha
+
+        self.assigned: Dict[str, int] = {}
+        self.pending: Dict[str, int] = {}
+        self.delivered: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+        # Smoothed seconds per delivered essay: {model_name: seconds}
+        self.seconds_per_essay: Dict[str, float] = {}
+        self.reassigned = 0
+
+    def target_share(self, model_name: str, models: List[Dict]) -> float:
+        """Share of essays the model should write among `models`; equal shares by default."""
+        weights = {m['name']: self.target_mix.get(m['name'], 0.0 if self.target_mix else 1.0) for m in models}
+        total = sum(weights.values())
+        return weights.get(model_name, 0.0) / total if total else 0.0
+
+    def _headroom(self, model_config: Dict) -> float:
+        provider = model_config.get('provider', 'unknown')
+        pool = self.llm_manager.credential_pools.get(provider)
+        if pool is not None:
+            return pool.headroom()
+        limiter = self.llm_manager.rate_limiters.get(provider)
+        return limiter.headroom() if limiter else 1.0
+
+    def _speed(self, model_config: Dict, known_seconds: List[float]) -> float:
+        name = model_config['name']
+        seconds = self.seconds_per_essay.get(name, min(known_seconds) if known_seconds else 1.0)
+        return 1.0 / (max(seconds, 1e-6) * (1 + self.pending.get(name, 0)))
+
+    def score_models(self, prompt_data: Dict, models: List[Dict]) -> Dict[str, float]:
+        """Score every candidate model for one prompt; higher is better."""
+        total_assigned = sum(self.assigned.get(m['name'], 0) for m in models)
+        known_seconds = [self.seconds_per_essay[m['name']] for m in models if m['name'] in self.seconds_per_essay]
+        speeds = {m['name']: self._speed(m, known_seconds) for m in models}
+        costs = {m['name']: self.llm_manager._worst_case_cost(prompt_data, m)[1] for m in models}
+        max_speed = max(speeds.values())
+        max_cost = max(costs.values())
+
+        scores = {}
+        for model_config in models:
+            name = model_config['name']
+            share = self.assigned.get(name, 0) / total_assigned if total_assigned else 0.0
+            scores[name] = (
+                self.mix_weight * (self.target_share(name, models) - share)
+                + self.throughput_weight * speeds[name] / max_speed
+                + self.headroom_weight * self._headroom(model_config)
+                - self.cost_weight * (costs[name] / max_cost if max_cost else 0.0)
+            )
+        return scores
+
+    def assign(self, prompt_data: Dict, models: List[Dict], exclude: Iterable[str] = (),
+               count: Optional[int] = None, track: bool = True) -> List[Dict]:
+        """Pick the models that will write this prompt's essays.
+
+        With `track` off the pick is not counted as an assignment, for
+        substitutes whose essay is credited through `record`.
+        """
+        count = self.models_per_combination if count is None else count
+        excluded = set(exclude) | set(self.llm_manager.aborted_models)
+        candidates = [m for m in models if m['name'] not in excluded]
+        deadline = self.llm_manager.deadline
+        if deadline is not None:
+            # Near the deadline, prefer models whose jobs can still finish in time
+            candidates = [m for m in candidates if deadline.can_finish(m['name'])] or candidates
+        healthy = [m for m in candidates if self.llm_manager._provider_available(m)]
+        candidates = healthy or candidates
+        if count <= 0 or not candidates:
+            return []
+
+        scores = self.score_models(prompt_data, candidates)
+        chosen = sorted(candidates, key=lambda m: scores[m['name']], reverse=True)[:count]
+        if not track:
+            return chosen
+        for model_config in chosen:
+            name = model_config['name']
+            self.assigned[name] = self.assigned.get(name, 0) + 1
+            self.pending[name] = self.pending.get(name, 0) + 1
+        return chosen
+
+    def record(self, model_name: str, delivered: int, failed: int, seconds: float,
+               substitutes: Optional[Dict[str, int]] = None):
+        """Fold a finished request for the model's assigned essays into its stats.
+
+        `substitutes` counts essays other models (a fallback hedge or a
+        reroute) delivered in its place; they are credited to whoever wrote
+        them, without a latency sample.
+        """
+        substitutes = substitutes or {}
+        settled = delivered + failed + sum(substitutes.values())
+        self.pending[model_name] = max(0, self.pending.get(model_name, 0) - settled)
+        self.delivered[model_name] = self.delivered.get(model_name, 0) + delivered
+        self.failed[model_name] = self.failed.get(model_name, 0) + failed
+        for name, count in substitutes.items():
+            self.delivered[name] = self.delivered.get(name, 0) + count
+        if delivered:
+            sample = seconds / delivered
+            previous = self.seconds_per_essay.get(model_name)
+            self.seconds_per_essay[model_name] = (
+                sample if previous is None else previous + self.latency_alpha * (sample - previous)
+            )
+
+    def get_stats(self) -> Dict:
+        models = self.llm_manager.models
+        total_delivered = sum(self.delivered.values())
+        return {
+            'models_per_combination': self.models_per_combination,
+            'reassigned': self.reassigned,
+            'models': {
+                m['name']: {
+                    'assigned': self.assigned.get(m['name'], 0),
+                    'delivered': self.delivered.get(m['name'], 0),
+                    'failed': self.failed.get(m['name'], 0),
+                    'target_share': round(self.target_share(m['name'], models), 3),
+                    'delivered_share': round(self.delivered.get(m['name'], 0) / total_delivered, 3)
+                    if total_delivered else 0.0,
+                    'seconds_per_essay': round(self.seconds_per_essay[m['name']], 2)
+                    if m['name'] in self.seconds_per_essay else None
+                }
+                for m in models
+            }
+        }
+
+
+def build_scheduler(routing_config: Optional[Dict], llm_manager) -> Optional[ModelScheduler]:
+    """Create the scheduler from the `routing` section of settings.yaml."""
+    if not routing_config or not routing_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in routing_config.items() if k != 'enabled'}
+    return ModelScheduler(llm_manager, **options)
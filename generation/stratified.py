@@ -0,0 +1,125 @@
+"""
+Stratified dispatch order, so any prefix of a run matches the planned distribution.
+"""
+
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+COMBINATION_STRATA = ('stance', 'grade', 'seed')
+STRATA = COMBINATION_STRATA + ('model',)
+
+
+def combination_strata(combination: Dict) -> Tuple[str, str, str]:
+    """The (stance, grade, seed) stratum a combination from DiversityManager belongs to."""
+    seed = combination['seed']
+    return (
+        combination['stance']['name'],
+        combination['quality']['grade'],
+        str(seed.get('id', seed.get('angle')))
+    )
+
+
+def distribution_error(counts: Dict[str, int], target: Dict[str, float]) -> float:
+    """Total variation distance between observed counts and target shares (0 = exact, 1 = disjoint)."""
+    total = sum(counts.values())
+    if not total:
+        return 0.0
+    values = set(counts) | set(target)
+    return 0.5 * sum(abs(counts.get(v, 0) / total - target.get(v, 0.0)) for v in values)
+
+
+class StratifiedDispatch:
+    """Interleave combinations across strata and track the delivered distribution.
+
+    The dispatch order is built greedily: each next combination takes the
+    stance furthest behind its share of the plan, then the grade and seed
+    furthest behind among that stance's remaining combinations, so every
+    prefix of the order tracks the plan. Models are interleaved per
+    combination by the job planner; their target shares come from the
+    caller. Delivered essays are counted per stratum and the distance from
+    the target is logged every `report_every` essays. Seed grouping for
+    prompt caching only regroups combinations within consecutive windows of
+    `group_window` positions, so the order stays stratified window by window.
+    """
+
+    def __init__(self, report_every: int = 50, group_window: int = 50):
+        self.report_every = report_every
+        self.group_window = group_window
+
+        self.targets: Dict[str, Dict[str, float]] = {dimension: {} for dimension in STRATA}
+        self.delivered: Dict[str, Dict[str, int]] = {dimension: {} for dimension in STRATA}
+        self.total_delivered = 0
+        # (essays delivered, largest per-dimension error) at each report
+        self.history: List[Tuple[int, float]] = []
+
+    def plan(self, combinations: List[Dict], model_shares: Dict[str, float]) -> List[Dict]:
+        """Set the targets from these combinations and return them in stratified order."""
+        total = len(combinations)
+        # Nested by stratum value: {stance: {grade: {seed: deque of combinations}}}
+        buckets: Dict = {}
+        targets: Dict[str, Dict[str, float]] = {dimension: {} for dimension in COMBINATION_STRATA}
+        for combination in combinations:
+            key = combination_strata(combination)
+            level = buckets
+            for dimension, value in zip(COMBINATION_STRATA, key):
+                targets[dimension][value] = targets[dimension].get(value, 0.0) + 1 / total
+                level = level.setdefault(value, {} if dimension != COMBINATION_STRATA[-1] else deque())
+            level.append(combination)
+        self.targets = {**targets, 'model': dict(model_shares)}
+
+        ordered = []
+        taken: Dict[str, Dict[str, int]] = {dimension: {} for dimension in COMBINATION_STRATA}
+        while buckets:
+            position = len(ordered) + 1
+            # Walk down the strata, taking the value furthest behind its share at each level
+            path = []
+            level = buckets
+            for dimension in COMBINATION_STRATA:
+                value = max(level, key=lambda v: targets[dimension][v] * position - taken[dimension].get(v, 0))
+                path.append((level, value))
+                taken[dimension][value] = taken[dimension].get(value, 0) + 1
+                level = level[value]
+            ordered.append(level.popleft())
+            # Drop emptied buckets from the bottom up
+            for parent, value in reversed(path):
+                if parent[value]:
+                    break
+                del parent[value]
+        return ordered
+
+    def record(self, essay: Dict):
+        """Count a delivered essay record (with its combination as `metadata`)."""
+        key = combination_strata(essay['metadata']) + (essay['model_name'],)
+        for dimension, value in zip(STRATA, key):
+            self.delivered[dimension][value] = self.delivered[dimension].get(value, 0) + 1
+        self.total_delivered += 1
+        if self.report_every and self.total_delivered % self.report_every == 0:
+            errors = self.errors()
+            self.history.append((self.total_delivered, round(max(errors.values()), 4)))
+            logger.info(f"Distribution error after {self.total_delivered} essays: "
+                        + ", ".join(f"{d} {e:.3f}" for d, e in errors.items()))
+
+    def errors(self) -> Dict[str, float]:
+        """Distance of the delivered essays from the target, per dimension."""
+        return {dimension: distribution_error(self.delivered[dimension], self.targets[dimension])
+                for dimension in STRATA}
+
+    def get_stats(self) -> Dict:
+        errors = self.errors()
+        return {
+            'delivered': self.total_delivered,
+            'errors': {dimension: round(error, 4) for dimension, error in errors.items()},
+            'max_error': round(max(errors.values()), 4),
+            'history': list(self.history)
+        }
+
+
+def build_stratified_dispatch(stratification_config: Optional[Dict]) -> Optional[StratifiedDispatch]:
+    """Create the dispatcher from the `stratification` section of settings.yaml."""
+    if not stratification_config or not stratification_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in stratification_config.items() if k != 'enabled'}
+    return StratifiedDispatch(**options)
@@ -0,0 +1,69 @@
+"""
+Streaming helpers: per-model latency metrics and the essay length governor.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from .concurrency import percentile
+
+
+class LengthGovernor:
+    """Decide when a streamed essay has clearly overshot its word target."""
+
+    def __init__(self, target_words: int = 1000, length_margin: float = 0.2):
+        self.target_words = target_words
+        self.max_words = int(target_words * (1 + length_margin))
+
+    def exceeded(self, text: str) -> bool:
+        return len(text.split()) > self.max_words
+
+    def trim(self, text: str) -> str:
+        """Cut the essay at the last paragraph boundary within the word limit."""
+        paragraphs = [p for p in re.split(r'\n\s*\n', text) if p.strip()]
+        kept: List[str] = []
+        words = 0
+        for paragraph in paragraphs:
+            paragraph_words = len(paragraph.split())
+            if words + paragraph_words > self.max_words:
+                break
+            kept.append(paragraph.strip())
+            words += paragraph_words
+
+        if kept:
+            return '\n\n'.join(kept)
+
+        # A single overlong paragraph: fall back to the last full sentence
+        clipped = ' '.join(text.split()[:self.max_words])
+        end = max(clipped.rfind('. '), clipped.rfind('? '), clipped.rfind('! '))
+        return clipped[:end + 1] if end > 0 else clipped
+
+
+class StreamStats:
+    """Time-to-first-token and throughput samples for one model."""
+
+    def __init__(self):
+        self.ttft: List[float] = []
+        self.tokens_per_second: List[float] = []
+        self.governed = 0
+        self.words_trimmed = 0
+
+    def record(self, ttft: Optional[float], completion_tokens: int, generation_seconds: float):
+        if ttft is not None:
+            self.ttft.append(ttft)
+        if generation_seconds > 0 and completion_tokens:
+            self.tokens_per_second.append(completion_tokens / generation_seconds)
+
+    def record_governed(self, words_trimmed: int):
+        self.governed += 1
+        self.words_trimmed += words_trimmed
+
+    def to_dict(self) -> Dict:
+        return {
+            'streams': len(self.ttft),
+            'ttft_p50': round(percentile(self.ttft, 0.5), 3) if self.ttft else None,
+            'ttft_p95': round(percentile(self.ttft, 0.95), 3) if self.ttft else None,
+            'tokens_per_second_p50': round(percentile(self.tokens_per_second, 0.5), 1) if self.tokens_per_second else None,
+            'governed': self.governed,
+            'words_trimmed': self.words_trimmed
+        }
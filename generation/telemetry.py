@@ -0,0 +1,195 @@
+"""
+Provider telemetry learned during a run, and warm starts from earlier runs.
+"""
+
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from .concurrency import percentile
+
+
+class ProviderTelemetry:
+    """Per-provider throughput and latency observed in this process.
+
+    Requests and tokens per minute are measured over a sliding window of
+    successful calls, scaled by the span the window actually covers. Rates
+    only count once the window spans `min_span_seconds` and holds
+    `min_samples` calls, so a burst at the start of a run is not mistaken
+    for a sustained rate. The highest rate reached before a rate limit is
+    the provider's learned ceiling; without one, only the peak rate reached
+    is known. Limits the provider reports in its rate-limit headers take
+    precedence over both.
+    """
+
+    def __init__(self, window_seconds: float = 60.0, latency_samples: int = 500,
+                 min_span_seconds: float = 10.0, min_samples: int = 5):
+        self.window_seconds = window_seconds
+        self.latency_samples = latency_samples
+        self.min_span_seconds = min_span_seconds
+        self.min_samples = min_samples
+
+        # Successful calls in the window: {provider: deque of (timestamp, tokens)}
+        self.calls: Dict[str, deque] = {}
+        # First successful call per provider, so early windows are not scaled as full ones
+        self.first_call: Dict[str, float] = {}
+        self.latencies: Dict[str, deque] = {}
+        self.peak: Dict[str, Dict[str, float]] = {}
+        self.limited: Dict[str, Dict[str, float]] = {}
+
+    def _window(self, provider: str) -> deque:
+        calls = self.calls.setdefault(provider, deque())
+        cutoff = time.monotonic() - self.window_seconds
+        while calls and calls[0][0] < cutoff:
+            calls.popleft()
+        return calls
+
+    def _rates(self, provider: str) -> Optional[Dict[str, float]]:
+        """Rates over the window, or None while it is too short or sparse to tell."""
+        calls = self._window(provider)
+        span = min(self.window_seconds, time.monotonic() - self.first_call.get(provider, time.monotonic()))
+        if span < self.min_span_seconds or len(calls) < self.min_samples:
+            return None
+        scale = 60.0 / span
+        return {
+            'requests_per_minute': len(calls) * scale,
+            'tokens_per_minute': sum(tokens for _, tokens in calls) * scale
+        }
+
+    def record_success(self, provider: str, latency: float, tokens: int):
+        now = time.monotonic()
+        self.first_call.setdefault(provider, now)
+        self._window(provider).append((now, tokens))
+        self.latencies.setdefault(provider, deque(maxlen=self.latency_samples)).append(latency)
+        rates = self._rates(provider)
+        if rates is None:
+            return
+        peak = self.peak.setdefault(provider, {'requests_per_minute': 0.0, 'tokens_per_minute': 0.0})
+        for key, rate in rates.items():
+            peak[key] = max(peak[key], rate)
+
+    def record_rate_limit(self, provider: str):
+        rates = self._rates(provider)
+        if rates is None:
+            # Too early in the run to tell a sustained rate from a burst
+            return
+        # The provider evidently allows the highest rate it served before limiting
+        limited = self.limited.setdefault(provider, dict(rates))
+        for key, rate in rates.items():
+            limited[key] = max(limited[key], rate, self.peak.get(provider, {}).get(key, 0.0))
+
+    def snapshot(self, concurrency: Dict[str, Dict[str, int]],
+                 reported: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Dict]:
+        """Learned limits per provider.
+
+        `concurrency` maps provider to {model_name: limit}; `reported` maps
+        provider to the per-minute limits from its rate-limit headers.
+        """
+        reported = reported or {}
+        providers = set(self.latencies) | set(self.limited) | set(concurrency) | set(reported)
+        snapshot = {}
+        for provider in providers:
+            rates = {**(self.limited.get(provider) or self.peak.get(provider, {})), **reported.get(provider, {})}
+            latencies = self.latencies.get(provider)
+            snapshot[provider] = {
+                'requests_per_minute': round(rates.get('requests_per_minute', 0.0), 1),
+                'tokens_per_minute': round(rates.get('tokens_per_minute', 0.0)),
+                'rate_limited': provider in self.limited or provider in reported,
+                'latency_p50': round(percentile(latencies, 0.5), 3) if latencies else None,
+                'latency_p95': round(percentile(latencies, 0.95), 3) if latencies else None,
+                'concurrency': dict(concurrency.get(provider, {}))
+            }
+        return snapshot
+
+
+def merge_limits(previous: Optional[Dict], current: Dict) -> Dict:
+    """Keep a previously learned ceiling when this run never reached it."""
+    if current['rate_limited'] or not previous or not previous.get('rate_limited'):
+        return current
+    return {
+        **current,
+        'rate_limited': True,
+        'requests_per_minute': max(previous['requests_per_minute'], current['requests_per_minute']),
+        'tokens_per_minute': max(previous['tokens_per_minute'], current['tokens_per_minute'])
+    }
+
+
+class LearnedLimits:
+    """Start a run from the provider limits learned by earlier runs.
+
+    A record's weight halves every `half_life_hours` and records older than
+    `max_age_hours` are ignored. A learned rate ceiling, scaled by
+    `safety_factor`, caps the provider's limiter and is loosened as it ages
+    (up to twice the ceiling at zero weight); configured limits still apply
+    if they are lower. Each model's initial concurrency moves from the
+    configured value toward the level that worked, by the record's weight.
+    """
+
+    def __init__(self, half_life_hours: float = 24.0, max_age_hours: float = 168.0,
+                 safety_factor: float = 0.9):
+        self.half_life_hours = half_life_hours
+        self.max_age_hours = max_age_hours
+        self.safety_factor = safety_factor
+
+        self.applied: Dict[str, Dict] = {}
+
+    def weight(self, updated_at: datetime, now: Optional[datetime] = None) -> float:
+        age_hours = ((now or datetime.now()) - updated_at).total_seconds() / 3600
+        if age_hours > self.max_age_hours:
+            return 0.0
+        return 0.5 ** (max(age_hours, 0.0) / self.half_life_hours)
+
+    def warm_start(self, runtime, records: Dict[str, Dict], now: Optional[datetime] = None) -> Dict[str, Dict]:
+        """Apply learned records ({provider: record with 'updated_at'}) to the runtime's limiters and controllers."""
+        concurrency_config = runtime.concurrency_config
+        initial = concurrency_config.get('initial_limit', 4)
+        min_limit = concurrency_config.get('min_limit', 1)
+        max_limit = concurrency_config.get('max_limit', 32)
+
+        for provider, record in records.items():
+            weight = self.weight(record['updated_at'], now)
+            if weight <= 0:
+                continue
+            applied = {'weight': round(weight, 3)}
+
+            if record.get('rate_limited'):
+                loosen = self.safety_factor * (2 - weight)
+                rpm = record.get('requests_per_minute') * loosen if record.get('requests_per_minute') else None
+                tpm = record.get('tokens_per_minute') * loosen if record.get('tokens_per_minute') else None
+                limiter = runtime.rate_limiters.get(provider)
+                if limiter is not None:
+                    configured_rpm, configured_tpm = limiter.limits()
+                    rpm = min(filter(None, (rpm, configured_rpm)), default=None)
+                    tpm = min(filter(None, (tpm, configured_tpm)), default=None)
+                runtime.set_rate_limits(provider, rpm, tpm)
+                applied['requests_per_minute'] = round(rpm) if rpm else None
+                applied['tokens_per_minute'] = round(tpm) if tpm else None
+
+            concurrency = {}
+            for model_name, learned in (record.get('concurrency') or {}).items():
+                limit = round(initial + weight * (learned - initial))
+                concurrency[model_name] = min(max_limit, max(min_limit, limit))
+            runtime.initial_concurrency.update(concurrency)
+            if concurrency:
+                applied['concurrency'] = concurrency
+            self.applied[provider] = applied
+        return self.applied
+
+    def snapshot(self, runtime, previous: Dict[str, Dict]) -> Dict[str, Dict]:
+        """This run's learned limits per provider, merged with the previous records."""
+        concurrency: Dict[str, Dict[str, int]] = {}
+        for model_name, controller in runtime.concurrency_controllers.items():
+            concurrency.setdefault(controller.provider, {})[model_name] = controller.current_limit
+        pacer = runtime.header_pacer
+        reported = pacer.reported_limits() if pacer is not None else {}
+        current = runtime.telemetry.snapshot(concurrency, reported)
+        return {provider: merge_limits(previous.get(provider), record) for provider, record in current.items()}
+
+
+def build_learned_limits(learned_limits_config: Optional[Dict]) -> Optional[LearnedLimits]:
+    """Create the warm start from the `learned_limits` section of settings.yaml."""
+    if not learned_limits_config or not learned_limits_config.get('enabled', False):
+        return None
+    options = {k: v for k, v in learned_limits_config.items() if k != 'enabled'}
+    return LearnedLimits(**options)
@@ -0,0 +1,135 @@
+"""
+Connect/read timeouts per request, a deadline per job, and a log of what timed out.
+"""
+
+import asyncio
+import contextvars
+import math
+import time
+from typing import Awaitable, Dict, List, Optional
+
+import httpx
+
+# The clock of the job running in the current task, set by TimeoutPolicy.run_job
+_job_clock: contextvars.ContextVar = contextvars.ContextVar('job_clock', default=None)
+
+
+def timeout_stage(error: BaseException) -> str:
+    """'connect' if the timeout happened while opening the connection, else 'read'."""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        if isinstance(error, httpx.ConnectTimeout):
+            return 'connect'
+        seen.add(id(error))
+        error = error.__cause__ or error.__context__
+    return 'read'
+
+
+def mark_request_sent():
+    """Start the current job's deadline, once its request holds a concurrency slot."""
+    clock = _job_clock.get()
+    if clock is not None and clock['sent_at'] is None:
+        clock['sent_at'] = time.monotonic()
+        clock['sent'].set()
+
+
+class TimeoutPolicy:
+    """Per-model HTTP timeouts and job deadlines.
+
+    `connect_seconds` bounds opening a connection and `read_seconds` the
+    wait for the next bytes of a response (the whole response unless
+    streaming), so a hung connection fails its attempt and is retried.
+    `job_seconds` bounds a job from its first request on, retries and their
+    waits included; queueing for a concurrency slot, rate limiter or open
+    circuit before that does not count. A job past it is cancelled down to
+    its in-flight request and dropped. Models
+    override these with `connect_timeout`, `read_timeout` and `job_timeout`;
+    null disables a limit.
+    """
+
+    def __init__(self, connect_seconds: Optional[float] = 10.0, read_seconds: Optional[float] = 300.0,
+                 job_seconds: Optional[float] = 900.0):
+        self.connect_seconds = connect_seconds
+        self.read_seconds = read_seconds
+        self.job_seconds = job_seconds
+
+        # Attempts that timed out and were retried: {model_name: {'connect': n, 'read': n}}
+        self.attempt_timeouts: Dict[str, Dict[str, int]] = {}
+        # Jobs dropped at their deadline: [{'model', 'elapsed_seconds'}]
+        self.timed_out_jobs: List[Dict] = []
+
+    def request_timeout(self, model_config: Dict) -> Optional[httpx.Timeout]:
+        """The litellm `timeout` for one request to the model."""
+        connect = model_config.get('connect_timeout', self.connect_seconds)
+        read = model_config.get('read_timeout', self.read_seconds)
+        if connect is None and read is None:
+            return None
+        return httpx.Timeout(read, connect=connect)
+
+    def job_timeout(self, model_config: Dict) -> Optional[float]:
+        return model_config.get('job_timeout', self.job_seconds)
+
+    async def run_job(self, job: Awaitable, model_config: Dict):
+        """Await a job, cancelling it `job_timeout` seconds after its first request was sent.
+
+        Records the job and raises asyncio.TimeoutError when the deadline passes.
+        """
+        timeout = self.job_timeout(model_config)
+        if timeout is None:
+            return await job
+        clock = {'sent': asyncio.Event(), 'sent_at': None}
+
+        async def run():
+            _job_clock.set(clock)
+            return await job
+        task = asyncio.ensure_future(run())
+        sent = asyncio.ensure_future(clock['sent'].wait())
+        try:
+            await asyncio.wait({task, sent}, return_when=asyncio.FIRST_COMPLETED)
+            if task.done():
+                return task.result()
+            remaining = timeout - (time.monotonic() - clock['sent_at'])
+            try:
+                return await asyncio.wait_for(task, max(remaining, 0))
+            except asyncio.TimeoutError:
+                self.record_job_timeout(model_config['name'], time.monotonic() - clock['sent_at'])
+                raise
+        finally:
+            sent.cancel()
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    def record_attempt_timeout(self, model_name: str, error: BaseException):
+        counts = self.attempt_timeouts.setdefault(model_name, {'connect': 0, 'read': 0})
+        counts[timeout_stage(error)] += 1
+
+    def record_job_timeout(self, model_name: str, elapsed: float):
+        self.timed_out_jobs.append({'model': model_name, 'elapsed_seconds': round(elapsed, 1)})
+
+    def get_stats(self) -> Dict:
+        by_model = {name: {**counts, 'jobs': 0} for name, counts in self.attempt_timeouts.items()}
+        elapsed_by_model: Dict[str, List[float]] = {}
+        for job in self.timed_out_jobs:
+            elapsed_by_model.setdefault(job['model'], []).append(job['elapsed_seconds'])
+        for name, elapsed in elapsed_by_model.items():
+            elapsed.sort()
+            by_model.setdefault(name, {'connect': 0, 'read': 0}).update({
+                'jobs': len(elapsed),
+                'elapsed_p50': elapsed[math.ceil(0.5 * len(elapsed)) - 1],
+                'elapsed_max': elapsed[-1]
+            })
+        return {
+            'connect_seconds': self.connect_seconds,
+            'read_seconds': self.read_seconds,
+            'job_seconds': self.job_seconds,
+            'attempt_timeouts': sum(c['connect'] + c['read'] for c in self.attempt_timeouts.values()),
+            'job_timeouts': len(self.timed_out_jobs),
+            'models': by_model,
+            'timed_out_jobs': list(self.timed_out_jobs)
+        }
+
+
+def build_timeout_policy(timeouts_config: Optional[Dict]) -> TimeoutPolicy:
+    """Create the policy from the `timeouts` section of settings.yaml."""
+    return TimeoutPolicy(**(timeouts_config or {}))
@@ -2,6 +2,32 @@
 Token calculation utilities for managing model-specific token limits.
 """
 
+import math
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # optional; calibrated heuristics are used without it
+    tiktoken = None
+
+# Tokens per English word for each provider's tokenizer
+TOKENS_PER_WORD = {
+    "openai": 1.3,
+    "gemini": 1.3,
+    "anthropic": 1.4,
+}
+
+# Characters per token for English prose, the fallback when no encoder is available
+CHARS_PER_TOKEN = {
+    "openai": 4.0,
+    "gemini": 4.0,
+    "anthropic": 3.5,
+}
+
+# Role and formatting tokens added per chat message
+MESSAGE_OVERHEAD_TOKENS = 4
+
 def calculate_max_tokens(base_tokens: int, multiplier: float, min_tokens: int = 500, max_tokens: int = 10000) -> int:
     """
     Calculate the maximum tokens for a model based on base value and multiplier.
@@ -34,13 +60,7 @@ def estimate_words_from_tokens(tokens: int, provider: str) -> int:
     Returns:
         Estimated word count
     """
-    ratios = {
-        "openai": 1.3,
-        "gemini": 1.3,
-        "anthropic": 1.4,
-    }
-    
-    ratio = ratios.get(provider.lower(), 1.3)  # Default to OpenAI ratio
+    ratio = TOKENS_PER_WORD.get(provider.lower(), 1.3)  # Default to OpenAI ratio
     
     # For Gemini, account for thinking tokens (roughly 50% of total)
     if provider.lower() == "gemini":
@@ -59,13 +79,7 @@ def estimate_tokens_from_words(words: int, provider: str) -> int:
     Returns:
         Estimated token count
     """
-    ratios = {
-        "openai": 1.3,
-        "gemini": 1.3,
-        "anthropic": 1.4,
-    }
-    
-    ratio = ratios.get(provider.lower(), 1.3)
+    ratio = TOKENS_PER_WORD.get(provider.lower(), 1.3)
     tokens = int(words * ratio)
     
     # For Gemini, account for thinking tokens overhead
@@ -74,13 +88,140 @@ def estimate_tokens_from_words(words: int, provider: str) -> int:
     
     return tokens
 
-def get_model_token_config(model_config: dict, base_tokens: int) -> dict:
+@lru_cache(maxsize=None)
+def _get_encoder(model: str):
+    """
+    Load the tiktoken encoder for an OpenAI model, or None if unavailable.
+    
+    Encodings are read from tiktoken's local cache; when they cannot be
+    loaded (tiktoken not installed, no cached file and no network) the
+    calibrated heuristics are used instead. Other providers do not publish
+    their tokenizers, so they always use the heuristics.
+    """
+    if tiktoken is None or not model.startswith("openai/"):
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model.split("/", 1)[1])
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def heuristic_token_count(text: str, provider: str, chars_per_token: Optional[float] = None) -> int:
+    """
+    Estimate tokens from word and character counts.
+    
+    Takes the larger of the per-word and per-character estimates so prose
+    with long words, numbers or markup is not undercounted.
+    
+    Args:
+        text: Text to measure
+        provider: Model provider name
+        chars_per_token: Calibrated ratio overriding the provider default
+    
+    Returns:
+        Estimated token count
+    """
+    provider = provider.lower()
+    by_words = len(text.split()) * TOKENS_PER_WORD.get(provider, 1.3)
+    by_chars = len(text) / (chars_per_token or CHARS_PER_TOKEN.get(provider, 4.0))
+    return math.ceil(max(by_words, by_chars))
+
+@lru_cache(maxsize=8192)
+def _count_tokens_cached(text: str, model: str, provider: str, chars_per_token: Optional[float]) -> int:
+    encoder = _get_encoder(model)
+    if encoder is not None:
+        return len(encoder.encode(text, disallowed_special=()))
+    return heuristic_token_count(text, provider, chars_per_token)
+
+def count_tokens(text: str, model_config: dict) -> int:
+    """
+    Count the tokens of a text for a model, memoized per (text, model).
+    
+    Args:
+        text: Text to measure
+        model_config: Model configuration dictionary; an optional
+            `chars_per_token` calibrates the heuristic fallback
+    
+    Returns:
+        Token count
+    """
+    if not text:
+        return 0
+    return _count_tokens_cached(text, model_config.get("model", ""), model_config.get("provider", "openai"),
+                                model_config.get("chars_per_token"))
+
+def count_message_tokens(messages: List[Dict], model_config: dict) -> int:
+    """
+    Count the prompt tokens of a chat request, including per-message overhead.
+    
+    Content split into blocks (e.g. a cacheable seed-context prefix) is
+    counted block by block, so shared fragments hit the memoized counts.
+    
+    Args:
+        messages: Chat messages as sent to the model
+        model_config: Model configuration dictionary
+    
+    Returns:
+        Prompt token count
+    """
+    total = 0
+    for message in messages:
+        content = message.get("content") or ""
+        if isinstance(content, str):
+            total += count_tokens(content, model_config)
+        else:
+            total += sum(count_tokens(block.get("text", ""), model_config) for block in content)
+        total += MESSAGE_OVERHEAD_TOKENS
+    return total
+
+def plan_max_tokens(model_config: dict, prompt_tokens: int, target_words: int = 1000,
+                    length_margin: float = 0.25, min_tokens: int = 500) -> int:
+    """
+    Size max_tokens for one request from the target essay length and prompt size.
+    
+    The essay allowance is the target length in tokens plus a margin, times
+    the model's `pack_size` for packed requests. Thinking models also get `thinking_tokens` (Gemini defaults to as much
+    again as the essay). An explicit `max_tokens` on the model caps it and
+    `min_tokens` is its floor, but the result always stays within the
+    model's `context_window` after the prompt.
+    
+    Args:
+        model_config: Model configuration dictionary
+        prompt_tokens: Counted prompt tokens for the request
+        target_words: Upper end of the requested essay length
+        length_margin: Fractional headroom over the target length
+        min_tokens: Minimum allowed tokens
+    
+    Returns:
+        max_tokens for the request
+    """
+    provider = model_config.get("provider", "openai").lower()
+    essay_tokens = math.ceil(target_words * TOKENS_PER_WORD.get(provider, 1.3) * (1 + length_margin))
+    thinking_tokens = model_config.get("thinking_tokens", essay_tokens if provider == "gemini" else 0)
+    planned = essay_tokens * model_config.get("pack_size", 1) + thinking_tokens
+    
+    if model_config.get("max_tokens") is not None:
+        planned = min(planned, model_config["max_tokens"] * model_config.get("pack_size", 1))
+    planned = max(min_tokens, planned)
+    # Last, so neither the floor nor the caps can overflow the context
+    context_window = model_config.get("context_window")
+    if context_window:
+        planned = min(planned, max(context_window - prompt_tokens, 1))
+    return planned
+
+def get_model_token_config(model_config: dict, base_tokens: int, prompt_tokens: Optional[int] = None,
+                           token_sizing: Optional[dict] = None) -> dict:
     """
     Get complete token configuration for a model.
     
     Args:
         model_config: Model configuration dictionary
         base_tokens: Base token count from settings
+        prompt_tokens: Counted prompt tokens of the request, if known
+        token_sizing: `token_sizing` settings; when enabled and the prompt
+            size is known, max_tokens is planned per request
     
     Returns:
         Dictionary with token configuration
@@ -88,19 +229,52 @@ def get_model_token_config(model_config: dict, base_tokens: int) -> dict:
     multiplier = model_config.get("token_multiplier", 1.0)
     max_tokens = model_config.get("max_tokens")
     
+    if token_sizing and token_sizing.get("enabled", False) and prompt_tokens is not None:
+        calculated_tokens = plan_max_tokens(
+            model_config, prompt_tokens,
+            token_sizing.get("target_words", 1000),
+            token_sizing.get("length_margin", 0.25),
+            token_sizing.get("min_tokens", 500)
+        )
     # If max_tokens is explicitly set, use it
-    if max_tokens is not None:
-        calculated_tokens = max_tokens
+    elif max_tokens is not None:
+        calculated_tokens = max_tokens * model_config.get("pack_size", 1)
     else:
-        calculated_tokens = calculate_max_tokens(base_tokens, multiplier)
+        calculated_tokens = calculate_max_tokens(base_tokens, multiplier) * model_config.get("pack_size", 1)
     
     provider = model_config.get("provider", "openai")
     estimated_words = estimate_words_from_tokens(calculated_tokens, provider)
     
-    return {
+    config = {
         "max_tokens": calculated_tokens,
         "base_tokens": base_tokens,
         "multiplier": multiplier,
         "estimated_words": estimated_words,
         "provider": provider
-    }
\ No newline at end of file
+    }
+    if prompt_tokens is not None:
+        config["prompt_tokens"] = prompt_tokens
+    return config
+
+def estimate_request_tokens(prompt: str, token_config: dict) -> int:
+    """
+    Estimate the tokens a request counts against a provider's TPM quota.
+    
+    Providers reserve quota for the prompt plus the full max_tokens budget,
+    so the estimate is prompt tokens plus the configured max_tokens. Prompt
+    tokens counted by get_model_token_config are used when present.
+    
+    Args:
+        prompt: Full prompt text sent to the model
+        token_config: Result of get_model_token_config
+    
+    Returns:
+        Estimated token cost of the request
+    """
+    if "prompt_tokens" in token_config:
+        return token_config["prompt_tokens"] + token_config["max_tokens"]
+    
+    ratio = TOKENS_PER_WORD.get(token_config.get("provider", "openai").lower(), 1.3)
+    prompt_tokens = int(len(prompt.split()) * ratio)
+    
+    return prompt_tokens + token_config["max_tokens"]
@@ -0,0 +1,151 @@
+"""
+Token usage and cost accounting with per-run budget caps.
+"""
+
+from typing import Dict, Optional
+
+
+def _as_int(value) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def extract_usage(response) -> Dict:
+    """Pull token counts and finish_reason out of a litellm response."""
+    usage = getattr(response, 'usage', None)
+    details = getattr(usage, 'completion_tokens_details', None) if usage is not None else None
+    prompt_details = getattr(usage, 'prompt_tokens_details', None) if usage is not None else None
+    # OpenAI reports prefix-cache hits in prompt_tokens_details, Anthropic as cache_read_input_tokens
+    cached_tokens = (_as_int(getattr(prompt_details, 'cached_tokens', 0))
+                     or _as_int(getattr(usage, 'cache_read_input_tokens', 0)))
+    choices = getattr(response, 'choices', None) or []
+    finish_reason = getattr(choices[0], 'finish_reason', None) if choices else None
+    return {
+        'prompt_tokens': _as_int(getattr(usage, 'prompt_tokens', 0)),
+        'completion_tokens': _as_int(getattr(usage, 'completion_tokens', 0)),
+        'reasoning_tokens': _as_int(getattr(details, 'reasoning_tokens', 0)),
+        'cached_tokens': cached_tokens,
+        'finish_reason': finish_reason if isinstance(finish_reason, str) else None
+    }
+
+
+def empty_usage() -> Dict:
+    return {
+        'prompt_tokens': 0,
+        'completion_tokens': 0,
+        'reasoning_tokens': 0,
+        'cached_tokens': 0,
+        'finish_reason': None,
+        'attempts': 0,
+        'failed_attempts': 0,
+        'cost_usd': 0.0
+    }
+
+
+def call_cost(model_config: Dict, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0) -> float:
+    """USD cost from the model's `input_cost_per_mtok` / `output_cost_per_mtok` prices.
+
+    Reasoning tokens are billed as output and are already part of completion_tokens.
+    Cached prompt tokens use `cached_input_cost_per_mtok` when it is set.
+    """
+    input_price = model_config.get('input_cost_per_mtok', 0.0)
+    cached_price = model_config.get('cached_input_cost_per_mtok', input_price)
+    output_price = model_config.get('output_cost_per_mtok', 0.0)
+    uncached = prompt_tokens - cached_tokens
+    return (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+
+
+def add_call(job_usage: Dict, model_config: Dict, call_usage: Optional[Dict], success: bool):
+    """Fold one API attempt into a job's usage record."""
+    job_usage['attempts'] += 1
+    if not success:
+        job_usage['failed_attempts'] += 1
+    if call_usage is None:
+        return
+    for field in ('prompt_tokens', 'completion_tokens', 'reasoning_tokens', 'cached_tokens'):
+        job_usage[field] += call_usage.get(field, 0)
+    job_usage['cost_usd'] += call_cost(model_config, call_usage['prompt_tokens'], call_usage['completion_tokens'],
+                                       call_usage.get('cached_tokens', 0))
+    if call_usage['finish_reason']:
+        job_usage['finish_reason'] = call_usage['finish_reason']
+
+
+class UsageTracker:
+    """Run-wide token and cost totals, with admission control against a budget.
+
+    Jobs reserve their worst-case cost (prompt estimate plus max_tokens) when
+    admitted and settle to the actual usage when they finish, so concurrent
+    jobs cannot collectively overshoot the budget. Calls beyond a job's first
+    (retries, continuations, hedges) reserve their own worst case before they
+    are sent and are skipped if it no longer fits.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = None, max_cost_usd: Optional[float] = None):
+        self.max_tokens = max_tokens
+        self.max_cost_usd = max_cost_usd
+
+        self.totals = empty_usage()
+        self.per_model: Dict[str, Dict] = {}
+        self.reserved_tokens = 0
+        self.reserved_cost = 0.0
+        self.jobs_refused = 0
+        self.exhausted = False
+
+    def restore(self, summary: Dict):
+        """Carry over the totals of an earlier session of the same run."""
+        fields = [k for k in empty_usage() if k != 'finish_reason']
+        for key in fields:
+            self.totals[key] += summary.get('totals', {}).get(key, 0)
+        for name, usage in summary.get('per_model', {}).items():
+            model_totals = self.per_model.setdefault(name, empty_usage())
+            for key in fields:
+                model_totals[key] += usage.get(key, 0)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.totals['prompt_tokens'] + self.totals['completion_tokens']
+
+    def reserve(self, tokens: int, cost: float) -> bool:
+        """Admit a job if its worst case fits in the remaining budget."""
+        if self.max_tokens is not None and self.total_tokens + self.reserved_tokens + tokens > self.max_tokens:
+            return self._refuse()
+        if self.max_cost_usd is not None and self.totals['cost_usd'] + self.reserved_cost + cost > self.max_cost_usd:
+            return self._refuse()
+        self.reserved_tokens += tokens
+        self.reserved_cost += cost
+        return True
+
+    def release(self, tokens: int, cost: float):
+        self.reserved_tokens -= tokens
+        self.reserved_cost -= cost
+
+    def _refuse(self) -> bool:
+        self.jobs_refused += 1
+        # A refused worst case means the budget is as good as spent; stop queueing new jobs
+        self.exhausted = True
+        return False
+
+    def record_call(self, model_config: Dict, call_usage: Optional[Dict], success: bool):
+        model_totals = self.per_model.setdefault(model_config['name'], empty_usage())
+        add_call(model_totals, model_config, call_usage, success)
+        add_call(self.totals, model_config, call_usage, success)
+
+    @staticmethod
+    def _report(usage: Dict) -> Dict:
+        report = {k: v for k, v in usage.items() if k != 'finish_reason'}
+        report['cost_usd'] = round(usage['cost_usd'], 4)
+        report['cached_token_ratio'] = (
+            round(usage['cached_tokens'] / usage['prompt_tokens'], 3) if usage['prompt_tokens'] else 0.0
+        )
+        return report
+
+    def summary(self) -> Dict:
+        return {
+            'totals': self._report(self.totals),
+            'per_model': {name: self._report(usage) for name, usage in self.per_model.items()},
+            'budget': {
+                'max_tokens': self.max_tokens,
+                'max_cost_usd': self.max_cost_usd,
+                'jobs_refused': self.jobs_refused,
+                'exhausted': self.exhausted
+            }
+        }
@@ -1,4 +1,5 @@
 import asyncio
+import math
 import sys
 from datetime import datetime
 from pathlib import Path
@@ -10,87 +11,239 @@ from database.manager import DatabaseManager
 from research.seed_generator import ResearchSeedGenerator
 from diversity.manager import DiversityManager
 from generation.generator import EssayGenerator
-from generation.llm_manager import LLMManager
+from generation.telemetry import build_learned_limits
 from output.markdown import MarkdownExporter
 from output.analytics import AnalyticsGenerator
 
 class SyntheticEssaySystem:
-    def __init__(self, config_path: str = None):
+    def __init__(self, config_path: str = None, replay: bool = False, batch_api: bool = False,
+                 time_budget: float = None):
         self.settings = Settings(config_path)
+        if replay:
+            self.settings.response_cache = {**self.settings.response_cache, 'enabled': True, 'mode': 'replay'}
+        if batch_api:
+            self.settings.batch_api = {**self.settings.batch_api, 'enabled': True}
+        if time_budget:
+            self.settings.deadline = {**self.settings.deadline, 'time_budget_minutes': time_budget}
         self.db = DatabaseManager(self.settings.db_path)
         self.research = ResearchSeedGenerator(self.settings.perplexity_api_key)
         self.diversity = DiversityManager()
-        self.llm_manager = LLMManager(self.settings.models, self.settings.base_max_tokens)
-        self.generator = EssayGenerator(self.settings.models, self.db, self.settings.base_max_tokens)
+        self.generator = EssayGenerator(self.settings.models, self.db, self.settings.base_max_tokens,
+                                        self.settings.rate_limits, self.settings.concurrency,
+                                        self.settings.response_cache, self.settings.streaming,
+                                        self.settings.hedging, self.settings.circuit_breaker,
+                                        self.settings.budget, self.settings.batch_api,
+                                        self.settings.prompt_caching, self.settings.retry,
+                                        self.settings.token_sizing, self.settings.continuation,
+                                        self.settings.packing, self.settings.routing,
+                                        self.settings.deadline, self.settings.stratification,
+                                        self.settings.credential_pools, self.settings.header_pacing,
+                                        self.settings.timeouts, self.settings.sampling)
+        self.learned_limits = build_learned_limits(self.settings.learned_limits)
         self.exporter = MarkdownExporter(self.settings.output_dir)
         self.analytics = AnalyticsGenerator(self.settings.output_dir)
     
-    async def generate_essay_corpus(self, topic: str, num_essays: int = None):
-        """Generate a diverse corpus of synthetic essays."""
+    async def generate_essay_corpus(self, topic: str, num_essays: int = None, resume_run_id: str = None):
+        """Generate a diverse corpus of synthetic essays, or finish an interrupted run."""
+        deadline = self.generator.llm_manager.deadline
+        if deadline is not None:
+            # The time budget covers the whole run, research included
+            deadline.start()
+        previous_run = None
+        if resume_run_id:
+            previous_run = self.db.get_generation_run(resume_run_id)
+            if previous_run is None:
+                raise ValueError(f"No generation run with id {resume_run_id}")
+            planned_combinations = self.db.get_run_plan(resume_run_id)
+            if not planned_combinations:
+                # Runs started before plans were saved cannot be resumed job by job
+                raise ValueError(f"Generation run {resume_run_id} has no saved plan to resume")
+            run_id = resume_run_id
+            topic = previous_run.main_topic
+            num_essays = (previous_run.config or {}).get('num_requested', num_essays)
+        else:
+            run_id = str(uuid.uuid4())
         if num_essays is None:
             num_essays = self.settings.default_num_essays
         
-        run_id = str(uuid.uuid4())
         start_time = datetime.now()
+        run_config = {
+            'num_requested': num_essays,
+            'batch_size': self.settings.batch_size,
+            'pipelined': self.settings.pipelined,
+            'num_workers': self.settings.num_workers,
+            'budget': self.settings.budget,
+            'batch_api': self.settings.batch_api.get('enabled', False),
+            'time_budget_minutes': self.settings.deadline.get('time_budget_minutes')
+        }
         
-        print(f"Starting essay generation run: {run_id}")
+        print(f"{'Resuming' if previous_run else 'Starting'} essay generation run: {run_id}")
         print(f"Topic: {topic}")
         print(f"Target essays: {num_essays}")
         print()
         
         # Check API keys
         print("Checking API keys...")
-        key_status = self.llm_manager.validate_api_keys()
+        key_status = self.generator.llm_manager.validate_api_keys()
         for provider, has_key in key_status.items():
             status = "" if has_key else ""
             print(f"  {provider}: {status}")
         print()
         
-        # 1. Generate research seeds
-        print(f"Generating research seeds...")
-        seeds = await self.research.generate_seeds(topic, num_seeds=10)
+        # Start limiters and concurrency from what earlier runs learned
+        previous_limits = {}
+        if self.learned_limits is not None:
+            previous_limits = self.db.get_provider_limits()
+            applied = self.learned_limits.warm_start(self.generator.llm_manager.runtime, previous_limits)
+            for provider, start in applied.items():
+                limits = [f"{start[key]} {label}" for key, label in
+                          (('requests_per_minute', 'RPM'), ('tokens_per_minute', 'TPM')) if start.get(key)]
+                limits += [f"{model} x{limit}" for model, limit in start.get('concurrency', {}).items()]
+                if limits:
+                    print(f"Warm start for {provider} (weight {start['weight']}): {', '.join(limits)}")
+            if applied:
+                print()
         
-        # Save seeds to database
-        saved_seeds = self.db.save_research_seeds(seeds)
-        for seed, saved in zip(seeds, saved_seeds):
-            seed['id'] = saved.id
+        if previous_run:
+            # 1-2. Reload the persisted plan and skip jobs that already have an essay
+            combinations = planned_combinations
+            completed_jobs = self.db.get_completed_jobs(run_id)
+            previous_essays = self.db.get_run_essays(run_id)
+            if previous_run.usage:
+                self.generator.llm_manager.usage.restore(previous_run.usage)
+            print(f"Loaded {len(combinations)} planned combinations, "
+                  f"{len(completed_jobs)} (combination, model) jobs already done")
+            print()
+        else:
+            # 1. Generate research seeds
+            print(f"Generating research seeds...")
+            seeds = await self.research.generate_seeds(topic, num_seeds=10)
+            
+            # Save seeds to database
+            saved_seeds = self.db.save_research_seeds(seeds)
+            for seed, saved in zip(seeds, saved_seeds):
+                seed['id'] = saved.id
+            
+            print(f"  Generated {len(seeds)} research seeds")
+            print()
+            
+            # 2. Create diversity combinations and persist the plan before any API spend;
+            # each combination yields one essay (or its sampled drafts) per routed (or configured) model
+            print("Creating diversity combinations...")
+            llm_manager = self.generator.llm_manager
+            per_combination = llm_manager.essays_per_combination() * llm_manager.essays_per_job()
+            combinations = self.diversity.generate_combinations(seeds, math.ceil(num_essays / per_combination))
+            self.db.save_run_plan(run_id, combinations)
+            self.db.save_generation_run(run_id, topic, 0, 0.0, config=run_config, status='running')
+            completed_jobs = set()
+            previous_essays = []
+            print(f"  Created {len(combinations)} unique combinations")
+            print()
         
-        print(f"  Generated {len(seeds)} research seeds")
-        print()
-        
-        # 2. Create diversity combinations
-        print("Creating diversity combinations...")
-        combinations = self.diversity.generate_combinations(seeds, num_essays)
-        print(f"  Created {len(combinations)} unique combinations")
-        print()
-        
-        # 3. Generate essays
+        # 3. Generate essays, saving each one to the database as it arrives
         print(f"Generating essays...")
-        result = await self.generator.generate_with_diversity_report(
-            combinations, 
-            batch_size=self.settings.batch_size
-        )
+        try:
+            result = await self.generator.generate_with_diversity_report(
+                combinations, 
+                batch_size=self.settings.batch_size,
+                pipelined=self.settings.pipelined,
+                num_workers=self.settings.num_workers,
+                run_id=run_id,
+                completed_jobs=completed_jobs
+            )
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            print(f"\nInterrupted. Finished essays are saved; continue with --resume {run_id}")
+            raise
         
-        essays = result['essays']
+        essays = previous_essays + result['essays']
         diversity_report = result['diversity_report']
         generation_stats = result['generation_stats']
         
-        print(f"  Generated {len(essays)} essays")
-        print()
-        
-        # 4. Save essays to database
-        print("Saving to database...")
-        saved_essays = self.db.save_essays(essays, run_id)
-        print(f"  Saved {len(saved_essays)} essays")
+        print(f"  Generated {len(result['essays'])} essays ({len(essays)} in run)")
+        if 'pipeline' in generation_stats:
+            pipeline = generation_stats['pipeline']
+            print(f"  Average in flight: {pipeline['average_in_flight']} "
+                  f"(peak {pipeline['peak_in_flight']}/{pipeline['num_workers']})")
+            print(f"  Throughput: {pipeline['essays_per_minute']} essays/min")
+        for model_name, metrics in generation_stats.get('streaming', {}).items():
+            print(f"  {model_name}: TTFT p50 {metrics['ttft_p50']}s, "
+                  f"{metrics['tokens_per_second_p50']} tok/s, {metrics['governed']} governed")
+        if 'circuit_breakers' in generation_stats:
+            circuits = generation_stats['circuit_breakers']
+            opened = [p for p, st in circuits['providers'].items() if st['times_opened']]
+            if opened:
+                print(f"  Circuits opened: {', '.join(opened)} "
+                      f"({circuits['rerouted']} jobs rerouted, {circuits['parked']} parked)")
+        if 'hedging' in generation_stats:
+            hedging = generation_stats['hedging']
+            print(f"  Hedges: {hedging['hedges_fired']} fired, {hedging['hedge_wins']} won")
+        if 'routing' in generation_stats:
+            for model_name, routed in generation_stats['routing']['models'].items():
+                print(f"  {model_name}: {routed['delivered']} essays ({routed['delivered_share']:.0%}, "
+                      f"target {routed['target_share']:.0%}), {routed['failed']} failed")
+        if 'stratification' in generation_stats:
+            errors = generation_stats['stratification']['errors']
+            print(f"  Distribution error: " + ", ".join(f"{d} {e:.1%}" for d, e in errors.items()))
+        if 'packing' in generation_stats:
+            packing = generation_stats['packing']
+            print(f"  Packing: {packing['packed_essays']} essays from {packing['packed_requests']} packed requests, "
+                  f"{packing['fallback_essays']} sent singly")
+        if 'sampling' in generation_stats:
+            sampling = generation_stats['sampling']
+            print(f"  Sampling: {sampling['sampled_essays']} drafts, {sampling['sampled_requests']} requests with n > 1")
+        if 'continuation' in generation_stats:
+            continuation = generation_stats['continuation']
+            print(f"  Truncated essays: {continuation['truncated']} "
+                  f"({continuation['completed']} completed by continuation, {continuation['failed']} failed)")
+        if 'header_pacing' in generation_stats:
+            pacing = generation_stats['header_pacing']
+            print(f"  Header pacing: {pacing['paced_requests']} requests held {pacing['wait_seconds']}s "
+                  f"for reported quotas, {pacing['exact_resets']} rate limits waited out to the reported reset")
+        for provider, credentials in generation_stats.get('credentials', {}).items():
+            for name, used in credentials.items():
+                print(f"  {provider}/{name}: {used['requests']} requests, "
+                      f"{used['prompt_tokens'] + used['completion_tokens']} tokens, ${used['cost_usd']:.2f}, "
+                      f"{used['rate_limited']} rate limited" + (f", disabled ({used['disabled']})" if used['disabled'] else ""))
+        if 'batch_api' in generation_stats:
+            batch = generation_stats['batch_api']
+            print(f"  Batch API: {batch['batches_submitted']} batches, {batch['requests_succeeded']} succeeded, "
+                  f"{batch['fallback_interactive']} retried live")
+        if 'response_cache' in generation_stats:
+            cache = generation_stats['response_cache']
+            print(f"  Response cache: {cache['hits']} hits, {cache['misses']} misses ({cache['mode']})")
+        retries = generation_stats['retries']
+        print(f"  Retries: {retries['retries']}/{retries['retry_budget']} budget "
+              f"({retries['budget_denied']} denied, {retries['empty_responses']} empty responses)")
+        for model_name, reason in retries['aborted_models'].items():
+            print(f"  Aborted {model_name}: {reason}")
+        timeouts = generation_stats['timeouts']
+        for model_name, timed_out in timeouts['models'].items():
+            print(f"  Timeouts {model_name}: {timed_out['connect']} connect, {timed_out['read']} read, "
+                  f"{timed_out['jobs']} jobs dropped" +
+                  (f" (p50 {timed_out['elapsed_p50']}s, max {timed_out['elapsed_max']}s)" if timed_out['jobs'] else ""))
+        usage = generation_stats['usage']
+        print(f"  Tokens: {usage['totals']['prompt_tokens']} prompt, {usage['totals']['completion_tokens']} completion "
+              f"({usage['totals']['reasoning_tokens']} reasoning), ${usage['totals']['cost_usd']:.2f}")
+        print(f"  Cached prompt tokens: {usage['totals']['cached_token_ratio']:.1%}")
+        if usage['budget']['jobs_refused']:
+            print(f"  Budget reached: {usage['budget']['jobs_refused']} jobs not dispatched")
+        if 'deadline' in generation_stats:
+            timing = generation_stats['deadline']
+            if timing['reached']:
+                not_admitted = ', '.join(f"{name} {count}" for name, count in timing['not_admitted'].items())
+                print(f"  Time budget reached after {timing['elapsed_seconds']:.0f}s: {timing['dropped']} essays dropped, "
+                      f"{timing['cancelled_in_flight']} cancelled in flight"
+                      + (f", not started: {not_admitted}" if not_admitted else ""))
+                print(f"  Continue with --resume {run_id}")
         print()
         
-        # 5. Export as markdown
+        # 4. Export as markdown
         print("Exporting markdown files...")
         self.exporter.export_essays(essays, run_id, topic)
         print(f"  Exported to: {self.settings.output_dir}/{run_id}/")
         print()
         
-        # 6. Generate analytics
+        # 5. Generate analytics
         print("Generating analytics...")
         self.analytics.generate_analytics(
             essays, diversity_report, generation_stats, run_id
@@ -98,12 +251,20 @@ class SyntheticEssaySystem:
         print(f"  Analytics saved to: {self.settings.output_dir}/{run_id}/analytics.json")
         print()
         
-        # 7. Save generation run metadata
+        # 6. Save generation run metadata
         duration = (datetime.now() - start_time).total_seconds()
+        if previous_run:
+            duration += previous_run.duration_seconds or 0.0
         self.db.save_generation_run(
             run_id, topic, len(essays), duration,
-            config={'num_requested': num_essays, 'batch_size': self.settings.batch_size}
+            config=run_config,
+            usage=generation_stats['usage'],
+            status='partial' if generation_stats.get('deadline', {}).get('reached') else 'completed'
         )
+        if self.learned_limits is not None:
+            self.db.save_provider_limits(
+                run_id, self.learned_limits.snapshot(self.generator.llm_manager.runtime, previous_limits)
+            )
         
         print(f"Generation complete!")
         print(f"Run ID: {run_id}")
@@ -116,8 +277,18 @@ class SyntheticEssaySystem:
 async def main():
     parser = argparse.ArgumentParser(description='Generate synthetic essays for educational demos')
     parser.add_argument('--topic', type=str, help='Essay topic/prompt')
-    parser.add_argument('--num-essays', type=int, default=60, help='Number of essays to generate')
+    parser.add_argument('--num-essays', type=int, default=60, help='Number of essays to deliver')
     parser.add_argument('--config', type=str, help='Path to config file')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Stream jobs through a work queue instead of fixed batches')
+    parser.add_argument('--replay', action='store_true',
+                        help='Serve responses from the response cache only, making no API calls')
+    parser.add_argument('--resume', type=str, metavar='RUN_ID',
+                        help='Resume an interrupted run, generating only its missing essays')
+    parser.add_argument('--batch-api', action='store_true',
+                        help='Submit requests as provider batch jobs instead of live calls')
+    parser.add_argument('--time-budget', type=float, metavar='MINUTES',
+                        help='Finish within this many minutes, dropping jobs that cannot complete in time')
     
     args = parser.parse_args()
     
@@ -129,10 +300,13 @@ async def main():
         copyright, the role of human artists, and the potential for misuse.
         """
     
-    system = SyntheticEssaySystem(args.config)
+    system = SyntheticEssaySystem(args.config, replay=args.replay, batch_api=args.batch_api,
+                                  time_budget=args.time_budget)
+    if args.pipelined:
+        system.settings.pipelined = True
     
     try:
-        await system.generate_essay_corpus(args.topic, args.num_essays)
+        await system.generate_essay_corpus(args.topic, args.num_essays, resume_run_id=args.resume)
     except KeyboardInterrupt:
         print("\nGeneration interrupted by user")
         sys.exit(1)
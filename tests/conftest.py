@@ -0,0 +1,11 @@
+import pytest
+
+from generation.runtime import reset_runtime
+
+
+@pytest.fixture(autouse=True)
+def fresh_provider_runtime():
+    """Give each test its own provider runtime instead of the process-wide one."""
+    reset_runtime()
+    yield
+    reset_runtime()
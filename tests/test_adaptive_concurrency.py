@@ -0,0 +1,93 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+
+from litellm import RateLimitError
+
+from generation.concurrency import AdaptiveConcurrencyController, percentile
+from generation.llm_manager import LLMManager
+
+
+class TestAdaptiveConcurrencyController:
+    def test_additive_increase_on_success(self):
+        controller = AdaptiveConcurrencyController(initial_limit=2, max_limit=10)
+        for _ in range(8):
+            controller.record_success(1.0)
+        assert controller.current_limit > 2
+        assert controller.current_limit <= 10
+    
+    def test_multiplicative_decrease_on_rate_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=8)
+        controller.record_failure('rate_limit')
+        assert controller.current_limit == 4
+    
+    def test_burst_of_failures_cuts_once(self):
+        """Concurrent failures from one overload event only halve the limit once."""
+        controller = AdaptiveConcurrencyController(initial_limit=16)
+        for _ in range(5):
+            controller.record_failure('timeout')
+        assert controller.current_limit == 8
+    
+    def test_limit_never_drops_below_minimum(self):
+        controller = AdaptiveConcurrencyController(initial_limit=2, min_limit=1)
+        for _ in range(5):
+            controller.last_decrease = 0.0
+            controller.record_failure('rate_limit')
+        assert controller.current_limit == 1
+    
+    def test_rising_p95_latency_decreases_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=8, min_samples=5, window_size=10)
+        for _ in range(10):
+            controller.record_success(1.0)
+        limit_before = controller.current_limit
+        controller.last_decrease = 0.0
+        for _ in range(10):
+            controller.record_success(5.0)
+        assert controller.current_limit < limit_before
+        assert controller.last_decrease_reason == 'latency'
+    
+    @pytest.mark.asyncio
+    async def test_in_flight_is_bounded_by_limit(self):
+        controller = AdaptiveConcurrencyController(initial_limit=2)
+        peak = 0
+        
+        async def job():
+            nonlocal peak
+            await controller.acquire()
+            peak = max(peak, controller.in_flight)
+            await asyncio.sleep(0.01)
+            await controller.release()
+        
+        await asyncio.gather(*(job() for _ in range(6)))
+        assert peak == 2
+        assert controller.in_flight == 0
+
+
+def test_percentile():
+    assert percentile([1, 2, 3, 4, 5], 0.5) == 3
+    assert percentile([], 0.95) == 0.0
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_llm_manager_reports_concurrency_limits(mock_acompletion, mock_sleep):
+    """Controller limits are exposed through get_backoff_status."""
+    models = [{'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai'}]
+    manager = LLMManager(models, concurrency={'adaptive': True, 'initial_limit': 4})
+    
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock()]
+    mock_response.choices[0].message.content = "Essay"
+    mock_acompletion.side_effect = [
+        RateLimitError(message="Rate limit exceeded", llm_provider="openai", model="gpt-4o"),
+        mock_response
+    ]
+    
+    prompt_data = {'prompt': 'Test prompt', 'metadata': {}}
+    result = await manager.generate_essay(prompt_data, models[0])
+    
+    assert result is not None
+    status = manager.get_backoff_status()
+    assert status['openai']['concurrency']['ChatGPT 4o']['limit'] == 2
+    assert status['openai']['concurrency']['ChatGPT 4o']['decreases'] == 1
@@ -0,0 +1,142 @@
+import pytest
+from unittest.mock import patch
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer
+from generation.batch_api import (
+    BatchExecutor, batch_format, build_anthropic_request, parse_anthropic_result
+)
+from generation.llm_manager import LLMManager
+
+PROMPTS = [
+    {'prompt': f"Essay {i}: write approximately 750-1000 words.", 'metadata': {'index': i}}
+    for i in range(5)
+]
+
+
+def fake_models(api_base):
+    return [
+        {'model': 'openai/fake-gpt', 'name': 'Fake GPT', 'provider': 'fake_openai',
+         'api_base': api_base, 'api_key': 'fake-key', 'max_tokens': 3000,
+         'input_cost_per_mtok': 2.0, 'output_cost_per_mtok': 10.0},
+        {'model': 'anthropic/fake-claude', 'name': 'Fake Claude', 'provider': 'fake_anthropic',
+         'api_base': api_base, 'api_key': 'fake-key', 'max_tokens': 3000}
+    ]
+
+
+def test_batch_format_from_model_prefix():
+    assert batch_format({'model': 'openai/gpt-4o'}) == 'openai'
+    assert batch_format({'model': 'anthropic/claude-3-7-sonnet-latest'}) == 'anthropic'
+    assert batch_format({'model': 'gemini/gemini-2.5-pro'}) is None
+
+
+def test_anthropic_request_moves_system_prompt():
+    messages = [{'role': 'system', 'content': 'Be a student'}, {'role': 'user', 'content': 'Write'}]
+    request = build_anthropic_request('job-0', {'model': 'anthropic/claude-x'}, messages, 100)
+    assert request['params']['system'] == 'Be a student'
+    assert request['params']['model'] == 'claude-x'
+    assert request['params']['messages'] == [{'role': 'user', 'content': 'Write'}]
+
+
+def test_anthropic_max_tokens_maps_to_length():
+    content, usage = parse_anthropic_result({'custom_id': 'job-0', 'result': {'type': 'succeeded', 'message': {
+        'content': [{'type': 'text', 'text': 'Cut off'}], 'stop_reason': 'max_tokens',
+        'usage': {'input_tokens': 5, 'output_tokens': 7}
+    }}})
+    assert content == 'Cut off'
+    assert usage['finish_reason'] == 'length'
+    assert usage['completion_tokens'] == 7
+
+
+@pytest.mark.asyncio
+async def test_batches_round_trip_through_stand_in():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0.01, batch_delay=5))
+    api_base = await server.start()
+    try:
+        manager = LLMManager(fake_models(api_base))
+        executor = BatchExecutor(manager, poll_interval=0.01)
+        essays = await executor.run(PROMPTS)
+    finally:
+        await server.stop()
+
+    assert len(essays) == 10
+    assert {e['model_name'] for e in essays} == {'Fake GPT', 'Fake Claude'}
+    assert all(len(e['content'].split()) >= 750 for e in essays)
+    assert {e['metadata']['index'] for e in essays} == set(range(5))
+    assert server.stats['batches'] == 2
+    assert server.stats['requests'] == 0  # no live calls
+
+    gpt = manager.get_usage_summary()['per_model']['Fake GPT']
+    assert gpt['completion_tokens'] > 0
+    # Batch discount halves the listed price
+    expected = (gpt['prompt_tokens'] * 2.0 + gpt['completion_tokens'] * 10.0) / 1_000_000 * 0.5
+    assert gpt['cost_usd'] == pytest.approx(expected, abs=1e-4)
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+async def test_failed_batch_requests_fall_back_to_live_calls(mock_sleep):
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, server_error_rate=0.5, seed=3))
+    api_base = await server.start()
+    try:
+        manager = LLMManager(fake_models(api_base)[:1])
+        executor = BatchExecutor(manager, poll_interval=0)
+        essays = await executor.run(PROMPTS)
+    finally:
+        await server.stop()
+
+    stats = executor.get_stats()
+    assert stats['requests_failed'] > 0
+    assert stats['fallback_interactive'] == stats['requests_failed']
+    assert server.stats['requests'] >= stats['requests_failed']
+    assert len(essays) == 5
+
+
+@pytest.mark.asyncio
+async def test_cached_jobs_skip_the_batch_and_replay_submits_nothing(tmp_path):
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, batch_delay=0))
+    api_base = await server.start()
+    cache = {'enabled': True, 'path': str(tmp_path / 'cache.db')}
+    try:
+        first = LLMManager(fake_models(api_base)[:1], response_cache=cache)
+        await BatchExecutor(first, poll_interval=0).run(PROMPTS[:3])
+
+        rerun = LLMManager(fake_models(api_base)[:1], response_cache=cache)
+        rerun_executor = BatchExecutor(rerun, poll_interval=0)
+        essays = await rerun_executor.run(PROMPTS)
+
+        replay = LLMManager(fake_models(api_base)[:1], response_cache={**cache, 'mode': 'replay'})
+        replay_executor = BatchExecutor(replay, poll_interval=0)
+        replayed = await replay_executor.run(PROMPTS + [{'prompt': 'Uncached essay', 'metadata': {'index': 9}}])
+    finally:
+        await server.stop()
+
+    assert len(essays) == 5
+    assert rerun_executor.get_stats()['cache_hits'] == 3
+    assert rerun_executor.get_stats()['requests_submitted'] == 2
+    assert len(replayed) == 5 and all(e['cached'] for e in replayed)
+    assert replay_executor.get_stats()['replay_skipped'] == 1
+    assert replay_executor.get_stats()['batches_submitted'] == 0
+    assert server.stats['batches'] == 2
+
+
+@pytest.mark.asyncio
+async def test_each_request_is_sent_with_its_planned_max_tokens():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, batch_delay=0))
+    api_base = await server.start()
+    try:
+        model = {**fake_models(api_base)[0], 'context_window': 2500}
+        manager = LLMManager([model], token_sizing={'enabled': True})
+        prompts = [PROMPTS[0], {'prompt': "Context. " * 400 + PROMPTS[1]['prompt'], 'metadata': {'index': 1}}]
+        await BatchExecutor(manager, poll_interval=0).run(prompts)
+
+        # An aborted model's jobs are not submitted
+        manager.aborted_models[model['name']] = 'AuthenticationError'
+        assert await BatchExecutor(manager, poll_interval=0).run(prompts) == []
+    finally:
+        await server.stop()
+
+    [batch] = server._batches.values()
+    sent = [line['body']['max_tokens'] for line in batch['_lines']]
+    planned = [manager._token_config(prompt_data, model)['max_tokens'] for prompt_data in prompts]
+    assert sent == planned
+    assert planned[0] > planned[1]
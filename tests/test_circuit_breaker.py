@@ -0,0 +1,111 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.circuit_breaker import CircuitBreaker, CLOSED, OPEN, HALF_OPEN
+from generation.llm_manager import LLMManager
+
+MODELS = [
+    {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai'},
+    {'model': 'anthropic/claude-3-7-sonnet-latest', 'name': 'Claude', 'provider': 'anthropic'}
+]
+
+
+def trip(breaker):
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+
+
+class TestCircuitBreaker:
+    def test_opens_when_health_drops(self):
+        breaker = CircuitBreaker('openai', min_calls=3)
+        breaker.record_success(1.0)
+        trip(breaker)
+        assert breaker.state == OPEN
+        assert not breaker.allow_request()
+        assert breaker.rejected == 1
+    
+    def test_slow_calls_lower_health(self):
+        breaker = CircuitBreaker('openai', min_calls=4, slow_call_seconds=10)
+        for _ in range(4):
+            breaker.record_success(20.0)
+        assert breaker.health_score() == 0.5
+        assert breaker.state == CLOSED
+    
+    def test_half_open_probe_success_closes(self):
+        breaker = CircuitBreaker('openai', min_calls=2, open_seconds=0)
+        trip(breaker)
+        assert breaker.allow_request()
+        assert breaker.state == HALF_OPEN
+        # Only one probe at a time
+        assert not breaker.allow_request()
+        breaker.record_success(1.0)
+        assert breaker.state == CLOSED
+    
+    def test_failed_probe_reopens_with_longer_wait(self):
+        breaker = CircuitBreaker('openai', min_calls=2, open_seconds=0.5)
+        trip(breaker)
+        breaker.opened_at -= 1
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert breaker.open_seconds == 1.0
+    
+    @pytest.mark.asyncio
+    async def test_parked_waiters_resume_after_open_period(self):
+        breaker = CircuitBreaker('openai', min_calls=2, open_seconds=0.05)
+        trip(breaker)
+        await asyncio.wait_for(breaker.wait_until_available(), timeout=1)
+        assert breaker.is_available()
+
+
+def mock_response(content="Essay"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_open_circuit_stops_retries_and_reroutes(mock_acompletion, mock_sleep):
+    manager = LLMManager(MODELS, circuit_breaker={'enabled': True, 'min_calls': 2, 'open_seconds': 60})
+    
+    async def completion(**kwargs):
+        if kwargs['model'].startswith('openai'):
+            raise ConnectionError("connection reset")
+        return mock_response("Claude essay")
+    mock_acompletion.side_effect = completion
+    
+    result = await manager.dispatch({'prompt': 'p', 'metadata': {}}, MODELS[0])
+    
+    assert result['model_name'] == 'Claude'
+    openai_calls = [c for c in mock_acompletion.call_args_list if c.kwargs['model'].startswith('openai')]
+    # Circuit opened after two failures instead of burning all five retries
+    assert len(openai_calls) == 2
+    status = manager.get_circuit_status()
+    assert status['providers']['openai']['state'] == OPEN
+    assert status['rerouted'] == 1
+
+
+@pytest.mark.asyncio
+async def test_jobs_for_open_provider_are_rerouted_before_dispatch():
+    manager = LLMManager(MODELS, circuit_breaker={'enabled': True, 'min_calls': 2})
+    trip(manager.circuit_breakers['openai'])
+    
+    routed = await manager._route_to_healthy({'prompt': 'p', 'metadata': {}}, MODELS[0])
+    assert routed['name'] == 'Claude'
+
+
+@pytest.mark.asyncio
+async def test_job_is_not_rerouted_to_a_model_already_writing_it():
+    manager = LLMManager(MODELS, circuit_breaker={'enabled': True, 'min_calls': 2})
+    prompt_data = {'prompt': 'p', 'metadata': {'combination_id': 'combo_0000'}}
+    # Without routing both models write the combination, so the job waits for the circuit
+    manager.plan_jobs([prompt_data])
+    trip(manager.circuit_breakers['openai'])
+    
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(manager._route_to_healthy(prompt_data, MODELS[0]), 0.05)
+    assert manager.get_circuit_status()['parked'] == 1
@@ -0,0 +1,126 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer
+from generation.continuation import build_continuation_messages, stitch, trim_to_boundary
+from generation.llm_manager import LLMManager
+from generation.token_calculator import count_message_tokens
+
+MODEL = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'max_tokens': 1000}
+
+PROMPT_DATA = {'prompt': 'Write an essay about testing', 'metadata': {}}
+
+
+def mock_response(content, finish_reason='stop'):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.choices[0].finish_reason = finish_reason
+    response.usage.prompt_tokens = 10
+    response.usage.completion_tokens = 20
+    return response
+
+
+def test_trim_cuts_back_to_last_sentence():
+    assert trim_to_boundary("First sentence. Second one is cut mi") == "First sentence."
+    assert trim_to_boundary("no sentence end here at al") == "no sentence end here at"
+
+
+def test_stitch_drops_repeated_text():
+    partial = "Testing matters because it catches regressions before users do. " * 3
+    partial = partial.strip()
+    repeated = partial[-100:] + " It also documents intent."
+    assert stitch(partial, repeated) == partial + " It also documents intent."
+    assert stitch("End of paragraph.", "\n\nNew paragraph.") == "End of paragraph.\n\nNew paragraph."
+
+
+def test_continuation_messages_carry_partial_essay():
+    messages = build_continuation_messages([{'role': 'user', 'content': 'Write'}], "Partial.")
+    assert messages[1] == {'role': 'assistant', 'content': "Partial."}
+    assert messages[2]['role'] == 'user'
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_truncated_essay_is_continued_and_stitched(mock_acompletion):
+    manager = LLMManager([MODEL], continuation={'enabled': True})
+    mock_acompletion.side_effect = [
+        mock_response("Opening sentence. Half a second", 'length'),
+        mock_response("The rest of the essay.")
+    ]
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+
+    assert result['content'] == "Opening sentence. The rest of the essay."
+    assert result['usage']['attempts'] == 2
+    assert result['usage']['finish_reason'] == 'stop'
+    continuation_messages = mock_acompletion.call_args_list[1].kwargs['messages']
+    assert continuation_messages[-2]['content'] == "Opening sentence."
+    assert manager.continuation.get_stats()['completed'] == 1
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_continuation_estimate_counts_the_partial_essay(mock_acompletion):
+    manager = LLMManager([MODEL], continuation={'enabled': True})
+    partial = "Opening sentence. " * 200
+    mock_acompletion.side_effect = [mock_response(partial + "Half", 'length'),
+                                    mock_response("The rest of the essay.")]
+    estimates = []
+    send_request = manager._send_request
+
+    async def record_estimate(kwargs, model_config, tokens):
+        estimates.append(tokens)
+        return await send_request(kwargs, model_config, tokens)
+    manager._send_request = record_estimate
+
+    await manager.dispatch(PROMPT_DATA, MODEL)
+
+    continuation = mock_acompletion.call_args_list[1].kwargs
+    assert estimates[1] == count_message_tokens(continuation['messages'], MODEL) + continuation['max_tokens']
+    assert estimates[1] > estimates[0] + 400
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_failed_continuation_keeps_partial_essay(mock_acompletion):
+    manager = LLMManager([MODEL], continuation={'enabled': True})
+    mock_acompletion.side_effect = [mock_response("Opening sentence. Half", 'length'), ConnectionError("reset")]
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+
+    assert result['content'] == "Opening sentence. Half"
+    assert result['usage']['finish_reason'] == 'length'
+    assert manager.continuation.get_stats()['failed'] == 1
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_continuation_outside_budget_keeps_partial_essay(mock_acompletion):
+    manager = LLMManager([MODEL], continuation={'enabled': True}, budget={'max_tokens': 1500})
+    mock_acompletion.side_effect = [mock_response("Opening sentence. Half", 'length'),
+                                    mock_response("The rest of the essay.")]
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+
+    assert result['content'] == "Opening sentence. Half"
+    assert mock_acompletion.call_count == 1
+    assert manager.usage.jobs_refused == 1
+
+
+@pytest.mark.asyncio
+async def test_continuation_completes_essays_against_fake_provider():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, seed=4))
+    api_base = await server.start()
+    try:
+        model = {'model': 'openai/fake-gpt', 'name': 'Fake GPT', 'provider': 'fake',
+                 'api_base': api_base, 'api_key': 'fake-key', 'max_tokens': 800}
+        manager = LLMManager([model], continuation={'enabled': True, 'max_continuations': 3})
+        prompt_data = {'prompt': "Write approximately 750-1000 words.", 'metadata': {}}
+        result = await manager.dispatch(prompt_data, model)
+    finally:
+        await server.stop()
+
+    assert result['usage']['finish_reason'] == 'stop'
+    assert result['usage']['attempts'] >= 2
+    assert len(result['content'].split()) >= 700
@@ -0,0 +1,141 @@
+import litellm
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.circuit_breaker import CircuitOpenError
+from generation.credentials import Credential, CredentialPool, build_credential_pools
+from generation.llm_manager import LLMManager
+
+MODEL = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'max_tokens': 1000}
+
+PROMPT_DATA = {'prompt': 'Write an essay about testing', 'metadata': {}}
+
+POOLS = {'openai': {'credentials': [
+    {'name': 'org-a', 'api_key': 'key-a'},
+    {'name': 'org-b', 'api_key': 'key-b', 'requests_per_minute': 1000}
+]}}
+
+
+def mock_response(content="Essay text"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.usage.prompt_tokens = 100
+    response.usage.completion_tokens = 500
+    return response
+
+
+def rate_limit_error():
+    return litellm.RateLimitError(message="slow down", llm_provider='openai', model='gpt-4o')
+
+
+def auth_error():
+    return litellm.AuthenticationError(message="invalid api key", llm_provider='openai', model='gpt-4o')
+
+
+def not_found_error():
+    return litellm.NotFoundError(message="model not found", llm_provider='openai', model='gpt-4o')
+
+
+def test_build_pools_inherit_provider_limits(monkeypatch):
+    monkeypatch.setenv('TEST_ORG_KEY', 'secret')
+    pools = build_credential_pools(
+        {'openai': {'cooldown_seconds': 10, 'credentials': [
+            {'name': 'env', 'api_key_env': 'TEST_ORG_KEY'},
+            {'api_base': 'https://example.test/v1', 'requests_per_minute': 60}
+        ]}},
+        {'openai': {'requests_per_minute': 500, 'tokens_per_minute': 30000}}
+    )
+    env, endpoint = pools['openai'].credentials
+    assert env.api_key == 'secret'
+    assert env.limiter.limits() == (500, 30000)
+    assert endpoint.name == 'openai-1'
+    assert endpoint.limiter.limits() == (60, 30000)
+    assert endpoint.request_kwargs() == {'api_base': 'https://example.test/v1'}
+    assert pools['openai'].cooldown_seconds == 10
+
+
+@pytest.mark.asyncio
+async def test_pool_picks_least_loaded_and_skips_cooling_credentials():
+    pool = CredentialPool('openai', [Credential('a', 'key-a'), Credential('b', 'key-b')])
+    first = await pool.acquire()
+    second = await pool.acquire()
+    assert {first.name, second.name} == {'a', 'b'}
+
+    pool.release(first, error=rate_limit_error())
+    pool.release(second, {'prompt_tokens': 10, 'completion_tokens': 20}, 0.01)
+    for _ in range(3):
+        credential = await pool.acquire()
+        assert credential is second
+        pool.release(credential)
+    assert first.rate_limited == 1
+    assert second.get_stats()['requests'] == 4
+
+
+@pytest.mark.asyncio
+async def test_auth_error_disables_only_that_credential():
+    pool = CredentialPool('openai', [Credential('a', 'key-a'), Credential('b', 'key-b')])
+    credential = await pool.acquire()
+    pool.release(credential, error=auth_error())
+    assert [c.name for c in pool.usable] == ['b' if credential.name == 'a' else 'a']
+    assert 'AuthenticationError' in credential.get_stats()['disabled']
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_rate_limited_key_fails_over_without_provider_backoff(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL], credential_pools=POOLS)
+    keys = []
+
+    async def complete(**kwargs):
+        keys.append(kwargs['api_key'])
+        if len(keys) == 1:
+            raise rate_limit_error()
+        return mock_response()
+    mock_acompletion.side_effect = complete
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+    assert result['content'] == "Essay text"
+    assert len(set(keys)) == 2
+    assert manager.get_backoff_status() == {}
+
+    usage = manager.get_credential_usage()['openai']
+    assert sum(c['requests'] for c in usage.values()) == 1
+    assert sum(c['rate_limited'] for c in usage.values()) == 1
+    assert sum(c['completion_tokens'] for c in usage.values()) == 500
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_model_aborts_once_every_key_is_rejected(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL], credential_pools=POOLS)
+    mock_acompletion.side_effect = auth_error()
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert mock_acompletion.call_count == 2
+    assert 'ChatGPT 4o' in manager.get_retry_stats()['aborted_models']
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_unknown_model_aborts_without_disabling_keys(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL], credential_pools=POOLS)
+    mock_acompletion.side_effect = not_found_error()
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert mock_acompletion.call_count == 1
+    assert 'ChatGPT 4o' in manager.get_retry_stats()['aborted_models']
+    pool = manager.credential_pools['openai']
+    assert len(pool.usable) == 2
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_does_not_count_against_the_key():
+    pool = CredentialPool('openai', [Credential('a', 'key-a')])
+    credential = await pool.acquire()
+    pool.release(credential, error=CircuitOpenError('openai'))
+    assert pool.usable == [credential]
+    assert credential.errors == 0 and credential.in_flight == 0
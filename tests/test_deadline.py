@@ -0,0 +1,100 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import MagicMock
+
+from generation.deadline import RunDeadline, build_run_deadline
+from generation.generator import EssayGenerator
+
+
+SEEDS = [{'id': 1, 'angle': 'test angle', 'facts': ['fact'], 'quotes': ['quote'], 'sources': []}]
+
+
+def make_generator(deadline):
+    models = [
+        {'model': 'openai/fast', 'name': 'Fast', 'provider': 'openai'},
+        {'model': 'gemini/slow', 'name': 'Slow', 'provider': 'gemini'}
+    ]
+    db_manager = MagicMock()
+    db_manager.save_prompt.return_value = MagicMock(id=1)
+    return EssayGenerator(models, db_manager, deadline=deadline)
+
+
+def essay(prompt_data, model_config):
+    return {
+        'content': 'Essay text',
+        'model_name': model_config['name'],
+        'temperature': 0.8,
+        'prompt_hash': 'hash',
+        'metadata': prompt_data['metadata']
+    }
+
+
+def test_estimate_uses_observed_job_times():
+    deadline = RunDeadline(600, default_job_seconds=90)
+    assert deadline.estimate('GPT') == 90
+    for seconds in range(1, 11):
+        assert deadline.admit('GPT')
+        deadline.finish('GPT', seconds)
+    assert deadline.estimate('GPT') == 9
+    assert deadline.in_flight == 0
+
+
+def test_jobs_that_cannot_finish_are_not_admitted():
+    deadline = RunDeadline(60, default_job_seconds=30, safety_margin=0.1)
+    assert deadline.admit('Fast')
+    deadline.finish('Fast', 10)
+    deadline.started_at = time.monotonic() - 45
+
+    assert deadline.admit('Fast')
+    assert not deadline.admit('Slow')
+    assert deadline.not_admitted == {'Slow': 1}
+    assert deadline.reached
+
+
+def test_build_requires_a_time_budget():
+    assert build_run_deadline({}) is None
+    assert build_run_deadline({'time_budget_minutes': None}) is None
+    assert build_run_deadline({'time_budget_minutes': 2, 'grace_seconds': 1}).time_budget_seconds == 120
+
+
+@pytest.mark.asyncio
+async def test_deadline_cancels_in_flight_jobs_and_keeps_finished_essays():
+    generator = make_generator({'time_budget_minutes': 0.01, 'default_job_seconds': 0.01,
+                                'grace_seconds': 0.1})
+
+    async def fake_generate(prompt_data, model_config):
+        await asyncio.sleep(0.01 if model_config['name'] == 'Fast' else 60)
+        return essay(prompt_data, model_config)
+    generator.llm_manager.generate_essay = fake_generate
+
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, 4)
+    started = time.monotonic()
+    result = await generator.generate_with_diversity_report(combinations, pipelined=True, num_workers=8)
+
+    assert time.monotonic() - started < 5
+    assert {e['model_name'] for e in result['essays']} == {'Fast'}
+    timing = result['generation_stats']['deadline']
+    assert timing['reached']
+    assert timing['cancelled_in_flight'] == 4
+    assert timing['dropped'] == 8 - len(result['essays'])
+    assert generator.llm_manager.deadline.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_run_within_budget_is_unaffected():
+    generator = make_generator({'time_budget_minutes': 10, 'default_job_seconds': 1})
+
+    async def fake_generate(prompt_data, model_config):
+        await asyncio.sleep(0.01)
+        return essay(prompt_data, model_config)
+    generator.llm_manager.generate_essay = fake_generate
+
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, 3)
+    result = await generator.generate_with_diversity_report(combinations)
+
+    assert len(result['essays']) == 6
+    timing = result['generation_stats']['deadline']
+    assert not timing['reached']
+    assert timing['dropped'] == 0
+    assert set(timing['estimates']) == {'Fast', 'Slow'}
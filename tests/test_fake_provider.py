@@ -0,0 +1,78 @@
+import random
+import pytest
+from litellm import acompletion, RateLimitError
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer, generate_essay_text
+
+
+def test_essay_text_is_deterministic():
+    text_a, _ = generate_essay_text("approximately 750-1000 words", random.Random(1))
+    text_b, _ = generate_essay_text("approximately 750-1000 words", random.Random(1))
+    assert text_a == text_b
+    assert 750 <= len(text_a.split()) <= 1300
+    assert "\n\n" in text_a
+
+
+def test_essay_text_respects_max_tokens():
+    text, finish_reason = generate_essay_text("approximately 750-1000 words", random.Random(1), max_tokens=200)
+    assert finish_reason == 'length'
+    assert len(text.split()) <= 200
+
+
+@pytest.mark.asyncio
+async def test_litellm_completion_against_fake_provider():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0))
+    api_base = await server.start()
+    try:
+        response = await acompletion(
+            model="openai/fake-essay-model",
+            messages=[{"role": "user", "content": "Write approximately 750-1000 words."}],
+            api_base=api_base,
+            api_key="fake-key",
+            max_tokens=3000
+        )
+    finally:
+        await server.stop()
+    
+    assert len(response.choices[0].message.content.split()) >= 750
+    assert response.usage.completion_tokens > 0
+    assert server.stats['completed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_injected_429_maps_to_rate_limit_error():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, rate_limit_rate=1.0))
+    api_base = await server.start()
+    try:
+        with pytest.raises(RateLimitError):
+            await acompletion(
+                model="openai/fake-essay-model",
+                messages=[{"role": "user", "content": "test"}],
+                api_base=api_base,
+                api_key="fake-key",
+                max_retries=0
+            )
+    finally:
+        await server.stop()
+    assert server.stats['rate_limited'] >= 1
+
+
+@pytest.mark.asyncio
+async def test_fake_provider_returns_n_completions():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0))
+    api_base = await server.start()
+    try:
+        response = await acompletion(
+            model="openai/fake-essay-model",
+            messages=[{"role": "user", "content": "Write approximately 750-1000 words."}],
+            api_base=api_base,
+            api_key="fake-key",
+            max_tokens=3000,
+            n=3
+        )
+    finally:
+        await server.stop()
+    
+    drafts = [choice.message.content for choice in response.choices]
+    assert len(set(drafts)) == 3
+    assert response.usage.completion_tokens > 3 * 750
@@ -0,0 +1,106 @@
+import time
+import httpx
+import litellm
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+from generation.header_pacing import (
+    HeaderPacer, error_headers, parse_rate_limit_headers, parse_reset, response_headers, retry_after_seconds
+)
+from generation.llm_manager import LLMManager
+
+MODEL = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'max_tokens': 1000}
+
+PROMPT_DATA = {'prompt': 'Write an essay about testing', 'metadata': {}}
+
+
+def mock_response(headers=None):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "Essay text"
+    response._hidden_params = {'additional_headers': headers or {}}
+    return response
+
+
+def test_parse_reset_formats():
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    assert parse_reset('20') == 20
+    assert parse_reset('6m0s') == 360
+    assert parse_reset('1h2m3.5s') == pytest.approx(3723.5)
+    assert parse_reset('20ms') == pytest.approx(0.02)
+    assert parse_reset('2025-01-01T00:00:30Z', now) == 30
+    assert parse_reset('soon') is None
+
+
+def test_parse_openai_and_anthropic_headers():
+    openai = parse_rate_limit_headers({
+        'x-ratelimit-limit-requests': '500', 'x-ratelimit-remaining-requests': '499',
+        'x-ratelimit-reset-requests': '120ms', 'x-ratelimit-remaining-tokens': '29000'
+    })
+    assert openai['requests'] == {'limit': 500, 'remaining': 499, 'reset': pytest.approx(0.12)}
+    assert openai['tokens'] == {'remaining': 29000}
+
+    reset_at = (datetime.now(timezone.utc) + timedelta(seconds=30)).isoformat()
+    anthropic = parse_rate_limit_headers({
+        'anthropic-ratelimit-requests-limit': '50', 'anthropic-ratelimit-requests-remaining': '0',
+        'anthropic-ratelimit-requests-reset': reset_at
+    })
+    assert anthropic['requests']['remaining'] == 0
+    assert 29 < anthropic['requests']['reset'] <= 30
+
+
+def test_headers_from_hidden_params_and_errors():
+    response = mock_response({'llm_provider-x-ratelimit-remaining-requests': '7'})
+    assert response_headers(response) == {'x-ratelimit-remaining-requests': '7'}
+    assert response_headers(MagicMock()) == {}
+
+    error = litellm.RateLimitError(message="slow down", llm_provider='openai', model='gpt-4o',
+                                   response=httpx.Response(429, headers={'Retry-After': '7'}))
+    headers = error_headers(error)
+    assert retry_after_seconds(headers) == 7
+    assert retry_after_seconds({'retry-after-ms': '1500'}) == 1.5
+    assert retry_after_seconds({'x-ratelimit-remaining-requests': '0', 'x-ratelimit-reset-requests': '3s'}) == 3
+
+
+@pytest.mark.asyncio
+async def test_pacer_waits_for_reset_when_quota_is_spent():
+    pacer = HeaderPacer()
+    pacer.update('openai', {'x-ratelimit-limit-requests': '100', 'x-ratelimit-remaining-requests': '1',
+                            'x-ratelimit-reset-requests': '0.2s'})
+    assert await pacer.acquire('openai') == 0
+    # The local count is now zero, so the next request waits for the reset
+    assert 0 < await pacer.acquire('openai') <= 0.25
+    assert pacer.get_stats()['paced_requests'] == 1
+
+
+@pytest.mark.asyncio
+async def test_pacer_spreads_the_last_of_a_quota():
+    pacer = HeaderPacer(low_water=0.1)
+    pacer.update('openai', {'x-ratelimit-limit-requests': '100', 'x-ratelimit-remaining-requests': '5',
+                            'x-ratelimit-reset-requests': '10s'})
+    await pacer.acquire('openai')
+    # Four requests left for about ten seconds: roughly one every 2.5 seconds
+    assert pacer._delay('openai', 0, time.monotonic()) == pytest.approx(2.5, abs=0.1)
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_rate_limit_waits_for_reported_reset_instead_of_backoff(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL], header_pacing={'enabled': True})
+    responses = [
+        litellm.RateLimitError(message="slow down", llm_provider='openai', model='gpt-4o',
+                               response=httpx.Response(429, headers={'retry-after': '12'})),
+        mock_response({'x-ratelimit-remaining-requests': '99', 'x-ratelimit-limit-requests': '100'})
+    ]
+    mock_acompletion.side_effect = responses
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+    assert result['content'] == "Essay text"
+    assert manager.get_backoff_status() == {}
+    assert mock_sleep.call_args_list[0][0][0] == pytest.approx(12, abs=0.1)
+
+    stats = manager.get_header_pacing_stats()
+    assert stats['exact_resets'] == 1
+    assert stats['remaining'] == {'openai': {'requests': 99}}
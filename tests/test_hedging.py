@@ -0,0 +1,153 @@
+import asyncio
+import pytest
+
+from generation.hedging import HedgingPolicy
+from generation.llm_manager import LLMManager
+
+MODELS = [
+    {'model': 'gemini/gemini-2.5-pro', 'name': 'Gemini', 'provider': 'gemini'},
+    {'model': 'openai/gpt-4o', 'name': 'ChatGPT', 'provider': 'openai'}
+]
+
+
+def essay_for(model_config):
+    return {'content': f"Essay by {model_config['name']}", 'model_name': model_config['name'],
+            'prompt_hash': 'hash', 'cached': False}
+
+
+class TestHedgingPolicy:
+    def test_no_delay_until_min_samples(self):
+        policy = HedgingPolicy(min_samples=3)
+        policy.record_latency('Gemini', 1.0)
+        assert policy.hedge_delay('Gemini') is None
+        policy.record_latency('Gemini', 1.0)
+        policy.record_latency('Gemini', 5.0)
+        assert policy.hedge_delay('Gemini') == 5.0
+    
+    def test_extra_spend_is_capped(self):
+        policy = HedgingPolicy(max_extra_fraction=0.1)
+        policy.dispatched = 20
+        assert policy.try_reserve_hedge()
+        assert policy.try_reserve_hedge()
+        assert not policy.try_reserve_hedge()
+        assert policy.budget_denied == 1
+    
+    def test_fallback_prefers_fast_model_on_other_provider(self):
+        policy = HedgingPolicy()
+        models = MODELS + [{'model': 'gemini/flash', 'name': 'Flash', 'provider': 'gemini'}]
+        policy.record_latency('ChatGPT', 2.0)
+        policy.record_latency('Flash', 0.5)
+        assert policy.choose_fallback(MODELS[0], models)['name'] == 'ChatGPT'
+    
+    def test_rejects_unknown_mode(self):
+        with pytest.raises(ValueError):
+            HedgingPolicy(mode='triplicate')
+
+
+def make_manager(mode):
+    manager = LLMManager(MODELS, hedging={'enabled': True, 'mode': mode, 'min_samples': 3,
+                                          'max_extra_fraction': 1.0})
+    for _ in range(3):
+        manager.hedging.record_latency('Gemini', 0.02)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_duplicate_hedge_wins_and_primary_is_cancelled():
+    manager = make_manager('duplicate')
+    primary_cancelled = asyncio.Event()
+    
+    async def slow_primary(prompt_data, model_config):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            primary_cancelled.set()
+            raise
+    
+    async def fast_duplicate(prompt_data, model_config):
+        return essay_for(model_config)
+    
+    manager.generate_essay = slow_primary
+    manager._generate_essay_uncached = fast_duplicate
+    
+    result = await manager.dispatch({'prompt': 'p', 'metadata': {}}, MODELS[0])
+    await asyncio.sleep(0)
+    
+    assert result['model_name'] == 'Gemini'
+    assert primary_cancelled.is_set()
+    stats = manager.hedging.get_stats()
+    assert stats['hedges_fired'] == 1
+    assert stats['hedge_wins'] == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_hedge_reassigns_to_other_model():
+    manager = make_manager('fallback')
+    
+    async def generate(prompt_data, model_config):
+        if model_config['name'] == 'Gemini':
+            await asyncio.sleep(5)
+        return essay_for(model_config)
+    manager.generate_essay = generate
+    manager._generate_essay_uncached = generate
+    
+    result = await manager.dispatch({'prompt': 'p', 'metadata': {}}, MODELS[0])
+    assert result['model_name'] == 'ChatGPT'
+    assert manager.hedging.hedge_wins == 1
+    # The win is the fallback's latency; the slow primary's samples are untouched
+    assert len(manager.hedging.latencies['Gemini']) == 3
+    assert len(manager.hedging.latencies['ChatGPT']) == 1
+
+
+@pytest.mark.asyncio
+async def test_fallback_hedge_skips_models_already_writing_the_combination():
+    manager = make_manager('fallback')
+    prompt_data = {'prompt': 'p', 'metadata': {'combination_id': 'combo_0000'}}
+    # Without routing every model writes every combination
+    manager.plan_jobs([prompt_data])
+    called = []
+    
+    async def slow_primary(prompt_data, model_config):
+        await asyncio.sleep(5)
+    
+    async def hedge(prompt_data, model_config):
+        called.append(model_config['name'])
+        return essay_for(model_config)
+    manager.generate_essay = slow_primary
+    manager._generate_essay_uncached = hedge
+    
+    result = await manager.dispatch(prompt_data, MODELS[0])
+    assert result['model_name'] == 'Gemini'
+    assert called == ['Gemini']
+
+
+@pytest.mark.asyncio
+async def test_no_hedge_without_run_budget():
+    manager = make_manager('duplicate')
+    prompt_data = {'prompt': 'p', 'metadata': {}}
+    # Room for the job itself but not for a second worst-case call
+    tokens, _ = manager._worst_case_cost(prompt_data, MODELS[0])
+    manager.usage.max_tokens = int(tokens * 1.5)
+
+    async def slow(prompt_data, model_config):
+        await asyncio.sleep(0.1)
+        return essay_for(model_config)
+    manager.generate_essay = slow
+
+    result = await manager.dispatch(prompt_data, MODELS[0])
+    assert result['model_name'] == 'Gemini'
+    assert manager.hedging.hedges_fired == 0
+    assert manager.usage.reserved_tokens == 0
+
+
+@pytest.mark.asyncio
+async def test_fast_primary_is_not_hedged():
+    manager = make_manager('duplicate')
+    
+    async def generate(prompt_data, model_config):
+        return essay_for(model_config)
+    manager.generate_essay = generate
+    
+    result = await manager.dispatch({'prompt': 'p', 'metadata': {}}, MODELS[0])
+    assert result['model_name'] == 'Gemini'
+    assert manager.hedging.hedges_fired == 0
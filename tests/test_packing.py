@@ -0,0 +1,91 @@
+import json
+import pytest
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer
+from generation.llm_manager import LLMManager
+from generation.packing import build_packed_prompt, pack_prompts, parse_packed_essays, share_usage
+
+BASE = "Research context.\n\nThe essay should be approximately 750-1000 words."
+
+
+def prompt(i, base=BASE):
+    brief = f"Brief number {i}."
+    return {
+        'prompt': f"{base}\n\n{brief}", 'base_prompt': base, 'diversity_prompt': brief,
+        'prompt_metadata': {}, 'metadata': {'combination_id': f"combo_{i:04d}"}
+    }
+
+
+def test_packs_never_mix_seeds():
+    prompts = [prompt(0), prompt(1, "Other seed."), prompt(2), prompt(3)]
+    packs = pack_prompts(prompts, 2)
+    assert [[p['metadata']['combination_id'] for p in pack] for pack in packs] == [
+        ['combo_0000', 'combo_0002'], ['combo_0001'], ['combo_0003']
+    ]
+    assert pack_prompts(prompts, 1) == [[p] for p in prompts]
+
+
+def test_packed_prompt_lists_every_brief_once():
+    packed = build_packed_prompt([prompt(0), prompt(1)])
+    assert packed['prompt'].startswith(BASE)
+    assert "ESSAY 2:\nBrief number 1." in packed['prompt']
+    assert packed['prompt'].count(BASE) == 1
+
+
+def test_parse_accepts_fenced_json_and_skips_short_essays():
+    content = "```json\n" + json.dumps([
+        {'essay': 2, 'text': 'word ' * 50}, {'essay': 1, 'text': 'too short'}
+    ]) + "\n```"
+    essays = parse_packed_essays(content, 2, min_words=10)
+    assert list(essays) == [1]
+    assert parse_packed_essays("not json", 2) == {}
+
+
+def test_shared_usage_adds_up():
+    usage = {'prompt_tokens': 10, 'completion_tokens': 7, 'reasoning_tokens': 0, 'cached_tokens': 0,
+             'cost_usd': 0.3, 'attempts': 1, 'failed_attempts': 0, 'finish_reason': 'stop'}
+    shares = [share_usage(usage, 3, i) for i in range(3)]
+    assert sum(s['prompt_tokens'] for s in shares) == 10
+    assert sum(s['completion_tokens'] for s in shares) == 7
+    assert sum(s['cost_usd'] for s in shares) == pytest.approx(0.3)
+
+
+def fake_model(api_base, **extra):
+    return {'model': 'openai/fake-gpt', 'name': 'Fake GPT', 'provider': 'fake',
+            'api_base': api_base, 'api_key': 'fake-key', 'max_tokens': 1800, **extra}
+
+
+@pytest.mark.asyncio
+async def test_packed_batch_splits_into_essays():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, seed=5))
+    api_base = await server.start()
+    try:
+        model = fake_model(api_base, pack_size=3)
+        manager = LLMManager([model], packing={'enabled': True})
+        essays = await manager.generate_batch([prompt(i) for i in range(6)])
+    finally:
+        await server.stop()
+
+    assert len(essays) == 6
+    assert server.stats['requests'] == 2
+    assert sorted(e['metadata']['combination_id'] for e in essays) == [f"combo_{i:04d}" for i in range(6)]
+    assert len({e['prompt_hash'] for e in essays}) == 6
+    assert all(len(e['content'].split()) >= 300 for e in essays)
+    assert manager.packing.get_stats() == {'packed_requests': 2, 'packed_essays': 6, 'fallback_essays': 0}
+
+
+@pytest.mark.asyncio
+async def test_unparseable_pack_falls_back_to_single_requests():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, seed=5))
+    api_base = await server.start()
+    try:
+        # Too little output room for three essays: the array is cut off
+        model = fake_model(api_base, pack_size=3, max_tokens=600)
+        manager = LLMManager([model], packing={'enabled': True, 'min_words': 100})
+        essays = await manager.generate_batch([prompt(i) for i in range(3)])
+    finally:
+        await server.stop()
+
+    assert len(essays) == 3
+    assert server.stats['requests'] == 4
+    assert manager.packing.get_stats()['fallback_essays'] == 3
@@ -0,0 +1,88 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock
+
+from generation.generator import EssayGenerator
+from generation.pipeline import PipelineStats
+
+
+SEEDS = [{'id': 1, 'angle': 'test angle', 'facts': ['fact'], 'quotes': ['quote'], 'sources': []}]
+
+
+@pytest.fixture
+def generator():
+    models = [
+        {'model': 'openai/fast', 'name': 'Fast', 'provider': 'openai'},
+        {'model': 'gemini/slow', 'name': 'Slow', 'provider': 'gemini'}
+    ]
+    db_manager = MagicMock()
+    db_manager.save_prompt.return_value = MagicMock(id=1)
+    return EssayGenerator(models, db_manager)
+
+
+@pytest.mark.asyncio
+async def test_pipelined_generates_every_job(generator):
+    """Every (prompt, model) pair should produce an essay record."""
+    async def fake_generate(prompt_data, model_config):
+        await asyncio.sleep(0.01 if model_config['name'] == 'Fast' else 0.05)
+        return {
+            'content': 'Essay text',
+            'model_name': model_config['name'],
+            'temperature': 0.8,
+            'prompt_hash': 'hash',
+            'metadata': prompt_data['metadata']
+        }
+    generator.llm_manager.generate_essay = fake_generate
+    
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, 6)
+    essays = await generator.generate_essays(combinations, pipelined=True, num_workers=3)
+    
+    assert len(essays) == 12
+    stats = generator.pipeline_stats.to_dict()
+    assert stats['jobs_completed'] == 12
+    assert stats['peak_in_flight'] <= 3
+    assert stats['essays_per_minute'] > 0
+
+
+@pytest.mark.asyncio
+async def test_slow_job_does_not_block_other_workers(generator):
+    """A single slow call should not hold back jobs queued behind it."""
+    finished = []
+    
+    async def fake_generate(prompt_data, model_config):
+        combo_id = prompt_data['metadata']['combination_id']
+        if combo_id == 'combo_0000' and model_config['name'] == 'Slow':
+            await asyncio.sleep(0.3)
+        else:
+            await asyncio.sleep(0.01)
+        finished.append((combo_id, model_config['name']))
+        return None
+    generator.llm_manager.generate_essay = fake_generate
+    
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, 5)
+    essays = await generator.generate_essays(combinations, pipelined=True, num_workers=2)
+    
+    assert essays == []
+    # The slow job finishes last even though it was queued second
+    assert finished[-1] == ('combo_0000', 'Slow')
+    assert generator.pipeline_stats.failed == 10
+
+
+def test_pipeline_stats_average_in_flight():
+    """Average concurrency is weighted by time spent at each level."""
+    stats = PipelineStats(num_workers=4)
+    stats.start_run()
+    stats.job_started()
+    stats.job_started()
+    stats.job_finished(True)
+    stats.job_finished(False)
+    stats.essays_saved(3)
+    stats.end_run()
+    
+    summary = stats.to_dict()
+    assert summary['essays_delivered'] == 3
+    assert summary['essays_per_minute'] == pytest.approx(3 / stats.elapsed_seconds * 60)
+    assert summary['peak_in_flight'] == 2
+    assert summary['jobs_completed'] == 1
+    assert summary['jobs_failed'] == 1
+    assert 0 <= summary['average_in_flight'] <= 2
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import MagicMock
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer
+from generation.generator import EssayGenerator
+from generation.llm_manager import LLMManager
+from generation.usage import call_cost
+
+SEEDS = [
+    {'id': i, 'angle': f'angle {i}', 'facts': [f'fact {i}.{j}' for j in range(5)],
+     'quotes': [f'quote {i}.{j}' for j in range(3)], 'sources': []}
+    for i in (1, 2)
+]
+
+PROMPT_DATA = {
+    'prompt': 'Shared research context\n\nPer-essay stance',
+    'base_prompt': 'Shared research context',
+    'metadata': {}
+}
+
+
+def test_anthropic_prompt_gets_cache_breakpoint_after_base_prompt():
+    manager = LLMManager([], prompt_caching={'enabled': True})
+    messages = manager._build_messages(PROMPT_DATA, {'model': 'anthropic/claude-3-7-sonnet-latest'})
+    blocks = messages[1]['content']
+    assert blocks[0] == {'type': 'text', 'text': 'Shared research context', 'cache_control': {'type': 'ephemeral'}}
+    assert ''.join(block['text'] for block in blocks) == PROMPT_DATA['prompt']
+
+
+def test_automatic_prefix_caching_models_keep_plain_prompt():
+    manager = LLMManager([], prompt_caching={'enabled': True})
+    messages = manager._build_messages(PROMPT_DATA, {'model': 'openai/gpt-4o'})
+    assert messages[1]['content'] == PROMPT_DATA['prompt']
+    assert LLMManager([])._build_messages(PROMPT_DATA, {'model': 'anthropic/claude'})[1]['content'] == PROMPT_DATA['prompt']
+
+
+def test_cached_tokens_use_cached_price():
+    model = {'input_cost_per_mtok': 2.0, 'cached_input_cost_per_mtok': 0.5, 'output_cost_per_mtok': 10.0}
+    assert call_cost(model, 1_000_000, 0, cached_tokens=500_000) == pytest.approx(1.25)
+
+
+def test_dispatch_groups_follow_seed():
+    db_manager = MagicMock()
+    generator = EssayGenerator([], db_manager, prompt_caching={'group_dispatch': True})
+    combinations = [{'seed': SEEDS[i % 2], 'n': i} for i in range(6)]
+    groups = generator._dispatch_groups(combinations)
+    assert [[c['n'] for c in group] for group in groups] == [[0, 2, 4], [1, 3, 5]]
+
+
+@pytest.mark.asyncio
+async def test_grouped_dispatch_reports_cached_token_ratio():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0, prefix_cache_min_tokens=0))
+    api_base = await server.start()
+    try:
+        models = [{'model': f'openai/fake-{i}', 'name': f'Fake {i}', 'provider': 'fake',
+                   'api_base': api_base, 'api_key': 'fake-key', 'max_tokens': 3000} for i in range(2)]
+        db_manager = MagicMock()
+        db_manager.save_prompt.return_value = MagicMock(id=1)
+        generator = EssayGenerator(models, db_manager, prompt_caching={'enabled': True, 'group_dispatch': True})
+        combinations = generator.diversity_manager.generate_combinations(SEEDS, 6)
+        result = await generator.generate_with_diversity_report(combinations, pipelined=True, num_workers=1)
+    finally:
+        await server.stop()
+
+    usage = result['generation_stats']['usage']
+    assert usage['totals']['cached_tokens'] > 0
+    assert 0 < usage['totals']['cached_token_ratio'] < 1
+    assert all(e['cached_tokens'] is not None for e in result['essays'])
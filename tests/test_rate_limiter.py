@@ -0,0 +1,80 @@
+import asyncio
+import time
+import pytest
+
+from generation.rate_limiter import TokenBucket, ProviderRateLimiter, build_rate_limiters
+from generation.token_calculator import estimate_request_tokens
+
+
+class TestTokenBucket:
+    def test_starts_full(self):
+        bucket = TokenBucket(60)
+        assert bucket.time_until_available(60) == 0
+    
+    def test_wait_time_after_consume(self):
+        bucket = TokenBucket(60)  # 1 unit per second
+        bucket.consume(60)
+        wait = bucket.time_until_available(2)
+        assert 1.9 < wait <= 2.0
+    
+    def test_oversized_request_is_clamped_to_capacity(self):
+        bucket = TokenBucket(60)
+        assert bucket.time_until_available(1000) == 0
+
+
+class TestProviderRateLimiter:
+    @pytest.mark.asyncio
+    async def test_waiters_released_in_fifo_order(self):
+        """Queued callers should be granted capacity in arrival order."""
+        limiter = ProviderRateLimiter(requests_per_minute=600)
+        limiter.request_bucket = TokenBucket(600, capacity=1)  # 10 req/s, no burst
+        
+        order = []
+        
+        async def call(i):
+            await limiter.acquire()
+            order.append(i)
+        
+        await asyncio.gather(*(call(i) for i in range(5)))
+        assert order == [0, 1, 2, 3, 4]
+    
+    @pytest.mark.asyncio
+    async def test_requests_are_paced(self):
+        """Without burst capacity, requests are spaced by the refill rate."""
+        limiter = ProviderRateLimiter(requests_per_minute=1200)
+        limiter.request_bucket = TokenBucket(1200, capacity=1)  # one every 50ms
+        
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.acquire() for _ in range(4)))
+        elapsed = time.monotonic() - start
+        
+        assert elapsed >= 0.14
+    
+    @pytest.mark.asyncio
+    async def test_token_budget_blocks_until_refilled(self):
+        limiter = ProviderRateLimiter(tokens_per_minute=6000)  # 100 tokens/s
+        await limiter.acquire(6000)
+        
+        start = time.monotonic()
+        await limiter.acquire(10)
+        assert time.monotonic() - start >= 0.09
+    
+    def test_status_reports_configured_limits(self):
+        limiter = ProviderRateLimiter(requests_per_minute=50, tokens_per_minute=40000)
+        status = limiter.get_status()
+        assert status['requests_per_minute'] == 50
+        assert status['tokens_per_minute'] == 40000
+        assert status['waiting'] == 0
+
+
+def test_build_rate_limiters_skips_empty_entries():
+    limiters = build_rate_limiters({
+        'openai': {'requests_per_minute': 500, 'tokens_per_minute': 30000},
+        'gemini': {}
+    })
+    assert set(limiters) == {'openai'}
+
+
+def test_estimate_request_tokens_includes_max_tokens():
+    token_config = {'max_tokens': 1500, 'provider': 'openai'}
+    assert estimate_request_tokens("one two three four five six seven eight nine ten", token_config) == 1513
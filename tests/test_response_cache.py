@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.llm_manager import LLMManager
+from generation.response_cache import ResponseCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.db")
+
+
+class TestResponseCache:
+    def test_key_depends_on_every_field(self):
+        base = ResponseCache.make_key("hash", "openai/gpt-4o", 0.8, 1500)
+        assert base == ResponseCache.make_key("hash", "openai/gpt-4o", 0.8, 1500)
+        assert base != ResponseCache.make_key("other", "openai/gpt-4o", 0.8, 1500)
+        assert base != ResponseCache.make_key("hash", "anthropic/claude", 0.8, 1500)
+        assert base != ResponseCache.make_key("hash", "openai/gpt-4o", 1.0, 1500)
+        assert base != ResponseCache.make_key("hash", "openai/gpt-4o", 0.8, 3000)
+    
+    def test_round_trip_persists_across_instances(self, cache_path):
+        cache = ResponseCache(cache_path)
+        cache.put("k1", {'content': 'Essay one'})
+        cache.close()
+        
+        reopened = ResponseCache(cache_path)
+        assert reopened.get("k1") == {'content': 'Essay one'}
+        assert reopened.entry_count == 1
+    
+    def test_lru_eviction(self, cache_path):
+        cache = ResponseCache(cache_path, max_entries=2)
+        cache.put("a", {'content': 'A'})
+        cache.put("b", {'content': 'B'})
+        cache.get("a")  # "b" is now least recently used
+        cache.put("c", {'content': 'C'})
+        
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+        assert cache.evictions == 1
+    
+    def test_replay_mode_is_read_only(self, cache_path):
+        ResponseCache(cache_path).put("a", {'content': 'A'})
+        replay = ResponseCache(cache_path, mode='replay')
+        replay.put("b", {'content': 'B'})
+        
+        assert replay.get("a") == {'content': 'A'}
+        assert replay.get("b") is None
+    
+    def test_rejects_unknown_mode(self, cache_path):
+        with pytest.raises(ValueError):
+            ResponseCache(cache_path, mode='write_only')
+
+
+def mock_response(content):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+class TestLLMManagerCaching:
+    @pytest.fixture(autouse=True)
+    def setup(self, cache_path):
+        self.model = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'temperature': 0.8}
+        self.cache_config = {'enabled': True, 'path': cache_path}
+        self.prompt_data = {'prompt': 'Write an essay', 'metadata': {'combination_id': 'combo_0000'}}
+    
+    @pytest.mark.asyncio
+    @patch('generation.llm_manager.acompletion')
+    async def test_second_run_costs_no_api_calls(self, mock_acompletion):
+        mock_acompletion.return_value = mock_response("Cached essay")
+        
+        first = LLMManager([self.model], response_cache=self.cache_config)
+        result = await first.generate_essay(self.prompt_data, self.model)
+        assert result['cached'] is False
+        
+        second = LLMManager([self.model], response_cache={**self.cache_config, 'mode': 'replay'})
+        replayed = await second.generate_essay(self.prompt_data, self.model)
+        
+        assert mock_acompletion.call_count == 1
+        assert replayed['content'] == "Cached essay"
+        assert replayed['cached'] is True
+        assert replayed['prompt_hash'] == result['prompt_hash']
+    
+    @pytest.mark.asyncio
+    @patch('generation.llm_manager.acompletion')
+    async def test_replay_miss_skips_api_call(self, mock_acompletion):
+        manager = LLMManager([self.model], response_cache={**self.cache_config, 'mode': 'replay'})
+        assert await manager.generate_essay(self.prompt_data, self.model) is None
+        assert mock_acompletion.call_count == 0
+    
+    @pytest.mark.asyncio
+    @patch('generation.llm_manager.acompletion')
+    async def test_identical_in_flight_requests_share_one_call(self, mock_acompletion):
+        async def slow_completion(**kwargs):
+            await asyncio.sleep(0.05)
+            return mock_response("Shared essay")
+        mock_acompletion.side_effect = slow_completion
+        
+        manager = LLMManager([self.model], response_cache=self.cache_config)
+        results = await asyncio.gather(*(manager.generate_essay(self.prompt_data, self.model) for _ in range(3)))
+        
+        assert mock_acompletion.call_count == 1
+        assert all(r['content'] == "Shared essay" for r in results)
+    
+    @pytest.mark.asyncio
+    @patch('generation.llm_manager.acompletion')
+    async def test_follower_sends_its_own_request_when_the_leader_is_cancelled(self, mock_acompletion):
+        async def slow_completion(**kwargs):
+            await asyncio.sleep(0.05)
+            return mock_response("Follower essay")
+        mock_acompletion.side_effect = slow_completion
+        
+        manager = LLMManager([self.model], response_cache=self.cache_config)
+        leader = asyncio.create_task(manager.generate_essay(self.prompt_data, self.model))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(manager.generate_essay(self.prompt_data, self.model))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        
+        result = await follower
+        assert result['content'] == "Follower essay"
+        assert mock_acompletion.call_count == 2
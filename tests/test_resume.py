@@ -0,0 +1,119 @@
+import pytest
+
+from database.manager import DatabaseManager
+from generation.generator import EssayGenerator
+
+SEEDS = [{'id': 1, 'angle': 'test angle', 'facts': ['fact'], 'quotes': ['quote'], 'sources': []}]
+MODELS = [
+    {'model': 'openai/a', 'name': 'Model A', 'provider': 'openai'},
+    {'model': 'gemini/b', 'name': 'Model B', 'provider': 'gemini'}
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    return DatabaseManager(str(tmp_path / 'essays.db'))
+
+
+def make_combinations(generator, n):
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, n)
+    stance = next(s for s in generator.diversity_manager.stance_manager.get_all_stances()
+                  if isinstance(s['position'], (int, float)))
+    for combo in combinations:
+        combo['stance'] = stance
+    return combinations
+
+
+def fake_llm(calls, fail=lambda prompt_data, model_config: False):
+    async def generate(prompt_data, model_config):
+        calls.append((prompt_data['metadata']['combination_id'], model_config['name']))
+        if fail(prompt_data, model_config):
+            return None
+        return {
+            'content': 'Essay text',
+            'model_name': model_config['name'],
+            'temperature': 0.8,
+            'prompt_hash': 'hash',
+            'metadata': prompt_data['metadata']
+        }
+    return generate
+
+
+def test_run_plan_round_trip(db):
+    generator = EssayGenerator(MODELS, db)
+    combinations = make_combinations(generator, 3)
+    db.save_run_plan('run-1', combinations)
+    plan = db.get_run_plan('run-1')
+    assert [c['combination_id'] for c in plan] == ['combo_0000', 'combo_0001', 'combo_0002']
+    # Datetimes are stored as strings, everything else survives
+    assert isinstance(plan[0]['persona']['created_at'], str)
+    assert plan[0]['seed'] == SEEDS[0]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('pipelined', [False, True])
+async def test_resume_only_dispatches_missing_jobs(db, pipelined):
+    generator = EssayGenerator(MODELS, db)
+    combinations = make_combinations(generator, 4)
+    db.save_run_plan('run-1', combinations)
+
+    # First session: Model B fails on half the combinations
+    calls = []
+    generator.llm_manager.generate_essay = fake_llm(
+        calls, fail=lambda p, m: m['name'] == 'Model B' and p['metadata']['combination_id'] in ('combo_0001', 'combo_0003')
+    )
+    await generator.generate_essays(combinations, pipelined=pipelined, num_workers=2, run_id='run-1')
+    assert len(calls) == 8
+
+    # Essays were saved as they arrived
+    completed = db.get_completed_jobs('run-1')
+    assert len(completed) == 6
+
+    # Second session picks up from the database
+    resumed_calls = []
+    generator.llm_manager.generate_essay = fake_llm(resumed_calls)
+    essays = await generator.generate_essays(db.get_run_plan('run-1'), pipelined=pipelined, num_workers=2,
+                                             run_id='run-1', completed_jobs=completed)
+
+    assert sorted(resumed_calls) == [('combo_0001', 'Model B'), ('combo_0003', 'Model B')]
+    assert len(essays) == 2
+    assert len(db.get_completed_jobs('run-1')) == 8
+    saved = db.get_run_essays('run-1')
+    assert len(saved) == 8
+    assert saved[0]['metadata']['combination_id'] == saved[0]['combination_id']
+
+
+def test_generation_run_is_updated_in_place(db):
+    db.save_generation_run('run-1', 'topic', 0, 0.0, config={'num_requested': 4}, status='running')
+    db.save_generation_run('run-1', 'topic', 4, 12.5, config={'num_requested': 4},
+                           usage={'totals': {'prompt_tokens': 10, 'cost_usd': 0.5}})
+    run = db.get_generation_run('run-1')
+    assert run.status == 'completed'
+    assert run.total_essays == 4
+    assert run.total_prompt_tokens == 10
+
+
+@pytest.mark.asyncio
+async def test_rerouted_essay_counts_as_done_on_resume(db):
+    routing = {'enabled': True, 'target_mix': {'Model A': 1}}
+    generator = EssayGenerator(MODELS, db, routing=routing, circuit_breaker={'enabled': True, 'min_calls': 2})
+    manager = generator.llm_manager
+    combinations = make_combinations(generator, 1)
+    prompt_data = generator.diversity_manager.create_composite_prompt(combinations[0])
+    [(model_config, _)] = manager.plan_jobs([prompt_data])
+    assert model_config['name'] == 'Model A'
+
+    # Model A's provider goes down after planning, so the job is rerouted to Model B
+    breaker = manager.circuit_breakers['openai']
+    for _ in range(breaker.min_calls):
+        breaker.record_failure()
+    calls = []
+    manager.generate_essay = fake_llm(calls)
+    essay = await manager.dispatch(prompt_data, model_config)
+    assert essay['model_name'] == 'Model B'
+
+    # The substitute fills the combination's only slot, so resume has nothing left to send
+    resumed = EssayGenerator(MODELS, db, routing=routing)
+    completed = {(combinations[0]['combination_id'], essay['model_name'])}
+    assert resumed.llm_manager.plan_jobs([prompt_data], skip=completed) == []
+    assert resumed.llm_manager.pending_job_count(combinations, completed) == 0
@@ -0,0 +1,104 @@
+import litellm
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.llm_manager import LLMManager
+from generation.retry import (
+    FATAL_JOB, FATAL_MODEL, RATE_LIMIT, RETRYABLE, RetryPolicy, classify_error
+)
+
+MODEL = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'max_tokens': 1000}
+
+PROMPT_DATA = {'prompt': 'Write an essay about testing', 'metadata': {}}
+
+
+def mock_response(content="Essay text"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+def auth_error():
+    return litellm.AuthenticationError(message="invalid api key", llm_provider='openai', model='gpt-4o')
+
+
+def test_classify_error():
+    assert classify_error(auth_error()) == FATAL_MODEL
+    assert classify_error(litellm.BadRequestError(
+        message="context length exceeded", model='gpt-4o', llm_provider='openai')) == FATAL_JOB
+    assert classify_error(litellm.RateLimitError(
+        message="slow down", llm_provider='openai', model='gpt-4o')) == RATE_LIMIT
+    assert classify_error(ConnectionError("reset")) == RETRYABLE
+    assert classify_error(litellm.Timeout(message="timed out", model='gpt-4o', llm_provider='openai')) == RETRYABLE
+
+
+def test_delays_are_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=5.0)
+    delays = [policy.delay(10) for _ in range(50)]
+    assert all(0 <= d <= 5.0 for d in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_auth_error_aborts_model_without_retrying(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL])
+    mock_acompletion.side_effect = auth_error()
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    # Queued jobs for the aborted model never reach the API
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert mock_acompletion.call_count == 1
+
+    stats = manager.get_retry_stats()
+    assert stats['retries'] == 0
+    assert 'ChatGPT 4o' in stats['aborted_models']
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_bad_request_drops_only_the_job(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL])
+    mock_acompletion.side_effect = [
+        litellm.BadRequestError(message="prompt too long", model='gpt-4o', llm_provider='openai'),
+        mock_response()
+    ]
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is not None
+    assert manager.get_retry_stats()['fatal_job_errors'] == 1
+    assert not manager.aborted_models
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_empty_content_is_retried(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL])
+    mock_acompletion.side_effect = [mock_response(None), mock_response()]
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+
+    assert result['content'] == "Essay text"
+    assert result['usage']['attempts'] == 2
+    assert manager.get_retry_stats()['empty_responses'] == 1
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_retry_budget_caps_retries(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL], retry={'min_budget': 2, 'budget_ratio': 0.0})
+    mock_acompletion.side_effect = ConnectionError("reset")
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+
+    stats = manager.get_retry_stats()
+    assert stats['retries'] == 2
+    assert stats['budget_denied'] == 2
+    # Two first attempts, two budgeted retries
+    assert mock_acompletion.call_count == 4
@@ -0,0 +1,30 @@
+from generation.llm_manager import LLMManager
+from generation.runtime import ProviderRuntime, get_runtime
+
+MODELS = [
+    {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai'},
+    {'model': 'gemini/gemini-2.5-pro', 'name': 'Gemini 2.5', 'provider': 'gemini'}
+]
+
+
+def test_managers_share_the_process_runtime():
+    first = LLMManager(MODELS, rate_limits={'openai': {'rpm': 60}})
+    second = LLMManager(MODELS)
+
+    assert first.runtime is second.runtime is get_runtime()
+    first._update_provider_backoff('openai')
+    assert second._get_provider_backoff_time('openai') > 0
+    assert second.rate_limiters is first.rate_limiters
+
+
+def test_later_models_get_breakers_on_the_shared_runtime():
+    LLMManager(MODELS[:1], circuit_breaker={'enabled': True})
+    manager = LLMManager(MODELS)
+    assert set(manager.circuit_breakers) == {'openai', 'gemini'}
+
+
+def test_explicit_runtime_is_isolated():
+    shared = LLMManager(MODELS)
+    isolated = LLMManager(MODELS, runtime=ProviderRuntime(MODELS))
+    shared._update_provider_backoff('openai')
+    assert isolated.provider_backoff == {}
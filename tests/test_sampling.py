@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from database.manager import DatabaseManager
+from database.schema import Essay
+from generation.generator import EssayGenerator
+from generation.sampling import SamplingPolicy, build_sampling_policy, split_sampled_result
+
+MODEL = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'max_tokens': 1000,
+         'input_cost_per_mtok': 2.5, 'output_cost_per_mtok': 10.0}
+CLAUDE = {'model': 'anthropic/claude-3-7-sonnet-latest', 'name': 'Claude', 'provider': 'anthropic'}
+
+SEEDS = [{'id': 1, 'angle': 'test angle', 'facts': ['fact'], 'quotes': ['quote'], 'sources': []}]
+
+
+def mock_response(n, finish_reasons=None):
+    response = MagicMock()
+    response.choices = []
+    for i in range(n):
+        choice = MagicMock()
+        choice.message.content = f"Draft {i} " + "word " * 50
+        choice.finish_reason = (finish_reasons or ['stop'] * n)[i]
+        response.choices.append(choice)
+    response.usage.prompt_tokens = 100
+    response.usage.completion_tokens = 90 * n
+    response.usage.completion_tokens_details = None
+    response.usage.prompt_tokens_details = None
+    return response
+
+
+def test_plan_per_temperature_and_provider():
+    policy = SamplingPolicy(samples=3, temperatures=[0.7, 1.0])
+    plan = policy.plan(MODEL)
+    assert [(config['temperature'], config['sample_count'], n) for config, n in plan] == [(0.7, 3, 3), (1.0, 3, 3)]
+    # Anthropic does not accept n: one draft per temperature
+    assert [n for _, n in policy.plan(CLAUDE)] == [1, 1]
+    assert policy.essays_per_job({**MODEL, 'samples': 2}) == 4
+    assert build_sampling_policy({'samples': 2}) is None
+
+
+def test_split_shares_usage_across_drafts():
+    result = {'content': 'a', 'usage': {'prompt_tokens': 100, 'completion_tokens': 301, 'cost_usd': 0.03,
+                                        'finish_reason': 'stop'},
+              'samples': [{'content': 'a', 'finish_reason': 'stop'}, {'content': 'b c', 'finish_reason': 'length'},
+                          {'content': 'd', 'finish_reason': None}]}
+    essays = split_sampled_result(result)
+    assert [e['content'] for e in essays] == ['a', 'b c', 'd']
+    assert [e['usage']['finish_reason'] for e in essays] == ['stop', 'length', 'stop']
+    assert sum(e['usage']['completion_tokens'] for e in essays) == 301
+    assert essays[1]['word_count'] == 2
+    assert 'samples' not in essays[0]
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_drafts_become_essays_sharing_one_prompt(mock_acompletion, tmp_path):
+    db = DatabaseManager(str(tmp_path / 'essays.db'))
+    generator = EssayGenerator([MODEL], db, sampling={'enabled': True, 'samples': 3, 'temperatures': [0.7, 1.0]},
+                               streaming={'enabled': True})
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, 1)
+    stance = next(s for s in generator.diversity_manager.stance_manager.get_all_stances()
+                  if isinstance(s['position'], (int, float)))
+    combinations[0]['stance'] = stance
+    mock_acompletion.side_effect = lambda **kwargs: mock_response(kwargs['n'])
+
+    result = await generator.generate_with_diversity_report(combinations, run_id='run-1')
+
+    calls = mock_acompletion.call_args_list
+    assert sorted(c.kwargs['temperature'] for c in calls) == [0.7, 1.0]
+    assert all(c.kwargs['n'] == 3 and 'stream' not in c.kwargs for c in calls)
+    assert result['generation_stats']['total_requested'] == 6
+    assert result['generation_stats']['sampling']['sampled_requests'] == 2
+
+    with db.get_session() as session:
+        essays = session.query(Essay).order_by(Essay.sample_index).all()
+        assert [e.sample_index for e in essays] == list(range(6))
+        assert len({e.prompt_id for e in essays}) == 1
+        assert sorted(e.temperature for e in essays) == [0.7] * 3 + [1.0] * 3
+        # The request's prompt tokens are charged once, split over its drafts
+        assert sum(e.prompt_tokens for e in essays) == 200
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_pipeline_counts_every_draft_as_an_essay(mock_acompletion, tmp_path):
+    db = DatabaseManager(str(tmp_path / 'essays.db'))
+    generator = EssayGenerator([MODEL], db, sampling={'enabled': True, 'samples': 3, 'temperatures': [0.7, 1.0]})
+    combinations = generator.diversity_manager.generate_combinations(SEEDS, 1)
+    mock_acompletion.side_effect = lambda **kwargs: mock_response(kwargs['n'])
+
+    essays = await generator.generate_essays(combinations, pipelined=True, num_workers=2)
+
+    stats = generator.pipeline_stats.to_dict()
+    assert len(essays) == 6
+    assert stats['jobs_completed'] == 1
+    assert stats['essays_delivered'] == 6
@@ -0,0 +1,93 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.llm_manager import LLMManager
+
+MODELS = [
+    {'model': 'openai/gpt-4o', 'name': 'GPT', 'provider': 'openai', 'max_tokens': 1000,
+     'input_cost_per_mtok': 2.5, 'output_cost_per_mtok': 10.0},
+    {'model': 'gemini/gemini-2.5-pro', 'name': 'Gemini', 'provider': 'gemini', 'max_tokens': 1000,
+     'input_cost_per_mtok': 1.25, 'output_cost_per_mtok': 10.0}
+]
+
+
+def prompts(n):
+    return [{'prompt': f"Essay {i}", 'metadata': {'combination_id': f"combo_{i:04d}"}} for i in range(n)]
+
+
+def mock_response(content="Essay text"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+def test_without_routing_every_model_gets_every_prompt():
+    manager = LLMManager(MODELS)
+    plan = manager.plan_jobs(prompts(3))
+    assert [(m['name'], len(p)) for m, p in plan] == [('GPT', 3), ('Gemini', 3)]
+    assert manager.essays_per_combination() == 2
+
+
+def test_routing_follows_target_mix():
+    manager = LLMManager(MODELS, routing={'enabled': True, 'target_mix': {'GPT': 3, 'Gemini': 1},
+                                          'throughput_weight': 0, 'cost_weight': 0})
+    plan = dict((m['name'], len(p)) for m, p in manager.plan_jobs(prompts(40)))
+    assert plan == {'GPT': 30, 'Gemini': 10}
+    assert manager.pending_job_count(prompts(40)) == 40
+
+
+def test_routing_prefers_faster_model():
+    manager = LLMManager(MODELS, routing={'enabled': True, 'mix_weight': 0, 'cost_weight': 0})
+    scheduler = manager.scheduler
+    scheduler.record('GPT', 1, 0, 10.0)
+    scheduler.record('Gemini', 1, 0, 2.0)
+    assert [m['name'] for m in scheduler.assign(prompts(1)[0], MODELS)] == ['Gemini']
+
+
+def test_routing_skips_done_models_and_aborted_models():
+    manager = LLMManager(MODELS, routing={'enabled': True, 'models_per_combination': 2})
+    manager.aborted_models['Gemini'] = 'AuthenticationError'
+    plan = manager.plan_jobs(prompts(2), skip={('combo_0000', 'GPT')})
+    assert [(m['name'], [p['metadata']['combination_id'] for p in pending]) for m, pending in plan] == [
+        ('GPT', ['combo_0001'])
+    ]
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_failed_job_is_reassigned_to_another_model(mock_acompletion, mock_sleep):
+    manager = LLMManager(MODELS, routing={'enabled': True, 'target_mix': {'GPT': 1}},
+                         retry={'max_attempts': 1})
+
+    async def respond(**kwargs):
+        if kwargs['model'].startswith('openai/'):
+            raise ConnectionError("reset")
+        return mock_response()
+    mock_acompletion.side_effect = respond
+
+    essays = await manager.generate_batch(prompts(1))
+
+    assert [e['model_name'] for e in essays] == ['Gemini']
+    stats = manager.scheduler.get_stats()
+    assert stats['reassigned'] == 1
+    assert stats['models']['GPT']['failed'] == 1
+
+
+@pytest.mark.asyncio
+async def test_essay_written_by_a_substitute_is_credited_to_it():
+    manager = LLMManager(MODELS, routing={'enabled': True, 'target_mix': {'GPT': 1}})
+    [(model_config, pending)] = manager.plan_jobs(prompts(1))
+
+    async def hedged_by_gemini(prompt_data, model_config):
+        return {'content': 'Essay text', 'model_name': 'Gemini', 'metadata': prompt_data['metadata']}
+    manager.dispatch = hedged_by_gemini
+
+    await manager.generate_assigned(pending, model_config)
+
+    stats = manager.scheduler.get_stats()['models']
+    assert (stats['GPT']['delivered'], stats['GPT']['failed']) == (0, 0)
+    assert stats['Gemini']['delivered'] == 1
+    assert manager.scheduler.pending['GPT'] == 0
+    assert 'Gemini' not in manager.scheduler.seconds_per_essay
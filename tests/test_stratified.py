@@ -0,0 +1,84 @@
+import pytest
+from unittest.mock import MagicMock
+
+from generation.generator import EssayGenerator
+from generation.stratified import StratifiedDispatch, combination_strata, distribution_error
+
+
+def combination(i, stance, grade, seed):
+    return {
+        'combination_id': f"combo_{i:04d}",
+        'stance': {'name': stance},
+        'quality': {'grade': grade},
+        'seed': {'id': seed, 'angle': f"angle {seed}"}
+    }
+
+
+def sorted_plan():
+    """Combinations in the worst order for a partial run: grouped by stance, then grade."""
+    plan = []
+    for stance in ('for', 'against', 'neutral'):
+        for grade in ('A', 'B'):
+            for seed in (1, 2):
+                plan.append(combination(len(plan), stance, grade, seed))
+    return plan * 2
+
+
+def test_distribution_error():
+    assert distribution_error({'a': 2, 'b': 2}, {'a': 0.5, 'b': 0.5}) == 0.0
+    assert distribution_error({'a': 4}, {'a': 0.5, 'b': 0.5}) == pytest.approx(0.5)
+    assert distribution_error({}, {'a': 1.0}) == 0.0
+
+
+def test_plan_keeps_every_prefix_close_to_target():
+    dispatch = StratifiedDispatch()
+    plan = sorted_plan()
+    ordered = dispatch.plan(plan, {'GPT': 1.0})
+
+    assert sorted(c['combination_id'] for c in ordered) == sorted(c['combination_id'] for c in plan)
+    # The first six cover every stance twice and both grades and seeds three times
+    first = [combination_strata(c) for c in ordered[:6]]
+    assert sorted(s[0] for s in first) == ['against', 'against', 'for', 'for', 'neutral', 'neutral']
+    assert sorted(s[1] for s in first) == ['A', 'A', 'A', 'B', 'B', 'B']
+    assert sorted(s[2] for s in first) == ['1', '1', '1', '2', '2', '2']
+
+
+def test_record_reports_running_error():
+    dispatch = StratifiedDispatch(report_every=2)
+    plan = dispatch.plan(sorted_plan(), {'GPT': 0.5, 'Gemini': 0.5})
+    for combo in plan[:4]:
+        dispatch.record({'metadata': combo, 'model_name': 'GPT'})
+
+    stats = dispatch.get_stats()
+    assert stats['delivered'] == 4
+    assert stats['errors']['model'] == pytest.approx(0.5)
+    assert stats['max_error'] == pytest.approx(0.5)
+    assert [delivered for delivered, _ in stats['history']] == [2, 4]
+
+
+def test_generator_dispatches_in_stratified_order():
+    models = [{'model': 'openai/gpt-4o', 'name': 'GPT', 'provider': 'openai'}]
+    generator = EssayGenerator(models, MagicMock(), stratification={'enabled': True})
+    groups = generator._dispatch_groups(sorted_plan())
+
+    stances = [combination_strata(group[0])[0] for group in groups[:3]]
+    assert sorted(stances) == ['against', 'for', 'neutral']
+    assert generator.stratification.targets['model'] == {'GPT': 1.0}
+
+
+def test_seed_grouping_stays_within_stratified_windows():
+    models = [{'model': 'openai/gpt-4o', 'name': 'GPT', 'provider': 'openai'}]
+    plan = [combination(i, ('for', 'against')[i % 2], 'A', i // 8) for i in range(48)]
+    generator = EssayGenerator(models, MagicMock(), stratification={'enabled': True, 'group_window': 12},
+                               prompt_caching={'enabled': True, 'group_dispatch': True})
+    groups = generator._dispatch_groups(plan)
+
+    assert sorted(c['combination_id'] for g in groups for c in g) == sorted(c['combination_id'] for c in plan)
+    # Each group holds one seed, and the first window already reaches every seed
+    assert all(len({c['seed']['id'] for c in group}) == 1 for group in groups)
+    first_window = []
+    for group in groups:
+        if len(first_window) >= 12:
+            break
+        first_window.extend(group)
+    assert {c['seed']['id'] for c in first_window} == set(range(6))
@@ -0,0 +1,61 @@
+import pytest
+
+from benchmark.fake_provider import FakeProviderConfig, FakeProviderServer
+from generation.llm_manager import LLMManager
+from generation.streaming import LengthGovernor, StreamStats
+
+
+def paragraph(words):
+    return ' '.join(['word'] * (words - 1)) + ' end.'
+
+
+class TestLengthGovernor:
+    def test_exceeded_uses_margin(self):
+        governor = LengthGovernor(target_words=100, length_margin=0.2)
+        assert not governor.exceeded(paragraph(120))
+        assert governor.exceeded(paragraph(121))
+    
+    def test_trim_keeps_whole_paragraphs(self):
+        governor = LengthGovernor(target_words=100, length_margin=0.2)
+        text = '\n\n'.join([paragraph(50), paragraph(50), paragraph(50)])
+        trimmed = governor.trim(text)
+        assert trimmed == '\n\n'.join([paragraph(50), paragraph(50)])
+    
+    def test_trim_single_paragraph_at_sentence(self):
+        governor = LengthGovernor(target_words=10, length_margin=0.0)
+        text = "One two three four five six. Seven eight nine ten eleven twelve thirteen."
+        assert governor.trim(text) == "One two three four five six."
+
+
+def test_stream_stats_summary():
+    stats = StreamStats()
+    stats.record(0.5, 1000, 2.0)
+    stats.record_governed(120)
+    summary = stats.to_dict()
+    assert summary['ttft_p50'] == 0.5
+    assert summary['tokens_per_second_p50'] == 500.0
+    assert summary['governed'] == 1
+    assert summary['words_trimmed'] == 120
+
+
+@pytest.mark.asyncio
+async def test_streamed_essay_is_governed_and_measured():
+    server = FakeProviderServer(FakeProviderConfig(time_scale=0))
+    api_base = await server.start()
+    model = {'model': 'openai/fake-essay-model', 'name': 'Fake', 'provider': 'fake',
+             'api_base': api_base, 'api_key': 'fake-key', 'stream': True}
+    try:
+        manager = LLMManager([model], streaming={'target_words': 400, 'length_margin': 0.1})
+        result = await manager.generate_essay(
+            {'prompt': 'Write approximately 750-1000 words.', 'metadata': {}}, model
+        )
+    finally:
+        await server.stop()
+    
+    assert result is not None
+    assert result['word_count'] <= 440
+    assert result['content'].endswith('.')
+    metrics = manager.get_stream_metrics()['Fake']
+    assert metrics['streams'] == 1
+    assert metrics['ttft_p50'] is not None
+    assert metrics['governed'] == 1
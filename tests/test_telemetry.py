@@ -0,0 +1,125 @@
+import pytest
+from datetime import datetime, timedelta
+
+from database.manager import DatabaseManager
+from generation.runtime import ProviderRuntime
+from generation.telemetry import LearnedLimits, ProviderTelemetry, build_learned_limits, merge_limits
+
+
+def record(hours_ago, rate_limited=True, rpm=100.0, tpm=50000.0, concurrency=None):
+    return {
+        'requests_per_minute': rpm,
+        'tokens_per_minute': tpm,
+        'rate_limited': rate_limited,
+        'latency_p50': 2.0,
+        'latency_p95': 5.0,
+        'concurrency': concurrency or {},
+        'updated_at': NOW - timedelta(hours=hours_ago)
+    }
+
+
+NOW = datetime(2025, 1, 1, 12, 0)
+
+
+def test_telemetry_learns_rate_reached_before_rate_limit(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('generation.telemetry.time.monotonic', lambda: clock[0])
+    telemetry = ProviderTelemetry()
+    # One call every 5 seconds: 7 calls over the first 30 seconds
+    for latency in range(1, 8):
+        telemetry.record_success('openai', float(latency), 1000)
+        clock[0] += 5
+    telemetry.record_rate_limit('openai')
+    telemetry.record_success('gemini', 4.0, 500)
+
+    snapshot = telemetry.snapshot({'openai': {'GPT': 6}})
+    # Highest rate before the limit, scaled by the span the window covered (5 calls in 20s), not a full minute
+    assert snapshot['openai']['requests_per_minute'] == 15
+    assert snapshot['openai']['tokens_per_minute'] == 15000
+    assert snapshot['openai']['rate_limited']
+    assert snapshot['openai']['latency_p50'] == 4.0
+    assert snapshot['openai']['concurrency'] == {'GPT': 6}
+    assert not snapshot['gemini']['rate_limited']
+    assert snapshot['gemini']['requests_per_minute'] == 0
+
+
+def test_burst_rate_limit_is_not_learned(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('generation.telemetry.time.monotonic', lambda: clock[0])
+    telemetry = ProviderTelemetry()
+    for _ in range(10):
+        telemetry.record_success('openai', 1.0, 1000)
+    clock[0] += 1
+    telemetry.record_rate_limit('openai')
+    assert not telemetry.snapshot({})['openai']['rate_limited']
+
+
+def test_reported_header_limits_take_precedence():
+    runtime = ProviderRuntime(header_pacing={'enabled': True})
+    runtime.header_pacer.update('openai', {'x-ratelimit-limit-requests': '500', 'x-ratelimit-remaining-requests': '499',
+                                           'x-ratelimit-limit-tokens': '30000', 'x-ratelimit-remaining-tokens': '29000'})
+    runtime.header_pacer.update('openai/org-a', {'x-ratelimit-limit-requests': '50',
+                                                 'x-ratelimit-remaining-requests': '49'})
+    runtime.telemetry.limited['openai'] = {'requests_per_minute': 10.0, 'tokens_per_minute': 1000.0}
+
+    limits = LearnedLimits().snapshot(runtime, {})
+    assert limits['openai']['requests_per_minute'] == 500
+    assert limits['openai']['tokens_per_minute'] == 30000
+    assert limits['openai']['rate_limited']
+    assert 'openai/org-a' not in limits
+
+
+def test_merge_keeps_ceiling_not_reached_again():
+    previous = {'requests_per_minute': 300, 'tokens_per_minute': 90000, 'rate_limited': True}
+    current = {'requests_per_minute': 200, 'tokens_per_minute': 60000, 'rate_limited': False}
+    merged = merge_limits(previous, current)
+    assert merged['rate_limited']
+    assert merged['requests_per_minute'] == 300
+    assert merge_limits(None, current) == current
+
+
+def test_weight_decays_with_age():
+    learned = LearnedLimits(half_life_hours=24, max_age_hours=72)
+    assert learned.weight(NOW, NOW) == 1.0
+    assert learned.weight(NOW - timedelta(hours=24), NOW) == pytest.approx(0.5)
+    assert learned.weight(NOW - timedelta(hours=100), NOW) == 0.0
+
+
+def test_warm_start_applies_learned_limits():
+    runtime = ProviderRuntime(rate_limits={'openai': {'requests_per_minute': 500, 'tokens_per_minute': 30000}},
+                              concurrency={'adaptive': True, 'initial_limit': 4})
+    learned = LearnedLimits(half_life_hours=24, safety_factor=1.0)
+    applied = learned.warm_start(runtime, {
+        'openai': record(0, concurrency={'GPT': 12}),
+        'gemini': record(24, rpm=100, tpm=None, concurrency={'Gemini': 8}),
+        'anthropic': record(0, rate_limited=False, concurrency={'Claude': 10}),
+        'stale': record(1000, concurrency={'Old': 20})
+    }, now=NOW)
+
+    # The configured TPM is lower than the learned ceiling and still applies
+    assert runtime.rate_limiters['openai'].limits() == (100, 30000)
+    # A ceiling a half-life old is loosened by half
+    assert runtime.rate_limiters['gemini'].limits() == (150, None)
+    assert 'anthropic' not in runtime.rate_limiters
+    assert runtime.initial_concurrency == {'GPT': 12, 'Gemini': 6, 'Claude': 10}
+    assert 'stale' not in applied
+
+
+def test_limits_round_trip_through_database(tmp_path):
+    db = DatabaseManager(str(tmp_path / 'essays.db'))
+    db.save_provider_limits('run-1', {'openai': {'requests_per_minute': 120.0, 'tokens_per_minute': 40000,
+                                                 'rate_limited': True, 'latency_p50': 1.5, 'latency_p95': 4.0,
+                                                 'concurrency': {'GPT': 9}}})
+    db.save_provider_limits('run-2', {'openai': {'requests_per_minute': 150.0, 'tokens_per_minute': 45000,
+                                                 'rate_limited': False, 'concurrency': {'GPT': 11}}})
+
+    limits = db.get_provider_limits()
+    assert list(limits) == ['openai']
+    assert limits['openai']['requests_per_minute'] == 150.0
+    assert limits['openai']['concurrency'] == {'GPT': 11}
+    assert isinstance(limits['openai']['updated_at'], datetime)
+
+
+def test_build_learned_limits():
+    assert build_learned_limits({}) is None
+    assert build_learned_limits({'enabled': True, 'half_life_hours': 6}).half_life_hours == 6
@@ -0,0 +1,121 @@
+import asyncio
+import httpx
+import litellm
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.llm_manager import LLMManager
+from generation.timeouts import TimeoutPolicy, build_timeout_policy, timeout_stage
+
+MODEL = {'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai', 'max_tokens': 1000}
+
+PROMPT_DATA = {'prompt': 'Write an essay about testing', 'metadata': {}}
+
+
+def mock_response(content="Essay text"):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    return response
+
+
+def timeout_error(cause=None):
+    error = litellm.Timeout(message="Request timed out", model='gpt-4o', llm_provider='openai')
+    error.__cause__ = cause
+    return error
+
+
+def test_request_timeout_per_model():
+    policy = build_timeout_policy({'connect_seconds': 5, 'read_seconds': 60})
+    timeout = policy.request_timeout(MODEL)
+    assert (timeout.connect, timeout.read) == (5, 60)
+    assert policy.request_timeout({**MODEL, 'read_timeout': 600}).read == 600
+    assert TimeoutPolicy(connect_seconds=None, read_seconds=None).request_timeout(MODEL) is None
+    assert policy.job_timeout({**MODEL, 'job_timeout': None}) is None
+
+    kwargs = LLMManager([MODEL], timeouts={'read_seconds': 120})._request_kwargs([], MODEL, {'max_tokens': 100})
+    assert kwargs['timeout'].read == 120
+
+
+def test_timeout_stage_follows_cause():
+    assert timeout_stage(timeout_error(httpx.ConnectTimeout("connect"))) == 'connect'
+    assert timeout_stage(timeout_error(httpx.ReadTimeout("read"))) == 'read'
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_timed_out_attempt_is_retried(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL])
+    mock_acompletion.side_effect = [timeout_error(httpx.ConnectTimeout("connect")), mock_response()]
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+    assert result['content'] == "Essay text"
+    stats = manager.get_timeout_stats()
+    assert stats['attempt_timeouts'] == 1
+    assert stats['models']['ChatGPT 4o'] == {'connect': 1, 'read': 0, 'jobs': 0}
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_job_deadline_cancels_hung_request(mock_acompletion):
+    manager = LLMManager([MODEL], timeouts={'job_seconds': 0.1})
+    cancelled = []
+
+    async def hang(**kwargs):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs['model'])
+            raise
+    mock_acompletion.side_effect = hang
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert cancelled == ['openai/gpt-4o']
+
+    stats = manager.get_timeout_stats()
+    assert stats['job_timeouts'] == 1
+    assert stats['timed_out_jobs'][0]['model'] == 'ChatGPT 4o'
+    assert 0.1 <= stats['timed_out_jobs'][0]['elapsed_seconds'] < 1
+    assert stats['models']['ChatGPT 4o']['jobs'] == 1
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_cancelling_a_batch_reaches_in_flight_requests(mock_acompletion):
+    manager = LLMManager([MODEL, {**MODEL, 'name': 'Other'}])
+    started, cancelled = [], []
+
+    async def hang(**kwargs):
+        started.append(kwargs['model'])
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(kwargs['model'])
+            raise
+    mock_acompletion.side_effect = hang
+
+    batch = asyncio.create_task(manager.generate_batch([PROMPT_DATA]))
+    while len(started) < 2:
+        await asyncio.sleep(0.01)
+    batch.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await batch
+    assert len(cancelled) == 2
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_queueing_for_a_slot_does_not_count_against_the_job_deadline(mock_acompletion):
+    manager = LLMManager([MODEL], timeouts={'job_seconds': 0.15},
+                         concurrency={'adaptive': True, 'initial_limit': 2, 'max_limit': 2})
+
+    async def complete(**kwargs):
+        await asyncio.sleep(0.05)
+        return mock_response()
+    mock_acompletion.side_effect = complete
+
+    # Ten jobs through two slots take far longer than one job's deadline
+    results = await asyncio.gather(*[manager.dispatch(PROMPT_DATA, MODEL) for _ in range(10)])
+    assert all(r is not None for r in results)
+    assert manager.get_timeout_stats()['job_timeouts'] == 0
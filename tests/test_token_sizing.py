@@ -0,0 +1,83 @@
+from unittest.mock import patch
+
+from generation.llm_manager import LLMManager
+from generation.token_calculator import (
+    count_message_tokens, count_tokens, get_model_token_config, heuristic_token_count, plan_max_tokens
+)
+
+CLAUDE = {'model': 'anthropic/claude-3-7-sonnet-latest', 'name': 'Claude', 'provider': 'anthropic'}
+GEMINI = {'model': 'gemini/gemini-2.5-pro', 'name': 'Gemini', 'provider': 'gemini'}
+SIZING = {'enabled': True, 'target_words': 1000, 'length_margin': 0.25}
+
+
+def test_heuristic_uses_the_larger_of_word_and_char_estimates():
+    assert heuristic_token_count("one two three four", 'openai') == 6
+    # A single long token-dense word is counted by characters
+    assert heuristic_token_count("x" * 400, 'anthropic') == 115
+    assert heuristic_token_count("x" * 400, 'anthropic', chars_per_token=4.0) == 100
+
+
+def test_counts_are_memoized():
+    text = "memoized fragment " * 50
+    with patch('generation.token_calculator.heuristic_token_count', return_value=7) as heuristic:
+        assert count_tokens(text, CLAUDE) == 7
+        assert count_tokens(text, CLAUDE) == 7
+    assert heuristic.call_count == 1
+
+
+def test_message_tokens_include_overhead_and_blocks():
+    messages = [
+        {'role': 'system', 'content': 'Be a student'},
+        {'role': 'user', 'content': [{'type': 'text', 'text': 'Context'}, {'type': 'text', 'text': 'Write'}]}
+    ]
+    expected = sum(count_tokens(t, CLAUDE) for t in ('Be a student', 'Context', 'Write')) + 8
+    assert count_message_tokens(messages, CLAUDE) == expected
+
+
+def test_plan_covers_target_length_and_thinking():
+    essay_tokens = plan_max_tokens(CLAUDE, 500)
+    assert essay_tokens == 1750
+    assert plan_max_tokens({**CLAUDE, 'thinking_tokens': 1024}, 500) == essay_tokens + 1024
+    # Gemini reserves as much again for thinking by default
+    assert plan_max_tokens(GEMINI, 500) == 2 * 1625
+
+
+def test_plan_respects_context_window_and_explicit_cap():
+    assert plan_max_tokens({**CLAUDE, 'context_window': 2000}, 1200) == 800
+    assert plan_max_tokens({**CLAUDE, 'max_tokens': 1000}, 500) == 1000
+    # The floor never pushes a long prompt's request past the context
+    assert plan_max_tokens({**CLAUDE, 'context_window': 2000}, 1800) == 200
+
+
+def test_sizing_only_applies_when_enabled():
+    assert get_model_token_config(CLAUDE, 3000, 500)['max_tokens'] == 3000
+    config = get_model_token_config(CLAUDE, 3000, 500, SIZING)
+    assert config['max_tokens'] == 1750
+    assert config['prompt_tokens'] == 500
+
+
+def test_manager_reserves_counted_prompt_plus_planned_output():
+    manager = LLMManager([CLAUDE], token_sizing=SIZING)
+    prompt_data = {'prompt': 'Write an essay about testing', 'metadata': {}}
+    tokens, _ = manager._worst_case_cost(prompt_data, CLAUDE)
+    prompt_tokens = count_message_tokens(manager._build_messages(prompt_data, CLAUDE), CLAUDE)
+    assert tokens == prompt_tokens + 1750
+
+
+def test_cache_key_follows_planned_max_tokens():
+    prompt_data = {'prompt': 'Write an essay about testing', 'metadata': {}}
+    short = LLMManager([CLAUDE], token_sizing=SIZING)._cache_key(prompt_data, CLAUDE)
+    longer = LLMManager([CLAUDE], token_sizing={**SIZING, 'target_words': 1500})._cache_key(prompt_data, CLAUDE)
+    assert short != longer
+    assert short == LLMManager([CLAUDE], token_sizing=SIZING)._cache_key(prompt_data, CLAUDE)
+
+
+def test_shared_base_prompt_is_counted_as_its_own_block():
+    manager = LLMManager([GEMINI], token_sizing=SIZING)
+    base_prompt = "Shared seed context. " * 100
+    counted = []
+    with patch('generation.token_calculator._count_tokens_cached', side_effect=lambda text, *args: counted.append(text) or 1):
+        for brief in ("Brief one", "Brief two"):
+            manager._token_config({'prompt': base_prompt + brief, 'base_prompt': base_prompt, 'metadata': {}}, GEMINI)
+    assert counted.count(base_prompt) == 2
+    assert base_prompt + "Brief one" not in counted
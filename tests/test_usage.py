@@ -0,0 +1,119 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from generation.llm_manager import LLMManager
+from generation.usage import UsageTracker, call_cost, extract_usage
+
+MODEL = {
+    'model': 'openai/gpt-4o', 'name': 'ChatGPT 4o', 'provider': 'openai',
+    'max_tokens': 1000, 'input_cost_per_mtok': 2.0, 'output_cost_per_mtok': 10.0
+}
+
+PROMPT_DATA = {'prompt': 'Write an essay about testing', 'metadata': {}}
+
+
+def mock_response(content="Essay text", prompt_tokens=100, completion_tokens=400,
+                  reasoning_tokens=50, finish_reason='stop'):
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = content
+    response.choices[0].finish_reason = finish_reason
+    response.usage.prompt_tokens = prompt_tokens
+    response.usage.completion_tokens = completion_tokens
+    response.usage.completion_tokens_details.reasoning_tokens = reasoning_tokens
+    return response
+
+
+def test_extract_usage_reads_tokens_and_finish_reason():
+    usage = extract_usage(mock_response(finish_reason='length'))
+    assert usage == {
+        'prompt_tokens': 100, 'completion_tokens': 400,
+        'reasoning_tokens': 50, 'cached_tokens': 0, 'finish_reason': 'length'
+    }
+
+
+def test_extract_usage_tolerates_missing_usage():
+    response = MagicMock(spec=['choices'])
+    response.choices = []
+    assert extract_usage(response)['completion_tokens'] == 0
+
+
+def test_call_cost_uses_model_prices():
+    assert call_cost(MODEL, 1_000_000, 100_000) == pytest.approx(3.0)
+    assert call_cost({'name': 'free'}, 1000, 1000) == 0.0
+
+
+def test_reservations_hold_budget_until_released():
+    tracker = UsageTracker(max_tokens=2500)
+    assert tracker.reserve(1000, 0.0)
+    assert tracker.reserve(1000, 0.0)
+    assert not tracker.reserve(1000, 0.0)
+    assert tracker.exhausted  # a refused reservation stops new jobs being queued
+    tracker.release(1000, 0.0)
+    assert tracker.reserve(1000, 0.0)
+
+
+def test_exhausted_once_spent_budget_leaves_no_room():
+    tracker = UsageTracker(max_cost_usd=0.01)
+    tracker.record_call(MODEL, {'prompt_tokens': 1000, 'completion_tokens': 800,
+                                'reasoning_tokens': 0, 'finish_reason': 'stop'}, True)
+    assert not tracker.reserve(0, 0.005)
+    assert tracker.exhausted
+    assert tracker.summary()['budget']['jobs_refused'] == 1
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_failed_retries_are_counted_on_the_essay(mock_acompletion, mock_sleep):
+    manager = LLMManager([MODEL])
+    mock_acompletion.side_effect = [ConnectionError("reset"), mock_response()]
+
+    result = await manager.dispatch(PROMPT_DATA, MODEL)
+
+    usage = result['usage']
+    assert usage['attempts'] == 2
+    assert usage['failed_attempts'] == 1
+    assert usage['completion_tokens'] == 400
+    assert usage['reasoning_tokens'] == 50
+    assert usage['finish_reason'] == 'stop'
+    assert usage['cost_usd'] == pytest.approx((100 * 2.0 + 400 * 10.0) / 1_000_000)
+    assert manager.get_usage_summary()['per_model']['ChatGPT 4o']['attempts'] == 2
+
+
+@pytest.mark.asyncio
+@patch('generation.llm_manager.acompletion')
+async def test_budget_stops_dispatching(mock_acompletion):
+    # Worst case is the prompt estimate plus max_tokens, so one job fits
+    manager = LLMManager([MODEL], budget={'max_tokens': 1500})
+    mock_acompletion.return_value = mock_response(prompt_tokens=10, completion_tokens=1000)
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is not None
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert mock_acompletion.call_count == 1
+    assert manager.usage.exhausted
+
+
+@pytest.mark.asyncio
+@patch('asyncio.sleep')
+@patch('generation.llm_manager.acompletion')
+async def test_retry_must_fit_the_budget_again(mock_acompletion, mock_sleep):
+    # The job's reservation leaves no room for a second worst-case call
+    manager = LLMManager([MODEL], budget={'max_tokens': 1500})
+    mock_acompletion.side_effect = [ConnectionError("reset"), mock_response()]
+
+    assert await manager.dispatch(PROMPT_DATA, MODEL) is None
+    assert mock_acompletion.call_count == 1
+    assert manager.usage.jobs_refused == 1
+    assert manager.usage.reserved_tokens == 0
+
+
+def test_restore_carries_over_earlier_session():
+    first = UsageTracker()
+    first.record_call(MODEL, {'prompt_tokens': 100, 'completion_tokens': 400,
+                              'reasoning_tokens': 0, 'finish_reason': 'stop'}, True)
+    resumed = UsageTracker(max_tokens=600)
+    resumed.restore(first.summary())
+    assert resumed.total_tokens == 500
+    assert resumed.per_model['ChatGPT 4o']['attempts'] == 1
+    assert not resumed.reserve(200, 0.0)